@@ -0,0 +1,11 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Benchmarks for pycardcast. These run against a local stub of the
+Cardcast API (:py:mod:`benchmarks.stub`) serving synthetic decks
+(:py:mod:`benchmarks.synth`), so they need no network access.
+
+Run them with ``python -m benchmarks``; see ``--help`` for options.
+"""
@@ -0,0 +1,110 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Run the benchmarks and write the results as JSON."""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from benchmarks.scenarios import scenarios
+from benchmarks.stub import StubConfig, StubServer
+
+
+def _flatten(results, prefix=""):
+    """Flatten nested results into ``{"a.b.c": number}``."""
+    flat = {}
+    for key, value in results.items():
+        name = prefix + key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+
+    return flat
+
+
+def compare(old, new):
+    """Print the change in every number between two result files."""
+    old = _flatten(old["results"])
+    new = _flatten(new["results"])
+    for name in sorted(old.keys() & new.keys()):
+        before, after = old[name], new[name]
+        change = (after - before) / before * 100 if before else 0.0
+        print("{:60} {:>14.6g} {:>14.6g} {:>+8.1f}%".format(
+            name, before, after, change))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description=__doc__)
+    parser.add_argument("scenario", nargs="*", choices=[[]] + list(scenarios),
+                        help="scenarios to run (default: all)")
+    parser.add_argument("--output", "-o", help="file to write results to "
+                        "(default: standard output)")
+    parser.add_argument("--compare", metavar="OLD", help="compare the "
+                        "results with those in this file")
+    parser.add_argument("--latency", type=float, default=0.01,
+                        help="stub server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="maximum extra random latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of stub requests that fail")
+    parser.add_argument("--catalogue", type=int, default=500,
+                        help="number of decks in the stub's catalogue")
+    parser.add_argument("--black", type=int, default=100,
+                        help="black cards per deck")
+    parser.add_argument("--white", type=int, default=500,
+                        help="white cards per deck")
+    parser.add_argument("--decks", type=int, default=200,
+                        help="decks to fetch in the bulk scenario")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="concurrency of the bulk and crawl scenarios")
+    parser.add_argument("--iterations", type=int, default=20,
+                        help="iterations of the latency and parse scenarios")
+    args = parser.parse_args(argv)
+
+    options = {
+        "black": args.black,
+        "white": args.white,
+        "decks": args.decks,
+        "concurrency": args.concurrency,
+        "iterations": args.iterations,
+    }
+    config = StubConfig(decks=args.catalogue, blackcount=args.black,
+                        whitecount=args.white, latency=args.latency,
+                        jitter=args.jitter, error_rate=args.error_rate)
+
+    results = {}
+    with StubServer(config) as server:
+        for name in args.scenario or scenarios:
+            print("Running {}...".format(name), file=sys.stderr)
+            results[name] = scenarios[name](server, options)
+
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "stub": vars(config),
+        "options": options,
+        "results": results,
+    }
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Benchmark scenarios. Each takes a
+:py:class:`~benchmarks.stub.StubServer` and an options dictionary, and
+returns a dictionary of results."""
+
+import asyncio
+import gc
+import json
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+from datetime import datetime
+
+from benchmarks import synth
+from pycardcast.decode import decoders, get_decoder
+from pycardcast.deck import Deck
+
+
+def _latencies(samples):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean": statistics.mean(samples),
+        "p50": samples[len(samples) // 2],
+        "p90": samples[int(len(samples) * 0.9)],
+        "max": samples[-1],
+    }
+
+
+def _requests_api(server, **kwargs):
+    from pycardcast.net.requests import CardcastAPI
+    return server.configure(CardcastAPI(**kwargs))
+
+
+def _aiohttp_api(server):
+    from pycardcast.net.aiohttp import CardcastAPI
+    return server.configure(CardcastAPI())
+
+
+def single_deck(server, options):
+    """Latency of fetching one deck at a time, with connections kept alive
+    in the session's pool and with a new connection for every request."""
+    codes = [synth.deck_code(i) for i in range(options["iterations"])]
+    results = {}
+    for name, keep_alive in (("pooled", True), ("unpooled", False)):
+        with _requests_api(server, keep_alive=keep_alive) as api:
+            samples = []
+            start = time.perf_counter()
+            for code in codes:
+                sample_start = time.perf_counter()
+                api.deck(code)
+                samples.append(time.perf_counter() - sample_start)
+
+            elapsed = time.perf_counter() - start
+            results[name] = {"latency": _latencies(samples),
+                             "requests": api.request_count,
+                             "requests_per_second": (api.request_count /
+                                                     elapsed)}
+
+    results["speedup"] = (results["pooled"]["requests_per_second"] /
+                          results["unpooled"]["requests_per_second"])
+    return results
+
+
+def bulk_fetch(server, options):
+    """Throughput of fetching many decks with decks_many()."""
+    codes = [synth.deck_code(i) for i in range(options["decks"])]
+    concurrency = options["concurrency"]
+    results = {}
+
+    with _requests_api(server) as api:
+        start = time.perf_counter()
+        failed = sum(r.error is not None
+                     for r in api.decks_many(codes, concurrency))
+        elapsed = time.perf_counter() - start
+        results["requests"] = {"seconds": elapsed,
+                               "decks_per_second": len(codes) / elapsed,
+                               "failed": failed}
+
+    try:
+        api = _aiohttp_api(server)
+    except ImportError:
+        return results
+
+    async def run():
+        async with api:
+            failed = 0
+            async for r in api.decks_many(codes, concurrency):
+                failed += r.error is not None
+            return failed
+
+    start = time.perf_counter()
+    failed = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    results["aiohttp"] = {"seconds": elapsed,
+                          "decks_per_second": len(codes) / elapsed,
+                          "failed": failed}
+    return results
+
+
+def mixed_load(server, options):
+    """Throughput of one bridge client serving threads and coroutines at
+    once."""
+    from pycardcast.net.bridge import CardcastAPI
+
+    codes = [synth.deck_code(i) for i in range(options["decks"])]
+    # Half the workers are threads and half coroutines, taking codes from
+    # a shared iterator
+    workers = max(options["concurrency"] // 2, 1)
+    codes_left = iter(codes)
+    lock = threading.Lock()
+    done = {"threads": 0, "coroutines": 0}
+
+    def next_code():
+        with lock:
+            return next(codes_left, None)
+
+    with CardcastAPI(limit_per_host=options["concurrency"]) as api:
+        server.configure(api.api)
+
+        def thread_worker():
+            while True:
+                code = next_code()
+                if code is None:
+                    return
+
+                api.deck(code)
+                with lock:
+                    done["threads"] += 1
+
+        async def coroutine_worker():
+            while True:
+                code = next_code()
+                if code is None:
+                    return
+
+                await api.acall("deck", code)
+                done["coroutines"] += 1
+
+        async def coroutines():
+            await asyncio.gather(*(coroutine_worker()
+                                   for _ in range(workers)))
+
+        threads = [threading.Thread(target=thread_worker)
+                   for _ in range(workers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        asyncio.run(coroutines())
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.perf_counter() - start
+        return dict(done, seconds=elapsed,
+                    decks_per_second=len(codes) / elapsed,
+                    requests=api.request_count)
+
+
+def search_crawl(server, options):
+    """Time to crawl the whole catalogue, page by page and concurrently."""
+    results = {}
+    with _requests_api(server) as api:
+        start = time.perf_counter()
+        decks = sum(s.count for s in api.search_iter())
+        results["search_iter"] = {"seconds": time.perf_counter() - start,
+                                  "decks": decks}
+
+        start = time.perf_counter()
+        decks = sum(1 for _ in api.search_crawl(
+            decks=True, window=options["concurrency"]))
+        results["search_crawl"] = {"seconds": time.perf_counter() - start,
+                                   "decks": decks}
+
+    return results
+
+
+def parse_only(server, options):
+    """Cost of decoding and parsing a deck, without the network."""
+    from pycardcast.util import isoformat
+
+    info = json.dumps(synth.deck_info("PARSE"))
+    cards = json.dumps(synth.cards("PARSE", blackcount=options["black"],
+                                   whitecount=options["white"]))
+    ncards = options["black"] + options["white"]
+    results = {"cards": ncards, "bytes": len(cards)}
+
+    for lazy in (False, True):
+        samples = []
+        for _ in range(options["iterations"]):
+            isoformat.cache_clear()
+            start = time.perf_counter()
+            Deck.from_json(json.loads(info), json.loads(cards), lazy=lazy)
+            samples.append(time.perf_counter() - start)
+
+        results["lazy" if lazy else "eager"] = {
+            "latency": _latencies(samples),
+            "cards_per_second": ncards / statistics.median(samples),
+        }
+
+    info = info.encode("utf-8")
+    cards = cards.encode("utf-8")
+    for name in decoders:
+        try:
+            decoder = get_decoder(name)
+        except ImportError:
+            continue
+
+        samples = []
+        for _ in range(options["iterations"]):
+            isoformat.cache_clear()
+            start = time.perf_counter()
+            decoder.deck(info, cards)
+            samples.append(time.perf_counter() - start)
+
+        results["decoder_" + name] = {
+            "latency": _latencies(samples),
+            "cards_per_second": ncards / statistics.median(samples),
+        }
+
+    return results
+
+
+def _strptime_isoformat(date):
+    """The timestamp parser :py:func:`pycardcast.util.isoformat` replaced,
+    for comparison."""
+    assert date.endswith("+00:00"), "This cannot handle non-UTC offsets yet!"
+    return datetime.strptime(date[:-6], "%Y-%m-%dT%H:%M:%S")
+
+
+def isoformat(server, options):
+    """Cost of parsing the timestamps of a deck's cards, against the old
+    strptime parser."""
+    from pycardcast import util
+
+    data = synth.cards("TIMES", blackcount=options["black"],
+                       whitecount=options["white"])
+    stamps = [card["created_at"]
+              for card in data["calls"] + data["responses"]]
+    results = {"timestamps": len(stamps)}
+
+    def run(parse, clear):
+        samples = []
+        for _ in range(options["iterations"]):
+            if clear:
+                util.isoformat.cache_clear()
+
+            start = time.perf_counter()
+            for stamp in stamps:
+                parse(stamp)
+            samples.append(time.perf_counter() - start)
+
+        return {"latency": _latencies(samples),
+                "timestamps_per_second": (len(stamps) /
+                                          statistics.median(samples))}
+
+    old = results["strptime"] = run(_strptime_isoformat, False)
+    # Cold runs start with an empty memo each time; warm ones share it
+    new = results["isoformat_cold"] = run(util.isoformat, True)
+    util.isoformat.cache_clear()
+    results["isoformat_warm"] = run(util.isoformat, False)
+    results["speedup_cold"] = (new["timestamps_per_second"] /
+                               old["timestamps_per_second"])
+    return results
+
+
+class _OldCard:
+    """A card as it was kept before the model classes had slots, for
+    comparison."""
+
+    def __init__(self, created, cid, text, pick=None):
+        self.created = created
+        self.cid = cid
+        self.text = text
+        if pick is not None:
+            self.pick = pick
+
+
+def _old_cards(data):
+    """Parse card list JSON the way it was before the model classes had
+    slots and timestamps were memoised."""
+    black = [_OldCard(_strptime_isoformat(c["created_at"]), c["id"],
+                      "_____".join(c["text"]), len(c["text"]) - 1)
+             for c in data["calls"]]
+    white = [_OldCard(_strptime_isoformat(c["created_at"]), c["id"],
+                      c["text"][0])
+             for c in data["responses"]]
+    return black, white
+
+
+def _retained(build):
+    """Get the number of bytes still allocated by a function once it
+    returns, while its result is kept, and how many of them are held by the
+    timestamp memo."""
+    from pycardcast.util import isoformat
+
+    isoformat.cache_clear()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        isoformat.cache_clear()
+        gc.collect()
+        memo = size - tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    del result
+    return size, memo
+
+
+def memory(server, options):
+    """Memory kept per card by each way of holding a deck's cards,
+    including the decoded JSON where it is kept and the timestamp memo."""
+    from pycardcast.card import BlackCard, CardList, CardTable, WhiteCard
+    from pycardcast.store import CardStore
+
+    body = json.dumps(synth.cards("MEMORY", blackcount=options["black"],
+                                  whitecount=options["white"]))
+    ncards = options["black"] + options["white"]
+
+    def eager(store=None):
+        data = json.loads(body)
+        return (BlackCard.from_json(data, store),
+                WhiteCard.from_json(data, store))
+
+    def lazy():
+        data = json.loads(body)
+        return (CardList(BlackCard, data["calls"]),
+                CardList(WhiteCard, data["responses"]))
+
+    builds = {
+        "before": lambda: _old_cards(json.loads(body)),
+        "eager": eager,
+        "card_store": lambda: eager(CardStore()),
+        "lazy": lazy,
+        "card_table": lambda: CardTable.from_json(json.loads(body)),
+    }
+
+    results = {"cards": ncards}
+    for name, build in builds.items():
+        size, memo = _retained(build)
+        results[name] = {"bytes_per_card": size / ncards,
+                         "memo_bytes_per_card": memo / ncards}
+
+    # Slotted cards against the old ones, and what the memo adds on top
+    eager = results["eager"]
+    results["slots_saving_per_card"] = (
+        results["before"]["bytes_per_card"] -
+        (eager["bytes_per_card"] - eager["memo_bytes_per_card"]))
+    results["memo_cost_per_card"] = eager["memo_bytes_per_card"]
+    return results
+
+
+def _import_time(module):
+    """Import a module in a fresh interpreter, returning the cumulative
+    import time ``-X importtime`` reports for it, in seconds."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                           "import " + module],
+                          stderr=subprocess.PIPE, text=True, check=True)
+    for line in proc.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1e6
+
+    raise ValueError("No import time reported for " + module)
+
+
+def import_time(server, options):
+    """Time to import the package and each backend in a fresh process."""
+    results = {}
+    for module in ("pycardcast", "pycardcast.net", "pycardcast.deck",
+                   "pycardcast.net.requests", "pycardcast.net.aiohttp"):
+        try:
+            samples = [_import_time(module)
+                       for _ in range(options["iterations"])]
+        except subprocess.CalledProcessError:
+            # The backend's library is not installed
+            continue
+
+        results[module] = {"median": statistics.median(samples),
+                           "min": min(samples)}
+
+    return results
+
+
+scenarios = {
+    "single_deck": single_deck,
+    "bulk_fetch": bulk_fetch,
+    "mixed_load": mixed_load,
+    "search_crawl": search_crawl,
+    "parse_only": parse_only,
+    "isoformat": isoformat,
+    "memory": memory,
+    "import_time": import_time,
+}
+"""All the scenarios, by name."""
@@ -0,0 +1,206 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""A local stub of the Cardcast API, serving synthetic decks from
+:py:mod:`benchmarks.synth` with configurable latency and error rates."""
+
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks import synth
+
+
+_path_re = re.compile(r"^/v1/decks(?:/([0-9A-Za-z]+)(/cards)?)?/?$")
+
+
+class StubConfig:
+
+    """Settings of a stub server. They may be changed while it runs."""
+
+    def __init__(self, decks=1000, blackcount=None, whitecount=None,
+                 latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        """Initalise the settings.
+
+        :param decks:
+            Number of decks in the catalogue (for searches). Any code can be
+            fetched, in or out of the catalogue.
+
+        :param blackcount:
+            Number of black cards per deck; by default, random per deck.
+
+        :param whitecount:
+            Number of white cards per deck; by default, random per deck.
+
+        :param latency:
+            Seconds to wait before answering each request.
+
+        :param jitter:
+            Maximum extra random seconds to wait.
+
+        :param error_rate:
+            Fraction of requests answered with a 503 error.
+
+        :param seed:
+            Seed of the synthetic catalogue.
+        """
+        self.decks = decks
+        self.blackcount = blackcount
+        self.whitecount = whitecount
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    # Headers and body are separate writes; with Nagle's algorithm on, each
+    # keep-alive response would wait for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        config = server.config
+        with server.lock:
+            server.requests += 1
+
+        delay = config.latency + random.uniform(0, config.jitter)
+        if delay:
+            time.sleep(delay)
+
+        if random.random() < config.error_rate:
+            return self._send(503, {"id": "unavailable",
+                                    "message": "Injected failure"})
+
+        url = urlsplit(self.path)
+        m = _path_re.match(url.path)
+        if m is None:
+            return self._send(404, {"id": "not_found",
+                                    "message": "Not found"})
+
+        code, cards = m.groups()
+        if code is None:
+            qs = parse_qs(url.query)
+            offset = int(qs.get("offset", ["0"])[0])
+            limit = min(50, int(qs.get("limit", ["50"])[0]))
+            data = synth.search(config.decks, offset, limit, config.seed)
+        elif cards:
+            data = synth.cards(code, config.seed, config.blackcount,
+                               config.whitecount)
+        else:
+            data = synth.deck_info(code, config.seed, config.blackcount,
+                                   config.whitecount)
+
+        self._send(200, data)
+
+    def _send(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        etag = '"{:08x}"'.format(zlib.crc32(body))
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            status = 304
+            body = b""
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status in (200, 304):
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+
+    # Enough for every benchmark client to connect at once without
+    # dropped SYNs and retransmit stalls
+    request_queue_size = 1024
+
+    daemon_threads = True
+
+
+class StubServer:
+
+    """A stub Cardcast API server running in a background thread.
+
+    Use it as a context manager, or call
+    :py:meth:`~benchmarks.stub.StubServer.start` and
+    :py:meth:`~benchmarks.stub.StubServer.stop`.
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        """Initalise the server.
+
+        :param config:
+            A :py:class:`~benchmarks.stub.StubConfig`; by default, one with
+            default settings.
+
+        :param host:
+            Address to listen on.
+
+        :param port:
+            Port to listen on; by default, any free port.
+        """
+        self.config = StubConfig() if config is None else config
+        self._server = _Server((host, port), _Handler)
+        self._server.config = self.config
+        self._server.lock = threading.Lock()
+        self._server.requests = 0
+        self._thread = None
+
+    @property
+    def endpoint_url(self):
+        """The URL of the decks endpoint."""
+        host, port = self._server.server_address[:2]
+        return "http://{}:{}/v1/decks".format(host, port)
+
+    @property
+    def requests(self):
+        """Number of requests received."""
+        return self._server.requests
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def configure(self, api):
+        """Point an API object at this server.
+
+        :param api:
+            A :py:class:`~pycardcast.net.CardcastAPIBase` instance.
+
+        :returns:
+            The API object.
+        """
+        url = self.endpoint_url
+        api.endpoint_url = url
+        api.deck_list_url = url
+        api.deck_info_url = url + "/{code}"
+        api.card_list_url = url + "/{code}/cards"
+        return api
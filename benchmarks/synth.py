@@ -0,0 +1,150 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Generators of synthetic Cardcast API responses. Every response is
+derived from a seed and the deck code, so the same code always produces the
+same deck."""
+
+import random
+
+from datetime import datetime, timedelta, timezone
+
+
+_words = ("the a my your our an unexpected tiny enormous secret haunted "
+          "glorious awkward forbidden ancient cursed cheap expensive "
+          "sentient inflatable radioactive dog cat grandma wizard robot "
+          "sandwich spaceship lawyer volcano ghost dentist pirate "
+          "dinosaur taxes monday feelings hat button sock party "
+          "election birthday cheese keyboard toaster diary dance").split()
+
+_categories = ("general", "movies", "games", "music", "tv", "books",
+               "sports", "nsfw", "science", "history")
+
+_epoch = datetime(2014, 1, 1, tzinfo=timezone.utc)
+
+
+def _rng(seed, code, salt=""):
+    return random.Random("{}:{}:{}".format(seed, code, salt))
+
+
+def _timestamp(rng):
+    when = _epoch + timedelta(seconds=rng.randrange(2 * 365 * 86400))
+    return when.isoformat()
+
+
+def _phrase(rng, low, high):
+    return " ".join(rng.choice(_words) for _ in range(rng.randint(low, high)))
+
+
+def deck_code(index):
+    """Get the code of the deck at the given index of the catalogue."""
+    digits = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    code = ""
+    for _ in range(5):
+        index, digit = divmod(index, len(digits))
+        code = digits[digit] + code
+
+    return code
+
+
+def black_card(rng, cid):
+    """Generate the JSON for a black card with one to three blanks."""
+    blanks = rng.choices((1, 2, 3), (80, 17, 3))[0]
+    text = [_phrase(rng, 2, 8).capitalize() + " "]
+    for _ in range(blanks - 1):
+        text.append(" " + _phrase(rng, 1, 4) + " ")
+    text.append(rng.choice((".", "?", "!", "")))
+    return {"id": cid, "text": text, "created_at": _timestamp(rng)}
+
+
+def white_card(rng, cid):
+    """Generate the JSON for a white card."""
+    return {"id": cid, "text": [_phrase(rng, 1, 6).capitalize() + "."],
+            "created_at": _timestamp(rng)}
+
+
+def deck_info(code, seed=0, blackcount=None, whitecount=None,
+              samples=False):
+    """Generate the JSON for a deck's info.
+
+    :param code:
+        The deck code.
+
+    :param seed:
+        The seed of the catalogue.
+
+    :param blackcount:
+        The number of black cards; by default, random.
+
+    :param whitecount:
+        The number of white cards; by default, random.
+
+    :param samples:
+        Whether to include sample cards, as search results do.
+    """
+    rng = _rng(seed, code, "info")
+    if blackcount is None:
+        blackcount = rng.randint(10, 200)
+    if whitecount is None:
+        whitecount = rng.randint(50, 1000)
+
+    created = _timestamp(rng)
+    data = {
+        "code": code,
+        "name": _phrase(rng, 1, 4).title(),
+        "description": _phrase(rng, 0, 20) or None,
+        "category": rng.choice(_categories),
+        "call_count": str(blackcount),
+        "response_count": str(whitecount),
+        "unlisted": False,
+        "author": {"id": "u{:06d}".format(rng.randrange(10 ** 6)),
+                   "username": rng.choice(_words) + str(rng.randrange(100))},
+        "external_copyright": rng.random() < 0.1,
+        "copyright_holder_url": None,
+        "created_at": created,
+        "updated_at": max(created, _timestamp(rng)),
+        "rating": "{:.1f}".format(rng.uniform(0, 5)),
+    }
+    if samples:
+        cards_rng = _rng(seed, code, "samples")
+        data["sample_calls"] = [black_card(cards_rng, "{}s{}".format(code, i))
+                                for i in range(3)]
+        data["sample_responses"] = [
+            white_card(cards_rng, "{}t{}".format(code, i)) for i in range(5)]
+
+    return data
+
+
+def cards(code, seed=0, blackcount=None, whitecount=None):
+    """Generate the JSON for a deck's cards.
+
+    The counts default to those in the deck's info.
+    """
+    if blackcount is None or whitecount is None:
+        info = deck_info(code, seed, blackcount, whitecount)
+        blackcount = int(info["call_count"])
+        whitecount = int(info["response_count"])
+
+    rng = _rng(seed, code, "cards")
+    return {
+        "calls": [black_card(rng, "{}b{}".format(code, i))
+                  for i in range(blackcount)],
+        "responses": [white_card(rng, "{}w{}".format(code, i))
+                      for i in range(whitecount)],
+    }
+
+
+def search(total, offset, limit, seed=0):
+    """Generate the JSON for a page of search results, over a catalogue of
+    ``total`` decks."""
+    codes = [deck_code(i) for i in range(offset, min(total, offset + limit))]
+    return {
+        "total": total,
+        "results": {
+            "count": len(codes),
+            "offset": offset,
+            "data": [deck_info(code, seed, samples=True) for code in codes],
+        },
+    }
@@ -0,0 +1,261 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Response caches for the network API's. A cache stores the decoded JSON of
+API responses, along with what is needed to revalidate them with the server
+once they expire. Two implementations are provided: an in-memory LRU cache
+(:py:class:`~pycardcast.cache.MemoryCache`) and an on-disk one backed by
+SQLite (:py:class:`~pycardcast.cache.SQLiteCache`).
+
+Note that decks can change at any time, so entries shouldn't be kept fresh
+for too long; see the terms of use in the README.
+"""
+
+import abc
+import json
+import threading
+import time
+
+from collections import namedtuple, OrderedDict
+
+
+CacheEntry = namedtuple("CacheEntry", "data expires etag modified")
+"""A cached response. ``data`` is the decoded JSON, ``expires`` the UNIX time
+the entry stops being fresh, and ``etag`` and ``modified`` the values of the
+response's ``ETag`` and ``Last-Modified`` headers (or ``None``)."""
+
+
+class Cache(metaclass=abc.ABCMeta):
+    """The base for all response caches.
+
+    Implementations must be safe to use from multiple threads.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        """Number of lookups answered with a fresh entry."""
+
+        self.misses = 0
+        """Number of lookups that found no entry or an expired one."""
+
+        self.revalidations = 0
+        """Number of expired entries the server confirmed as unchanged."""
+
+        self._counter_lock = threading.Lock()
+
+    @abc.abstractmethod
+    def get(self, key):
+        """Get the entry for the given key, fresh or not.
+
+        This does not update the hit and miss counters.
+
+        :param key:
+            The key to look up.
+
+        :returns:
+            A :py:class:`~pycardcast.cache.CacheEntry`, or ``None`` if there
+            is no entry.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set(self, key, entry):
+        """Store an entry, evicting others if the cache is full.
+
+        :param key:
+            The key to store the entry under.
+
+        :param entry:
+            The :py:class:`~pycardcast.cache.CacheEntry` to store.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """Remove the entry for the given key, if any."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def clear(self):
+        """Remove all entries."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def __len__(self):
+        raise NotImplementedError
+
+    def lookup(self, key, now=None):
+        """Get the entry for the given key, and count a hit or a miss.
+
+        :param key:
+            The key to look up.
+
+        :param now:
+            The current UNIX time; defaults to ``time.time()``.
+
+        :returns:
+            A tuple of the :py:class:`~pycardcast.cache.CacheEntry` (or
+            ``None``) and whether it is still fresh. Expired entries are
+            returned so they can be revalidated.
+        """
+        entry = self.get(key)
+        if now is None:
+            now = time.time()
+
+        fresh = entry is not None and entry.expires > now
+        with self._counter_lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        return (entry, fresh)
+
+    def revalidated(self):
+        """Count an expired entry the server confirmed as unchanged."""
+        with self._counter_lock:
+            self.revalidations += 1
+
+    @property
+    def hit_ratio(self):
+        """The fraction of lookups that were hits."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class MemoryCache(Cache):
+    """An in-memory cache that evicts the least recently used entries."""
+
+    def __init__(self, maxsize=1024):
+        """Initalise the cache.
+
+        :param maxsize:
+            Maximum number of entries to keep.
+        """
+        super().__init__()
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache(Cache):
+    """An on-disk cache stored in an SQLite database, which evicts the least
+    recently used entries.
+
+    To save a write on every hit, an entry's last use is only updated when
+    it is more than ``touch_interval`` seconds old, so eviction order is
+    only that precise.
+    """
+
+    touch_interval = 60
+    """Seconds an entry's recorded last use may lag behind its actual
+    last use."""
+
+    def __init__(self, path, maxsize=65536):
+        """Initalise the cache, creating the database if needed.
+
+        :param path:
+            Path to the database file.
+
+        :param maxsize:
+            Maximum number of entries to keep.
+        """
+        # Only imported here, so that importing the module stays cheap
+        import sqlite3
+
+        super().__init__()
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS cache ("
+                         "key TEXT PRIMARY KEY, data TEXT NOT NULL, "
+                         "expires REAL NOT NULL, etag TEXT, modified TEXT, "
+                         "accessed REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed "
+                         "ON cache (accessed)")
+        self._count = self._db.execute(
+            "SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self):
+        """Close the database."""
+        self._db.close()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT data, expires, etag, modified, "
+                                   "accessed FROM cache WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None:
+                return None
+
+            now = time.time()
+            if now - row[4] > self.touch_interval:
+                self._db.execute("UPDATE cache SET accessed = ? "
+                                 "WHERE key = ?", (now, key))
+
+        return CacheEntry(json.loads(row[0]), row[1], row[2], row[3])
+
+    def set(self, key, entry):
+        data = json.dumps(entry.data, separators=(",", ":"))
+        with self._lock:
+            new = self._db.execute("SELECT 1 FROM cache WHERE key = ?",
+                                   (key,)).fetchone() is None
+            self._db.execute("INSERT OR REPLACE INTO cache VALUES "
+                             "(?, ?, ?, ?, ?, ?)",
+                             (key, data, entry.expires, entry.etag,
+                              entry.modified, time.time()))
+            if not new:
+                return
+
+            self._count += 1
+            if self._count > self.maxsize:
+                cursor = self._db.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                    "ORDER BY accessed LIMIT ?)",
+                    (self._count - self.maxsize,))
+                self._count -= cursor.rowcount
+
+    def delete(self, key):
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM cache WHERE key = ?",
+                                      (key,))
+            self._count -= cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM cache")
+            self._count = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
@@ -8,6 +8,12 @@ developers are likely to be :py:class:`~pycardcast.card.BlackCard` and
 :py:class:`~pycardcast.card.WhiteCard`.
 """
 
+import copy
+
+from array import array
+from collections.abc import Sequence
+from datetime import datetime, timezone
+
 from pycardcast.util import isoformat
 from pycardcast import NotFoundError, RetrievalError
 
@@ -21,7 +27,13 @@ class CardRetrievalError(RetrievalError):
 
 
 class Card:
-    """The base card object."""
+    """The base card object.
+
+    Cards compare equal if they are of the same type and all their fields
+    are equal.
+    """
+
+    __slots__ = ("created", "cid", "text")
 
     def __init__(self, created, cid, text):
         """Create a card object.
@@ -39,9 +51,33 @@ class Card:
         self.cid = cid
         self.text = text
 
+    def _key(self):
+        return (self.created, self.cid, self.text)
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash((type(self).__name__,) + self._key())
+
 
 class BlackCard(Card):
-    """A black card object."""
+    """A black card object.
+
+    The text of a black card is kept as a tuple of segments, with a blank
+    between each pair of segments. Use
+    :py:meth:`~pycardcast.card.BlackCard.fill` to fill the blanks in with
+    white cards.
+    """
+
+    __slots__ = ("pick", "segments", "_template")
+
+    blank = "_____"
+    """The string standing in for a blank in the rendered text."""
+
     def __init__(self, created, cid, text, pick=None):
         """Create a blackcard object.
 
@@ -52,40 +88,92 @@ class BlackCard(Card):
             The unique ID of the card.
 
         :param text:
-            The text on the face of the card.
+            The text on the face of the card, either as a sequence of the
+            segments between the blanks, as the API sends it, or as a string
+            with the blanks rendered as :py:attr:`blank`. A sequence passed
+            in is not modified.
 
         :param pick:
-            How many white cards are picked for this card.
+            How many white cards are picked for this card. Defaults to the
+            number of blanks, or 1 if there are none.
         """
-        # Remove blanks
-        if pick is None:
-            self.pick = len(text) - 1
-            if self.pick == 0:
-                # This shouldn't happen...
-                self.pick = 1
+        if isinstance(text, str):
+            segments = tuple(text.split(self.blank))
         else:
-            self.pick = pick
+            segments = tuple(text)
+
+        blanks = len(segments) - 1
+        if pick is None:
+            # A card without blanks takes its answer at the end
+            pick = blanks or 1
 
-        # Avoid "foo?_____" problem
-        if text[-1] == '' and text[-2][-1] != ' ':
-            text.pop()
+        self.pick = pick
+        self.segments = segments
 
-        text = "_____".join(filter(None, text))
+        if blanks and not segments[-1] and not segments[-2].endswith(" "):
+            # Avoid "foo?_____" problem: the answer follows the question
+            text = self.blank.join(segments[:-1])
+        else:
+            text = self.blank.join(segments)
 
         super().__init__(created, cid, text)
 
     @classmethod
-    def from_json(cls, data):
+    def from_json(cls, data, store=None):
         if "calls" in data:
-            return [cls.from_json(c) for c in data["calls"]]
+            return [cls.from_json(c, store) for c in data["calls"]]
 
         if data["id"] == "not_found":
             raise CardNotFoundError(data["message"])
 
+        if store is not None:
+            return store.card(cls, data["created_at"], data["id"],
+                              data["text"])
+
         return cls(isoformat(data["created_at"]), data["id"], data["text"])
 
-    def __hash__(self):
-        return hash((self.pick, self.created, self.cid, self.text)) + 1
+    def _make_template(self):
+        segments = self.segments
+        if (len(segments) > 1 and not segments[-1] and
+                not segments[-2].endswith(" ")):
+            segments = segments[:-1]
+
+        blanks = len(segments) - 1
+        if blanks > self.pick:
+            raise ValueError("Card has {} blanks but only picks {}".format(
+                blanks, self.pick))
+
+        template = "{}".join(s.replace("{", "{{").replace("}", "}}")
+                             for s in segments)
+        # Answers with no blank of their own go at the end
+        template += " {}" * (self.pick - blanks)
+        self._template = template
+        return template
+
+    def fill(self, answers):
+        """Render the card with its blanks filled in.
+
+        :param answers:
+            A sequence of :py:class:`~pycardcast.card.WhiteCard`s or strings,
+            one for each card picked.
+
+        :raises ValueError:
+            If the number of answers is not the card's ``pick``, or the card
+            has more blanks than it picks.
+        """
+        if len(answers) != self.pick:
+            raise ValueError("Expected {} answers, got {}".format(
+                self.pick, len(answers)))
+
+        try:
+            template = self._template
+        except AttributeError:
+            template = self._make_template()
+
+        return template.format(*[getattr(a, "text", a) for a in answers])
+
+    def _key(self):
+        return (self.created, self.cid, self.text, self.pick)
 
     def __repr__(self):
         return "BlackCard(created={}, cid={}, text={}, pick={})".format(
@@ -95,19 +183,189 @@ class BlackCard(Card):
 class WhiteCard(Card):
     """A white card object."""
 
+    __slots__ = ()
+
     @classmethod
-    def from_json(cls, data):
+    def from_json(cls, data, store=None):
         if "responses" in data:
-            return [cls.from_json(c) for c in data["responses"]]
+            return [cls.from_json(c, store) for c in data["responses"]]
 
         if data["id"] == "not_found":
             raise CardNotFoundError(data["message"])
 
-        return cls(isoformat(data["created_at"]), data["id"], data["text"])
+        if store is not None:
+            return store.card(cls, data["created_at"], data["id"],
+                              data["text"])
 
-    def __hash__(self):
-        return hash((self.created, self.cid, self.text)) - 1
+        # Cardcast sends the text as a one-element list
+        text = data["text"]
+        if not isinstance(text, str):
+            text = "".join(text)
+
+        return cls(isoformat(data["created_at"]), data["id"], text)
 
     def __repr__(self):
         return "WhiteCard(created={}, cid={}, text={})".format(
             self.created, self.cid, self.text)
+
+
+class CardList(Sequence):
+    """A read-only list of cards that are only parsed from their JSON when
+    accessed.
+
+    Taking the length, slicing, and sampling with :py:func:`random.sample`
+    only parse the cards actually returned. Each card is parsed at most once:
+    slices share their parsed cards with the list they were taken from.
+    """
+
+    def __init__(self, cls, data, store=None):
+        """Create a card list.
+
+        :param cls:
+            The card class, :py:class:`~pycardcast.card.BlackCard` or
+            :py:class:`~pycardcast.card.WhiteCard`.
+
+        :param data:
+            A list of the cards' JSON objects.
+
+        :param store:
+            A :py:class:`~pycardcast.store.CardStore` to parse the cards
+            through, if any.
+        """
+        self.cls = cls
+        self.store = store
+        self._data = data
+        self._cards = [None] * len(data)
+        # Indexes into _data and _cards of this list's cards
+        self._range = range(len(data))
+
+    def __len__(self):
+        return len(self._range)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            cards = copy.copy(self)
+            cards._range = self._range[index]
+            return cards
+
+        index = self._range[index]
+        card = self._cards[index]
+        if card is None:
+            card = self._cards[index] = self.cls.from_json(self._data[index],
+                                                           self.store)
+
+        return card
+
+    def __eq__(self, other):
+        if isinstance(other, (CardList, list)):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other))
+
+        return NotImplemented
+
+    def __repr__(self):
+        return "CardList(cls={}, len={})".format(self.cls.__name__, len(self))
+
+
+class CardTable(Sequence):
+    """A compact, columnar store for many cards.
+
+    Rather than keeping an object per card, the fields of all cards are kept
+    in parallel arrays: IDs, creation times as UNIX timestamps, and pick
+    counts (0 for white cards). All card text is kept in one string,
+    indexed by the ``offsets`` and ``lengths`` arrays; identical texts are
+    stored once.
+
+    Indexing builds a :py:class:`~pycardcast.card.BlackCard` or
+    :py:class:`~pycardcast.card.WhiteCard` from the stored fields.
+    """
+
+    __slots__ = ("ids", "created", "picks", "offsets", "lengths", "_text",
+                 "_chunks", "_textlen")
+
+    def __init__(self, cards=()):
+        """Create a card table.
+
+        :param cards:
+            An iterable of cards to add to the table.
+        """
+        self.ids = []
+        self.created = array("d")
+        self.picks = array("H")
+        self.offsets = array("L")
+        self.lengths = array("L")
+
+        self._text = ""
+        self._chunks = []
+        self._textlen = 0
+
+        self.extend(cards)
+
+    @classmethod
+    def from_json(cls, data):
+        """Create a card table from card list JSON.
+
+        :param data:
+            The card list JSON, with ``"calls"`` and ``"responses"``.
+        """
+        table = cls(BlackCard.from_json(data))
+        table.extend(WhiteCard.from_json(data))
+        return table
+
+    def append(self, card):
+        """Add a card to the end of the table."""
+        self.extend((card,))
+
+    def extend(self, cards):
+        """Add cards to the end of the table.
+
+        Identical texts within the added cards are only stored once.
+        """
+        spans = {}
+        for card in cards:
+            self._append(card, spans)
+
+    def _append(self, card, spans):
+        text = card.text
+        span = spans.get(text)
+        if span is None:
+            span = spans[text] = (self._textlen, len(text))
+            self._chunks.append(text)
+            self._textlen += len(text)
+
+        self.ids.append(card.cid)
+        self.created.append(card.created.timestamp())
+        self.picks.append(getattr(card, "pick", 0))
+        self.offsets.append(span[0])
+        self.lengths.append(span[1])
+
+    @property
+    def text_blob(self):
+        """All the distinct card text, concatenated."""
+        if self._chunks:
+            self._text += "".join(self._chunks)
+            self._chunks.clear()
+
+        return self._text
+
+    def text(self, index):
+        """Get the text of the card at the given index."""
+        start = self.offsets[index]
+        return self.text_blob[start:start + self.lengths[index]]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CardTable(self[i] for i in range(*index.indices(len(self))))
+
+        created = datetime.fromtimestamp(self.created[index], timezone.utc)
+        pick = self.picks[index]
+        if pick:
+            return BlackCard(created, self.ids[index], self.text(index), pick)
+
+        return WhiteCard(created, self.ids[index], self.text(index))
+
+    def __repr__(self):
+        return "CardTable(len={})".format(len(self))
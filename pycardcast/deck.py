@@ -13,7 +13,7 @@ stores metadata and cards (:py:class:`~pycardcast.deck.Deck`).
 from collections import namedtuple
 
 from pycardcast.util import isoformat
-from pycardcast.card import BlackCard, WhiteCard
+from pycardcast.card import BlackCard, WhiteCard, CardList
 from pycardcast import NotFoundError, RetrievalError
 
 
@@ -34,7 +34,14 @@ class DeckInfoRetrievalError(RetrievalError):
 
 class DeckInfo:
     
-    """The class that stores deck-related metadata."""
+    """The class that stores deck-related metadata.
+
+    Deck infos compare equal if all their fields are equal.
+    """
+
+    __slots__ = ("code", "name", "description", "category", "blackcount",
+                 "whitecount", "blacksample", "whitesample", "unlisted",
+                 "author", "copyright", "created", "updated", "rating")
 
     def __init__(self, code, name, description, category, blackcount,
                  whitecount, blacksample, whitesample, unlisted, author,
@@ -120,12 +127,14 @@ class DeckInfo:
         whitecount = int(data["response_count"])
 
         if "sample_calls" in data:
-            blacksample = BlackCard.from_json(data["sample_calls"])
+            blacksample = [BlackCard.from_json(c)
+                           for c in data["sample_calls"]]
         else:
             blacksample = None
 
         if "sample_responses" in data:
-            whitesample = WhiteCard.from_json(data["sample_responses"])
+            whitesample = [WhiteCard.from_json(c)
+                           for c in data["sample_responses"]]
         else:
             whitesample = None
 
@@ -144,6 +153,16 @@ class DeckInfo:
                    blacksample, whitesample, unlisted, author, copyright,
                    created, updated, rating)
 
+    def __eq__(self, other):
+        if not isinstance(other, DeckInfo):
+            return NotImplemented
+
+        return all(getattr(self, a) == getattr(other, a)
+                   for a in self.__slots__)
+
+    def __hash__(self):
+        return hash((self.code, self.name, self.created, self.updated))
+
     def __repr__(self):
         return ("DeckInfo(code={}, name={}, description={}, category={}, "
                 "blackcount={}, whitecount={}, blacksample={}, "
@@ -168,26 +187,50 @@ class Deck:
 
         :param blackcards:
             A list of :py:class:`~pycardcast.card.BlackCard`s this deck
-            contains.
+            contains, or a :py:class:`~pycardcast.card.CardList` of them.
 
         :param whitecards:
             A list of :py:class:`~pycardcast.card.WhiteCard`s this deck
-            contains.
+            contains, or a :py:class:`~pycardcast.card.CardList` of them.
         """
         self.deckinfo = deckinfo
         self.blackcards = blackcards
         self.whitecards = whitecards
 
     @classmethod
-    def from_json(cls, data_deck, data_cards):
+    def from_json(cls, data_deck, data_cards, lazy=False, store=None):
+        """Create a deck from the JSON for its info and its cards.
+
+        :param data_deck:
+            The deck info JSON.
+
+        :param data_cards:
+            The card list JSON.
+
+        :param lazy:
+            If ``True``, the cards are stored in
+            :py:class:`~pycardcast.card.CardList`s and only parsed when
+            accessed.
+
+        :param store:
+            A :py:class:`~pycardcast.store.CardStore` to parse the cards
+            through, so duplicates of cards already in it are shared.
+        """
         deckinfo = DeckInfo.from_json(data_deck)
+        if lazy:
+            blackcards = CardList(BlackCard, data_cards.get("calls", []),
+                                  store)
+            whitecards = CardList(WhiteCard, data_cards.get("responses", []),
+                                  store)
+            return cls(deckinfo, blackcards, whitecards)
+
         if "calls" in data_cards:
-            blackcards = BlackCard.from_json(data_cards["calls"])
+            blackcards = BlackCard.from_json(data_cards, store)
         else:
             blackcards = []
 
         if "responses" in data_cards:
-            whitecards = WhiteCard.from_json(data_cards["responses"])
+            whitecards = WhiteCard.from_json(data_cards, store)
         else:
             whitecards = []
 
@@ -0,0 +1,187 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Decoders turning API responses into pycardcast objects.
+
+The standard library's json module is always available. When installed,
+`orjson <https://github.com/ijl/orjson>`_ decodes to the same dictionaries
+faster, and `msgspec <https://jcristharif.com/msgspec/>`_ decodes straight
+into typed structs (see :py:mod:`pycardcast.structs`) without building a
+dictionary per object. :py:func:`~pycardcast.decode.get_decoder` picks the
+fastest one installed.
+"""
+
+import json
+
+from pycardcast.card import BlackCard, WhiteCard
+from pycardcast.deck import Deck, DeckInfo
+from pycardcast.search import SearchReturn
+
+
+class Decoder:
+    """A decoder using the standard library's json module.
+
+    Each method takes a response body as bytes or a string.
+    """
+
+    name = "json"
+    """The name of the decoder, as passed to
+    :py:func:`~pycardcast.decode.get_decoder`."""
+
+    def loads(self, data):
+        """Decode JSON into Python objects."""
+        return json.loads(data)
+
+    def deck_info(self, data):
+        """Decode a :py:class:`~pycardcast.deck.DeckInfo`."""
+        return DeckInfo.from_json(self.loads(data))
+
+    def cards(self, data, store=None):
+        """Decode a card list into a tuple of lists of
+        :py:class:`~pycardcast.card.BlackCard`s and
+        :py:class:`~pycardcast.card.WhiteCard`s.
+
+        :param store:
+            A :py:class:`~pycardcast.store.CardStore` to parse the cards
+            through, if any.
+        """
+        data = self.loads(data)
+        if "calls" in data:
+            blackcards = BlackCard.from_json(data, store)
+        else:
+            blackcards = []
+
+        if "responses" in data:
+            whitecards = WhiteCard.from_json(data, store)
+        else:
+            whitecards = []
+
+        return (blackcards, whitecards)
+
+    def search(self, data):
+        """Decode a :py:class:`~pycardcast.search.SearchReturn`."""
+        return SearchReturn.from_json(self.loads(data))
+
+    def deck(self, data_deck, data_cards, store=None):
+        """Decode a :py:class:`~pycardcast.deck.Deck` from its info and card
+        list."""
+        return Deck(self.deck_info(data_deck),
+                    *self.cards(data_cards, store))
+
+    def __repr__(self):
+        return "{}()".format(type(self).__name__)
+
+
+class OrjsonDecoder(Decoder):
+    """A decoder using orjson."""
+
+    name = "orjson"
+
+    def __init__(self):
+        """Initalise the decoder.
+
+        :raises ImportError:
+            If orjson is not installed.
+        """
+        import orjson
+
+        self.loads = orjson.loads
+
+
+class MsgspecDecoder(Decoder):
+    """A decoder using msgspec, decoding into typed structs.
+
+    Responses that don't match the expected schema, such as errors, are
+    decoded as with :py:class:`~pycardcast.decode.Decoder`, so raise the
+    same exceptions.
+    """
+
+    name = "msgspec"
+
+    def __init__(self):
+        """Initalise the decoder.
+
+        :raises ImportError:
+            If msgspec is not installed.
+        """
+        import msgspec
+        from pycardcast import structs
+
+        self.loads = msgspec.json.decode
+        self._structs = structs
+        self._invalid = (msgspec.ValidationError, msgspec.DecodeError)
+        self._deck_info = msgspec.json.Decoder(structs.Deck)
+        self._cards = msgspec.json.Decoder(structs.CardList)
+        self._search = msgspec.json.Decoder(structs.Search)
+
+    def deck_info(self, data):
+        try:
+            deck = self._deck_info.decode(data)
+        except self._invalid:
+            return super().deck_info(data)
+
+        return self._structs.deck_info(deck)
+
+    def cards(self, data, store=None):
+        try:
+            cards = self._cards.decode(data)
+        except self._invalid:
+            return super().cards(data, store)
+
+        black_card = self._structs.black_card
+        white_card = self._structs.white_card
+        return ([black_card(c, store) for c in cards.calls],
+                [white_card(c, store) for c in cards.responses])
+
+    def search(self, data):
+        try:
+            search = self._search.decode(data)
+        except self._invalid:
+            return super().search(data)
+
+        return self._structs.search(search)
+
+
+decoders = {
+    "msgspec": MsgspecDecoder,
+    "orjson": OrjsonDecoder,
+    "json": Decoder,
+}
+"""The decoder classes, by name, fastest first."""
+
+_instances = {}
+
+
+def get_decoder(name=None):
+    """Get a decoder.
+
+    :param name:
+        The name of the decoder, a key of
+        :py:data:`~pycardcast.decode.decoders`. By default, the fastest one
+        whose library is installed.
+
+    :raises ValueError:
+        If there is no decoder with that name.
+
+    :raises ImportError:
+        If the library the named decoder uses is not installed.
+    """
+    if name is None:
+        for name in decoders:
+            try:
+                return get_decoder(name)
+            except ImportError:
+                pass
+
+    decoder = _instances.get(name)
+    if decoder is None:
+        try:
+            cls = decoders[name]
+        except KeyError:
+            raise ValueError("Unknown decoder: {!r}".format(name)) from None
+
+        decoder = _instances[name] = cls()
+
+    return decoder
@@ -0,0 +1,285 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""A local full-text index of decks, for searching decks already retrieved
+without going to the network. The index is stored in SQLite using its FTS5
+extension, either in memory or on disk.
+
+Cardcast asks that users be directed to their website to discover decks (see
+the terms of use in the README); this is meant for searching decks an
+application already uses, not for replacing Cardcast's own search.
+"""
+
+import re
+import sqlite3
+import threading
+
+from pycardcast.deck import Author, Copyright, DeckInfo
+from pycardcast.search import SearchReturn
+from pycardcast.util import isoformat
+
+
+_token_re = re.compile(r"\w+")
+
+
+class DeckIndex:
+
+    """A full-text index of deck metadata and card text."""
+
+    def __init__(self, path=":memory:"):
+        """Initalise the index, creating the database if needed.
+
+        :param path:
+            Path to the database file; by default the index is kept in
+            memory.
+        """
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS decks (
+                code TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                description TEXT,
+                category TEXT NOT NULL,
+                blackcount INTEGER NOT NULL,
+                whitecount INTEGER NOT NULL,
+                unlisted INTEGER NOT NULL,
+                author_name TEXT NOT NULL,
+                -- No declared type, so numeric IDs stay numbers and
+                -- numeric-looking string IDs stay strings
+                author_id NOT NULL,
+                external_copyright INTEGER NOT NULL,
+                copyright_url TEXT,
+                created TEXT NOT NULL,
+                updated TEXT NOT NULL,
+                rating REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS decks_author ON decks (
+                author_name COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS decks_rating ON decks (rating);
+            -- Rows share the rowid of their deck in decks, since FTS5 can
+            -- only look rows up quickly by rowid
+            CREATE VIRTUAL TABLE IF NOT EXISTS decks_fts USING fts5 (
+                name, description, author, cards, prefix='2 3 4'
+            );
+        """)
+
+    def close(self):
+        """Close the database."""
+        self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM decks").fetchone()[0]
+
+    def __contains__(self, code):
+        return self.updated(code) is not None
+
+    def updated(self, code):
+        """Get when the indexed copy of a deck was last updated.
+
+        :param code:
+            The deck code.
+
+        :returns:
+            A ``datetime``, or ``None`` if the deck isn't indexed.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT updated FROM decks WHERE code = ?",
+                                   (code,)).fetchone()
+
+        return None if row is None else isoformat(row[0])
+
+    def add(self, deckinfo, cards=None):
+        """Add a deck to the index, or update it.
+
+        A deck already indexed is only updated if ``deckinfo.updated`` is
+        newer than the indexed copy, or if cards are given.
+
+        :param deckinfo:
+            The :py:class:`~pycardcast.deck.DeckInfo` of the deck.
+
+        :param cards:
+            An iterable of the deck's cards, whose text is indexed too. If
+            ``None``, the card text already indexed for the deck (if any) is
+            kept.
+
+        :returns:
+            Whether the index was changed.
+        """
+        with self._lock:
+            return self._add(deckinfo, cards)
+
+    def add_many(self, deckinfos):
+        """Add many decks to the index in one transaction.
+
+        :param deckinfos:
+            An iterable of :py:class:`~pycardcast.deck.DeckInfo`s, such as
+            the decks of a search.
+
+        :returns:
+            The number of decks added or updated.
+        """
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                changed = sum(self._add(d, None) for d in deckinfos)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+            self._db.execute("COMMIT")
+
+        return changed
+
+    def _add(self, deckinfo, cards):
+        row = self._db.execute("SELECT rowid, updated FROM decks "
+                               "WHERE code = ?", (deckinfo.code,)).fetchone()
+        if (row is not None and cards is None and
+                isoformat(row[1]) >= deckinfo.updated):
+            return False
+
+        text = ""
+        if cards is not None:
+            text = "\n".join(card.text for card in cards)
+
+        if row is not None:
+            if cards is None:
+                old = self._db.execute("SELECT cards FROM decks_fts "
+                                       "WHERE rowid = ?",
+                                       (row[0],)).fetchone()
+                if old is not None:
+                    text = old[0]
+
+            self._db.execute("DELETE FROM decks_fts WHERE rowid = ?",
+                             (row[0],))
+
+        cur = self._db.execute(
+            "INSERT OR REPLACE INTO decks VALUES "
+            "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (deckinfo.code, deckinfo.name, deckinfo.description,
+             deckinfo.category, deckinfo.blackcount, deckinfo.whitecount,
+             deckinfo.unlisted, deckinfo.author.username, deckinfo.author.id,
+             deckinfo.copyright.external, deckinfo.copyright.license,
+             deckinfo.created.isoformat(), deckinfo.updated.isoformat(),
+             deckinfo.rating))
+        self._db.execute("INSERT INTO decks_fts (rowid, name, description, "
+                         "author, cards) VALUES (?, ?, ?, ?, ?)",
+                         (cur.lastrowid, deckinfo.name,
+                          deckinfo.description or "",
+                          deckinfo.author.username, text))
+        return True
+
+    def remove(self, code):
+        """Remove a deck from the index, if present."""
+        with self._lock:
+            row = self._db.execute("SELECT rowid FROM decks WHERE code = ?",
+                                   (code,)).fetchone()
+            if row is None:
+                return
+
+            self._db.execute("DELETE FROM decks WHERE rowid = ?", row)
+            self._db.execute("DELETE FROM decks_fts WHERE rowid = ?", row)
+
+    @staticmethod
+    def _match(text):
+        """Build an FTS query matching every word of the given text, the last
+        one as a prefix."""
+        tokens = _token_re.findall(text)
+        if not tokens:
+            return None
+
+        terms = ['"{}"'.format(t) for t in tokens]
+        terms[-1] += "*"
+        return " AND ".join(terms)
+
+    def search(self, name=None, author=None, category=None, offset=0,
+               limit=50, min_rating=None, unlisted=False):
+        """Search the index.
+
+        :param name:
+            Words to look for in the deck's name, description, author and
+            card text; the last word may be incomplete. Use ``None`` for
+            any.
+
+        :param author:
+            Look for decks by the given author (case-insensitively); use
+            ``None`` for any.
+
+        :param category:
+            Look for decks in the given category; use ``None`` for any.
+
+        :param offset:
+            Offset for pagination of results.
+
+        :param limit:
+            Limit the number of results to this.
+
+        :param min_rating:
+            Only return decks rated at least this highly.
+
+        :param unlisted:
+            Whether to include unlisted decks; ``None`` for only unlisted
+            decks.
+
+        :returns:
+            A :py:class:`~pycardcast.search.SearchReturn` object. The decks
+            in it have no card samples. Decks matching ``name`` are ranked
+            by relevance, then rating; other searches by rating.
+        """
+        joins = ""
+        where = []
+        params = []
+        order = "decks.rating DESC"
+
+        if name is not None:
+            match = self._match(name)
+            if match is not None:
+                joins = "JOIN decks_fts ON decks_fts.rowid = decks.rowid"
+                where.append("decks_fts MATCH ?")
+                params.append(match)
+                order = "bm25(decks_fts, 10.0, 2.0, 4.0, 1.0), " + order
+
+        if author is not None:
+            where.append("decks.author_name = ? COLLATE NOCASE")
+            params.append(author)
+
+        if category is not None:
+            where.append("decks.category = ?")
+            params.append(category)
+
+        if min_rating is not None:
+            where.append("decks.rating >= ?")
+            params.append(min_rating)
+
+        if unlisted is None:
+            where.append("decks.unlisted")
+        elif not unlisted:
+            where.append("NOT decks.unlisted")
+
+        query = "FROM decks {} WHERE {}".format(joins,
+                                                " AND ".join(where) or "1")
+        with self._lock:
+            total = self._db.execute("SELECT COUNT(*) " + query,
+                                     params).fetchone()[0]
+            rows = self._db.execute(
+                "SELECT decks.* {} ORDER BY {}, decks.code "
+                "LIMIT ? OFFSET ?".format(query, order),
+                params + [limit, offset]).fetchall()
+
+        data = [self._deckinfo(row) for row in rows]
+        return SearchReturn(total, len(data), offset, data)
+
+    @staticmethod
+    def _deckinfo(row):
+        (code, name, description, category, blackcount, whitecount, unlisted,
+         author_name, author_id, external_copyright, copyright_url, created,
+         updated, rating) = row
+        return DeckInfo(code, name, description, category, blackcount,
+                        whitecount, None, None, bool(unlisted),
+                        Author(author_name, author_id),
+                        Copyright(bool(external_copyright), copyright_url),
+                        isoformat(created), isoformat(updated), rating)
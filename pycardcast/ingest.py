@@ -0,0 +1,130 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Bulk ingestion of decks, decoding and parsing them in a process pool.
+
+Parsing the JSON of tens of thousands of decks is CPU-bound, so
+:py:func:`~pycardcast.ingest.ingest` downloads the raw responses in threads
+and hands them to worker processes to decode and parse. The cards come
+back as :py:class:`~pycardcast.card.CardTable`s, which pickle to a few
+arrays and one string rather than an object per card.
+"""
+
+import os
+
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+from pycardcast.card import CardTable
+from pycardcast.decode import get_decoder
+from pycardcast.deck import Deck
+from pycardcast.net import DeckResult
+
+
+def parse_deck(data_deck, data_cards, decoder=None):
+    """Decode and parse a deck's raw JSON into a compact, picklable
+    :py:class:`~pycardcast.deck.Deck` whose cards are
+    :py:class:`~pycardcast.card.CardTable`s.
+
+    :param data_deck:
+        The deck info JSON, as bytes or a string.
+
+    :param data_cards:
+        The card list JSON, as bytes or a string.
+
+    :param decoder:
+        The name of the decoder to use, as for
+        :py:func:`~pycardcast.decode.get_decoder`.
+    """
+    decoder = get_decoder(decoder)
+    deck = decoder.deck(data_deck, data_cards)
+    blackcards = CardTable(deck.blackcards)
+    whitecards = CardTable(deck.whitecards)
+
+    # Join the text now, so it pickles as one string
+    blackcards.text_blob
+    whitecards.text_blob
+
+    return Deck(deck.deckinfo, blackcards, whitecards)
+
+
+def ingest(api, codes, processes=None, concurrency=None, max_pending=None,
+           decoder=None):
+    """Download and parse many decks, yielding a
+    :py:class:`~pycardcast.net.DeckResult` for each as it is done.
+
+    Results are yielded in the order they finish. Failures are reported in
+    the results, as for
+    :py:meth:`~pycardcast.net.CardcastAPIBase.decks_many`. To write the
+    decks straight to disk, pass the results to
+    :py:func:`~pycardcast.snapshot.write_snapshot` or
+    :py:meth:`~pycardcast.index.DeckIndex.add` as they come.
+
+    :param api:
+        The :py:class:`~pycardcast.net.requests.CardcastAPI` to download
+        with.
+
+    :param codes:
+        An iterable of deck codes. Repeated codes are only fetched once.
+
+    :param processes:
+        The number of worker processes to parse with; defaults to the
+        number of CPUs.
+
+    :param concurrency:
+        The number of downloads to run at once; defaults to the API's
+        ``max_workers``.
+
+    :param max_pending:
+        The most decks to hold at once, downloading, waiting to be parsed
+        or waiting to be yielded. Downloads stop while this many are
+        pending, which bounds memory use. Defaults to four per process plus
+        ``concurrency``.
+
+    :param decoder:
+        The name of the decoder the workers use, as for
+        :py:func:`~pycardcast.decode.get_decoder`.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if concurrency is None:
+        concurrency = api.max_workers
+    if max_pending is None:
+        max_pending = 4 * processes + concurrency
+
+    codes = iter(api._unique_codes(codes))
+    downloads = ThreadPoolExecutor(concurrency)
+    parsers = ProcessPoolExecutor(processes)
+    # future -> (is a download, code)
+    pending = {}
+    try:
+        while True:
+            while len(pending) < max_pending:
+                code = next(codes, None)
+                if code is None:
+                    break
+
+                pending[downloads.submit(api.deck_bytes, code)] = (True, code)
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                download, code = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield DeckResult(code, None, e)
+                    continue
+
+                if download:
+                    future = parsers.submit(parse_deck, *result, decoder)
+                    pending[future] = (False, code)
+                else:
+                    yield DeckResult(code, result, None)
+    finally:
+        downloads.shutdown(wait=False, cancel_futures=True)
+        parsers.shutdown(wait=False, cancel_futures=True)
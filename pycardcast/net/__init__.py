@@ -4,13 +4,74 @@
 # directory for licensing information.
 
 import abc
+import importlib
+import threading
+import time
 
+from collections import namedtuple
 from urllib.parse import urlencode
 
-from pycardcast.deck import Deck
+from pycardcast.cache import CacheEntry
+from pycardcast.deck import Deck, DeckInfoNotFoundError, DeckInfoRetrievalError
+from pycardcast.decode import get_decoder
+from pycardcast.card import (BlackCard, WhiteCard, CardList,
+                             CardNotFoundError, CardRetrievalError)
+from pycardcast.search import SearchNotFoundError, SearchRetrievalError
+from pycardcast.net.instrument import Instrument
+from pycardcast.net.schedule import Scheduler
 
 
-__all__ = ["aiohttp", "requests"]
+__all__ = ["aiohttp", "bridge", "requests"]
+
+
+backends = {
+    "aiohttp": "pycardcast.net.aiohttp",
+    "bridge": "pycardcast.net.bridge",
+    "requests": "pycardcast.net.requests",
+}
+"""The available backends, by name, and the modules implementing them.
+
+Backend modules, and the HTTP libraries they use, are only imported when
+first used, through :py:func:`~pycardcast.net.get_client` or by accessing
+them as attributes of this package.
+"""
+
+
+def get_client(name, *args, **kwargs):
+    """Create an API object using the named backend, importing it if needed.
+
+    :param name:
+        The name of the backend, a key of
+        :py:data:`~pycardcast.net.backends`, such as ``"requests"``,
+        ``"aiohttp"`` or ``"bridge"``.
+
+    Any other arguments are passed to the backend's ``CardcastAPI``.
+
+    :raises ValueError:
+        If there is no backend with that name.
+
+    :raises ImportError:
+        If the library the backend uses is not installed.
+    """
+    try:
+        module = backends[name]
+    except KeyError:
+        raise ValueError("Unknown backend: {!r}".format(name)) from None
+
+    return importlib.import_module(module).CardcastAPI(*args, **kwargs)
+
+
+def __getattr__(name):
+    if name in backends:
+        return importlib.import_module(backends[name])
+
+    raise AttributeError("module {!r} has no attribute {!r}".format(
+        __name__, name))
+
+
+DeckResult = namedtuple("DeckResult", "code deck error")
+"""The outcome of fetching one deck in a bulk request. Exactly one of
+``deck`` and ``error`` is ``None``."""
 
 
 class CardcastAPIBase(metaclass=abc.ABCMeta):
@@ -31,6 +92,230 @@ class CardcastAPIBase(metaclass=abc.ABCMeta):
     card_list_url = endpoint_url + "/{code}/cards"
     """Endpoint for getting card listings."""
 
+    lazy_cards = False
+    """Whether cards are returned as :py:class:`~pycardcast.card.CardList`s
+    that only parse each card when it is accessed, instead of lists."""
+
+    card_store = None
+    """A :py:class:`~pycardcast.store.CardStore` to parse cards through, so
+    cards shared between decks are only kept once, or ``None``."""
+
+    cache_ttl = {
+        "deck_info": 900,
+        "cards": 900,
+        "search": 300,
+    }
+    """Default number of seconds responses from each endpoint stay fresh in
+    the cache."""
+
+    _errors = {
+        "deck_info": (DeckInfoNotFoundError, "Deck not found: {code}",
+                      DeckInfoRetrievalError, "Error retrieving deck: {code}"),
+        "cards": (CardNotFoundError, "Cards not found: {code}",
+                  CardRetrievalError, "Error retrieving cards: {code}"),
+        "search": (SearchNotFoundError, "Search query returned not found",
+                   SearchRetrievalError, "Error searching decks"),
+    }
+
+    def __init__(self, cache=None, cache_ttl=None, scheduler=None,
+                 instrument=None, decoder=None):
+        """Initalise the API object.
+
+        :param cache:
+            A :py:class:`~pycardcast.cache.Cache` to store responses in, or
+            ``None`` to always go to the network.
+
+        :param cache_ttl:
+            A dictionary overriding the number of seconds responses from the
+            ``"deck_info"``, ``"cards"`` and ``"search"`` endpoints stay
+            fresh in the cache.
+
+        :param scheduler:
+            The :py:class:`~pycardcast.net.schedule.Scheduler` deciding when
+            requests are sent and retried. It may be shared between API
+            objects. By default, each API object has its own scheduler with
+            retries and a circuit breaker but no rate limit.
+
+        :param instrument:
+            The :py:class:`~pycardcast.net.instrument.Instrument` to report
+            timings and events to; by default, one that ignores them.
+
+        :param decoder:
+            The :py:class:`~pycardcast.decode.Decoder` to decode responses
+            with; by default, the fastest installed, as chosen by
+            :py:func:`~pycardcast.decode.get_decoder`.
+        """
+        self.cache = cache
+        self.decoder = get_decoder() if decoder is None else decoder
+        self.scheduler = Scheduler() if scheduler is None else scheduler
+        self.instrument = Instrument() if instrument is None else instrument
+        if cache_ttl is not None:
+            self.cache_ttl = dict(self.cache_ttl, **cache_ttl)
+
+        self.request_count = 0
+        """Number of HTTP round-trips made by this object."""
+
+        self.request_hooks = []
+        """Callables invoked as ``hook(url, params)`` before every HTTP
+        round-trip; useful for instrumentation and tests."""
+
+        self._request_lock = threading.Lock()
+
+    def _request_made(self, url, params=None):
+        """Record an HTTP round-trip to the given URL.
+
+        Backends must call this once per request they send.
+        """
+        with self._request_lock:
+            self.request_count += 1
+
+        for hook in self.request_hooks:
+            hook(url, params)
+
+    def _status_error(self, endpoint, status, code=None):
+        """Create the exception for an unsuccessful response.
+
+        :param endpoint:
+            The endpoint requested: ``"deck_info"``, ``"cards"`` or
+            ``"search"``.
+
+        :param status:
+            The HTTP status code of the response.
+
+        :param code:
+            The deck code requested, if any.
+        """
+        notfound, notfound_msg, error, error_msg = self._errors[endpoint]
+        if status == 404:
+            return notfound(notfound_msg.format(code=code))
+
+        error_msg += " (code {status})"
+        return error(error_msg.format(code=code, status=status))
+
+    def _parse_cards(self, json):
+        """Parse a card list into a tuple of black and white cards."""
+        store = self.card_store
+        if self.lazy_cards:
+            return (CardList(BlackCard, json.get("calls", []), store),
+                    CardList(WhiteCard, json.get("responses", []), store))
+
+        return (BlackCard.from_json(json, store),
+                WhiteCard.from_json(json, store))
+
+    @staticmethod
+    def _search_params(name, author, category, offset, limit):
+        """Build the query string for a search, without unset parameters."""
+        qs = {
+            "search": name,
+            "author": author,
+            "category": category,
+            "offset": offset,
+            "limit": limit,
+        }
+        return {k: v for k, v in qs.items() if v is not None}
+
+    @staticmethod
+    def _cache_key(url, params=None):
+        if params:
+            url += "?" + urlencode(sorted(params.items()))
+
+        return url
+
+    def _cache_lookup(self, endpoint, url, params=None):
+        """Look up a response in the cache.
+
+        :returns:
+            A tuple of the :py:class:`~pycardcast.cache.CacheEntry` (or
+            ``None``) and whether it is fresh. Without a cache, this is
+            always ``(None, False)``.
+        """
+        if self.cache is None:
+            return (None, False)
+
+        entry, fresh = self.cache.lookup(self._cache_key(url, params))
+        self.instrument.cache(endpoint, "hit" if fresh else "miss")
+        return (entry, fresh)
+
+    @staticmethod
+    def _revalidation_headers(entry):
+        """Get the headers to make a request conditional on an expired
+        :py:class:`~pycardcast.cache.CacheEntry` having changed."""
+        headers = {}
+        if entry is not None:
+            if entry.etag is not None:
+                headers["If-None-Match"] = entry.etag
+            if entry.modified is not None:
+                headers["If-Modified-Since"] = entry.modified
+
+        return headers
+
+    def _cache_store(self, endpoint, url, params, data, headers, code=None):
+        """Store a successful response in the cache.
+
+        If a deck's info shows it was updated since its info was last
+        cached, its cached cards are dropped.
+
+        :param endpoint:
+            The endpoint requested.
+
+        :param url:
+            The URL requested.
+
+        :param params:
+            The query parameters of the request, if any.
+
+        :param data:
+            The decoded JSON of the response.
+
+        :param headers:
+            The response headers.
+
+        :param code:
+            The deck code requested, if any.
+        """
+        if self.cache is None:
+            return
+
+        key = self._cache_key(url, params)
+        if endpoint == "deck_info":
+            old = self.cache.get(key)
+            if (old is not None and
+                    old.data.get("updated_at") != data.get("updated_at")):
+                self.forget_cards(code)
+
+        expires = time.time() + self.cache_ttl[endpoint]
+        entry = CacheEntry(data, expires, headers.get("ETag"),
+                           headers.get("Last-Modified"))
+        self.cache.set(key, entry)
+
+    def _cache_revalidated(self, endpoint, url, params, entry):
+        """Renew an expired cache entry the server reported unchanged.
+
+        :returns:
+            The decoded JSON of the entry.
+        """
+        self.cache.revalidated()
+        self.instrument.cache(endpoint, "revalidated")
+        expires = time.time() + self.cache_ttl[endpoint]
+        self.cache.set(self._cache_key(url, params),
+                       entry._replace(expires=expires))
+        return entry.data
+
+    def forget_cards(self, code):
+        """Drop a deck's cards from the cache, if they are cached, so the
+        next request for them goes to the network.
+
+        Cached cards are dropped when a deck's info is fetched and shows it
+        was updated; call this when its update was seen some other way,
+        such as in search results.
+
+        :param code:
+            The deck code.
+        """
+        if self.cache is not None:
+            self.cache.delete(
+                self._cache_key(self.card_list_url.format(code=code)))
+
     @abc.abstractmethod
     def deck_info(self, code):
         """Get the info for the deck with given deck code.
@@ -67,21 +352,49 @@ class CardcastAPIBase(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
     def cards(self, code):
         """Get the black and white cards for the deck with given deck code.
 
+        The cards are retrieved and parsed with a single request.
+
+        :param code:
+            code of the deck to retrieve.
+
+        :returns:
+            A tuple containing :py:class:`~pycardcast.card.BlackCard`s and
+            :py:class:`~pycardcast.card.WhiteCard`s in two lists.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def cards_stream(self, code, chunk_size=65536):
+        """Get the cards for the deck with the given deck code, parsing them
+        as the response arrives.
+
+        Unlike :py:meth:`~pycardcast.net.CardcastAPIBase.cards`, the whole
+        response is never held in memory at once, so this is suitable for
+        very large decks. Responses are neither cached nor coalesced.
+
         :param code:
             code of the deck to retrieve.
 
+        :param chunk_size:
+            Number of bytes of the response to read at a time.
+
         :returns:
-            A tuple containing :py:class:`~pycardcast.card.WhiteCard`s and
-            :py:class:`~pycardcast.card.BlackCard`s in two lists.
+            An iterator of :py:class:`~pycardcast.card.BlackCard`s followed
+            by :py:class:`~pycardcast.card.WhiteCard`s (in the order the
+            server sends them).
         """
-        return (self.white_cards(code), self.black_cards(code))
+        raise NotImplementedError
 
     def deck(self, code):
         """Get the deck with the given deck code.
 
+        This makes one request for the deck info and one for the cards.
+        Backends may override this to make both requests concurrently.
+
         :param code:
             Code of the deck to retrieve.
 
@@ -89,8 +402,39 @@ class CardcastAPIBase(metaclass=abc.ABCMeta):
             A :py:class:`~pycardcast.deck.Deck` object.
         """
         deckinfo = self.deck_info(code)
-        cards = self.cards(code)
-        return Deck(deckinfo, cards[0], cards[1])
+        blackcards, whitecards = self.cards(code)
+        return Deck(deckinfo, blackcards, whitecards)
+
+    @staticmethod
+    def _unique_codes(codes):
+        """Return the given deck codes in order with duplicates removed."""
+        return list(dict.fromkeys(codes))
+
+    def decks_many(self, codes, concurrency=None):
+        """Get many decks, yielding each one as it is retrieved.
+
+        Repeated codes are only fetched once. A failure to fetch one deck does
+        not stop the others from being fetched; it is reported in that deck's
+        result instead.
+
+        This implementation fetches the decks one at a time; backends
+        override it to fetch up to ``concurrency`` decks at once.
+
+        :param codes:
+            An iterable of deck codes to retrieve.
+
+        :param concurrency:
+            Maximum number of decks to fetch at once.
+
+        :returns:
+            An iterator of :py:class:`~pycardcast.net.DeckResult` named
+            tuples, in order of completion.
+        """
+        for code in self._unique_codes(codes):
+            try:
+                yield DeckResult(code, self.deck(code), None)
+            except Exception as e:
+                yield DeckResult(code, None, e)
 
     @abc.abstractmethod
     def search(self, name=None, author=None, category=None, offset=0,
@@ -118,10 +462,13 @@ class CardcastAPIBase(metaclass=abc.ABCMeta):
         raise NotImplementedError
 
     def search_iter(self, name=None, author=None, category=None, offset=0,
-                    limit=deck_list_max):
+                    limit=deck_list_max, max_results=None):
         """Search for decks matching the given parameters.
 
         This is similar to search, but is an iterator of search results.
+        Pages are fetched one at a time; see
+        :py:meth:`~pycardcast.net.CardcastAPIBase.search_crawl` to fetch
+        several at once.
 
         :param name:
             Name of the deck to look for; use ``None`` for any.
@@ -137,11 +484,98 @@ class CardcastAPIBase(metaclass=abc.ABCMeta):
 
         :param limit:
             Limit the number of results in one query to this.
+
+        :param max_results:
+            Stop after this many decks; use ``None`` for no limit.
         """
-        s = self.search(name, author, category, offset, limit)
+        while max_results is None or max_results > 0:
+            page_limit = limit
+            if max_results is not None:
+                page_limit = min(limit, max_results)
+
+            s = self.search(name, author, category, offset, page_limit)
+            if s.count == 0:
+                break
+
+            # The server may return fewer decks than asked for
+            if max_results is not None:
+                max_results -= s.count
 
-        while s.count > 0:
             yield s
 
             offset += s.count
-            s = self.search(name, author, category, offset, limit)
+            if offset >= s.totaldecks:
+                break
+
+    def search_crawl(self, name=None, author=None, category=None, offset=0,
+                     limit=deck_list_max, window=None, max_results=None,
+                     decks=False):
+        """Search for decks matching the given parameters, fetching several
+        pages at once.
+
+        The first page is fetched on its own to learn the number of
+        results; the remaining pages are then fetched concurrently, up to
+        ``window`` at a time, and yielded in order.
+
+        This implementation fetches the pages one at a time; backends
+        override it to fetch them concurrently.
+
+        :param name:
+            Name of the deck to look for; use ``None`` for any.
+
+        :param author:
+            Look for decks by the given author; use ``None`` for any.
+
+        :param category:
+            Look for decks in the given category; use ``None`` for any.
+
+        :param offset:
+            Offset to start at.
+
+        :param limit:
+            Limit the number of results in one query to this.
+
+        :param window:
+            Maximum number of pages to fetch at once.
+
+        :param max_results:
+            Stop after this many decks; use ``None`` for no limit.
+
+        :param decks:
+            If ``True``, yield each :py:class:`~pycardcast.deck.DeckInfo`
+            rather than each :py:class:`~pycardcast.search.SearchReturn`.
+        """
+        pages = self.search_iter(name, author, category, offset, limit,
+                                 max_results)
+        for s in pages:
+            if decks:
+                yield from s.data
+            else:
+                yield s
+
+    @staticmethod
+    def _crawl_pages(first, offset, max_results):
+        """Get the ``(offset, limit)`` of the pages after the first in a
+        crawl.
+
+        :param first:
+            The first :py:class:`~pycardcast.search.SearchReturn` of the
+            crawl. Its size is taken as the page size, since the server may
+            return fewer results than requested.
+
+        :param offset:
+            The offset of the first page.
+
+        :param max_results:
+            The maximum number of results to crawl, or ``None``.
+        """
+        end = first.totaldecks
+        if max_results is not None:
+            end = min(end, offset + max_results)
+
+        step = first.count
+        if step == 0:
+            return []
+
+        return [(o, min(step, end - o))
+                for o in range(offset + step, end, step)]
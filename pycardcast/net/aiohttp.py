@@ -4,120 +4,391 @@
 # directory for licensing information.
 
 import asyncio
+import time
 import aiohttp
 
-from pycardcast.net import CardcastAPIBase
-from pycardcast.deck import (DeckInfo, DeckInfoNotFoundError,
-                             DeckInfoRetrievalError)
-from pycardcast.card import (BlackCard, WhiteCard, CardNotFoundError,
-                             CardRetrievalError)
-from pycardcast.search import (SearchReturn, SearchNotFoundError,
-                               SearchRetrievalError)
+from collections import deque
+from contextlib import asynccontextmanager
+
+from pycardcast.net import CardcastAPIBase, DeckResult
+from pycardcast.net.flight import AsyncSingleFlight
+from pycardcast.net.schedule import retry_statuses
+from pycardcast.stream import aiter_cards
+from pycardcast.deck import Deck, DeckInfo
+from pycardcast.search import SearchReturn
 
 
 class CardcastAPI(CardcastAPIBase):
     """A :py:class:`~pycardcast.net.CardcastAPIBase` implementation using the
     aiohttp library.
 
-    All the methods here are coroutines except for one:
-    :py:meth:`~pycardcast.net.aiohttp.CardcastAPI.search_iter`.
+    All the methods here are coroutines, except for
+    :py:meth:`~pycardcast.net.aiohttp.CardcastAPI.cards_stream`,
+    :py:meth:`~pycardcast.net.aiohttp.CardcastAPI.decks_many`,
+    :py:meth:`~pycardcast.net.aiohttp.CardcastAPI.search_iter` and
+    :py:meth:`~pycardcast.net.aiohttp.CardcastAPI.search_crawl`, which are
+    asynchronous iterators.
+
+    All requests made by an instance go through one
+    :py:class:`aiohttp.ClientSession`, created on first use, so connections
+    to the API are pooled and kept alive between calls. Await
+    :py:meth:`~pycardcast.net.aiohttp.CardcastAPI.close` when done, or use
+    the instance as an asynchronous context manager.
+
+    Identical requests made by several coroutines at once are coalesced into
+    one, whose result they share.
     """
 
-    @asyncio.coroutine
-    def deck_info(self, code):
-        req = yield from aiohttp.request("get", self.deck_info_url.format
-                                         code=code))
-        if req.status == 200:
-            json=yield from req.json()
-            return DeckInfo.from_json(json)
-        elif req.status == 404:
-            err="Deck not found: {}".format(code)
-            raise DeckInfoNotFoundError(err)
-        else:
-            err="Error retrieving deck: {} (code {})".format(code,
-                                                               req.status)
-            raise DeckInfoRetrievalError(err)
-
-    @asyncio.coroutine
-    def white_cards(self, code):
-        req=yield from aiohtp.request("get", self.card_list_url.format(
-            code=code))
-        if req.status == 200:
-            json=yield from req.json()
-            return WhiteCard.from_json(json)
-        elif req.status == 404:
-            err="White cards not found: {}".format(code)
-            raise CardNotFoundError(err)
-        else:
-            err="Error retrieving white cards: {} (code {})".format(
-                code, req.status)
-            raise CardRetrievalError(err)
-
-    @asyncio.coroutine
-    def black_cards(self, code):
-        req = yield from aiohtp.request("get", self.card_list_url.format(
-            code=code))
-        if req.status == 200:
-            json = yield from req.json()
-            return BlackCard.from_json(json)
-        elif req.status == 404:
-            err = "Black cards not found: {}".format(code)
-            raise CardNotFoundError(err)
-        else:
-            err = "Error retrieving black cards: {} (code {})".format(
-                code, req.status)
-            raise CardRetrievalError(err)
-
-    @asyncio.coroutine
-    def cards(self, code):
-        req = yield from aiohtp.request("get", self.card_list_url.format(
-            code=code))
-        if req.status == 200:
-            json = yield from req.json()
-            return (BlackCard.from_json(json), WhiteCard.from_json(json))
-        elif req.status == 404:
-            err = "Cards not found: {}".format(code)
-            raise CardNotFoundError(err)
-        else:
-            err = "Error retrieving cards: {} (code {})".format(code,
-                                                                req.status)
-            raise CardRetrievalError(err)
-
-    @asyncio.coroutine
-    def deck(self, code):
-        deckinfo = yield from self.deck_info(code)
-        cards = yield from self.cards(code)
+    def __init__(self, session=None, limit=100, limit_per_host=10,
+                 keepalive_timeout=15, cache=None, cache_ttl=None,
+                 scheduler=None, instrument=None, decoder=None):
+        """Initalise the API object.
+
+        :param session:
+            An :py:class:`aiohttp.ClientSession` to use instead of creating
+            one. A session passed in is not closed by
+            :py:meth:`~pycardcast.net.aiohttp.CardcastAPI.close`, and the
+            connection parameters below are ignored for it.
+
+        :param limit:
+            Maximum number of simultaneous connections.
+
+        :param limit_per_host:
+            Maximum number of simultaneous connections to one host.
+
+        :param keepalive_timeout:
+            Seconds to keep an idle connection open for reuse.
+
+        :param cache:
+            A :py:class:`~pycardcast.cache.Cache` to store responses in, or
+            ``None`` to always go to the network. Cache operations block, so
+            an on-disk cache should be on fast local storage.
+
+        :param cache_ttl:
+            A dictionary overriding the number of seconds responses from each
+            endpoint stay fresh in the cache; see
+            :py:attr:`~pycardcast.net.CardcastAPIBase.cache_ttl`.
+
+        :param scheduler:
+            The :py:class:`~pycardcast.net.schedule.Scheduler` deciding when
+            requests are sent and retried; by default, one with retries and a
+            circuit breaker but no rate limit.
+
+        :param instrument:
+            The :py:class:`~pycardcast.net.instrument.Instrument` to report
+            timings and events to; by default, one that ignores them.
+
+        :param decoder:
+            The :py:class:`~pycardcast.decode.Decoder` to decode responses
+            with; by default, the fastest installed.
+        """
+        super().__init__(cache, cache_ttl, scheduler, instrument, decoder)
+
+        self._session = session
+        self._owns_session = session is None
+
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+
+        self._flight = AsyncSingleFlight()
+
+    @property
+    def session(self):
+        """The session used for requests. It is created on first use, which
+        must happen inside a running event loop."""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit, limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector)
+
+        return self._session
+
+    async def close(self):
+        """Close the underlying session and its pooled connections."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @asynccontextmanager
+    async def _get(self, endpoint, url, params=None, headers=None):
+        """Send a GET request, waiting for the rate limit and retrying as the
+        scheduler decides.
+
+        The request is reported to the instrument when the context exits,
+        so the time spent reading the body within the context counts as
+        transfer time.
+        """
+        scheduler = self.scheduler
+        instrument = self.instrument
+        timeout = aiohttp.ClientTimeout(total=scheduler.timeout)
+        attempt = 0
+        while True:
+            wait = scheduler.acquire()
+            try:
+                await asyncio.sleep(wait)
+                self._request_made(url, params)
+                start = time.perf_counter()
+                req = await self.session.get(url, params=params,
+                                             headers=headers,
+                                             timeout=timeout)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                instrument.request(endpoint, url, None,
+                                   time.perf_counter() - start, 0.0, 0)
+                delay = scheduler.retry(attempt)
+                if delay is None:
+                    raise
+
+                reason = e
+            except BaseException:
+                scheduler.abort()
+                raise
+            else:
+                connect = time.perf_counter() - start
+                if req.status not in retry_statuses:
+                    scheduler.success()
+                    break
+
+                delay = scheduler.retry(attempt,
+                                        req.headers.get("Retry-After"))
+                if delay is None:
+                    break
+
+                instrument.request(endpoint, url, req.status, connect, 0.0,
+                                   0)
+                req.release()
+                reason = req.status
+
+            instrument.retry(endpoint, url, attempt, delay, reason)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        start = time.perf_counter()
+        try:
+            yield req
+        finally:
+            req.release()
+            instrument.request(endpoint, url, req.status, connect,
+                               time.perf_counter() - start,
+                               req.content.total_bytes)
+
+    async def _get_json(self, endpoint, url, params=None, code=None):
+        """Get the decoded JSON for a request, from the cache if possible.
+
+        :param endpoint:
+            The endpoint requested: ``"deck_info"``, ``"cards"`` or
+            ``"search"``.
+
+        :param url:
+            The URL to request.
+
+        :param params:
+            The query parameters of the request, if any.
+
+        :param code:
+            The deck code requested, if any.
+        """
+        entry, fresh = self._cache_lookup(endpoint, url, params)
+        if fresh:
+            return entry.data
+
+        headers = self._revalidation_headers(entry)
+        async with self._get(endpoint, url, params, headers) as req:
+            status = req.status
+            if status == 304 and entry is not None:
+                return self._cache_revalidated(endpoint, url, params, entry)
+            elif status != 200:
+                raise self._status_error(endpoint, status, code)
+
+            body = await req.read()
+
+        start = time.perf_counter()
+        data = self.decoder.loads(body)
+        self.instrument.decode(endpoint, time.perf_counter() - start)
+        self._cache_store(endpoint, url, params, data, req.headers, code)
+        return data
+
+    async def _get_parsed(self, endpoint, parse, url, params=None, code=None):
+        """Get and parse the JSON for a request, sharing the result with any
+        identical request already in progress.
+
+        :param parse:
+            A function to call on the decoded JSON.
+
+        The other parameters are as for ``_get_json``.
+        """
+        async def get():
+            data = await self._get_json(endpoint, url, params, code)
+            start = time.perf_counter()
+            result = parse(data)
+            self.instrument.parse(endpoint, time.perf_counter() - start)
+            return result
+
+        key = (endpoint, self._cache_key(url, params))
+        start = time.perf_counter()
+        try:
+            return await self._flight.do(key, get)
+        finally:
+            self.instrument.call(endpoint, time.perf_counter() - start)
+
+    async def deck_info(self, code):
+        url = self.deck_info_url.format(code=code)
+        return await self._get_parsed("deck_info", DeckInfo.from_json, url,
+                                      code=code)
+
+    async def white_cards(self, code):
+        return (await self.cards(code))[1]
+
+    async def black_cards(self, code):
+        return (await self.cards(code))[0]
+
+    async def cards(self, code):
+        url = self.card_list_url.format(code=code)
+        return await self._get_parsed("cards", self._parse_cards, url,
+                                      code=code)
+
+    async def cards_stream(self, code, chunk_size=65536):
+        url = self.card_list_url.format(code=code)
+        start = time.perf_counter()
+        try:
+            async with self._get("cards", url) as req:
+                if req.status != 200:
+                    raise self._status_error("cards", req.status, code)
+
+                async for card in aiter_cards(req.content.iter_chunked(
+                        chunk_size)):
+                    yield card
+        finally:
+            self.instrument.call("cards", time.perf_counter() - start)
+
+    async def deck(self, code):
+        deckinfo, cards = await asyncio.gather(self.deck_info(code),
+                                               self.cards(code))
         return Deck(deckinfo, cards[0], cards[1])
 
-    @asyncio.coroutine
-    def search(self, name=None, author=None, category=None, offset=0,
-               limit=None):
-        qs = {
-            "search": name,
-            "author": author,
-            "category": category,
-            "offset": offset,
-            "limit": (deck_list_max if limit is None else limit)
-        }
-        req = yield from aiohtp.request("get", self.deck_list_url, params=qs)
-        if req.status == 200:
-            json = yield from req.json()
-            return SearchReturn.from_json(json)
-        elif req.status == 404:
-            err = "Search query returned not found"
-            raise SearchNotFoundError(err)
-        else:
-            err = "Error searching decks (code {})".format(req.status)
-            raise SearchRetrievalError(err)
-
-    def search_iter(self, name=None, author=None, category=None, offset=0,
-                    limit=None):
-        s = asyncio.run_until_complete(self.search(name, author, category,
-                                                   offset, limit))
-
-        while s.count > 0:
-            yield s
+    async def decks_many(self, codes, concurrency=None):
+        if concurrency is None:
+            concurrency = 10
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(code):
+            async with semaphore:
+                try:
+                    return DeckResult(code, await self.deck(code), None)
+                except Exception as e:
+                    return DeckResult(code, None, e)
+
+        tasks = [asyncio.ensure_future(fetch(code))
+                 for code in self._unique_codes(codes)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def search(self, name=None, author=None, category=None, offset=0,
+                     limit=None):
+        if limit is None:
+            limit = self.deck_list_max
 
+        qs = self._search_params(name, author, category, offset, limit)
+        return await self._get_parsed("search", SearchReturn.from_json,
+                                      self.deck_list_url, qs)
+
+    async def search_iter(self, name=None, author=None, category=None,
+                          offset=0, limit=None, max_results=None):
+        """Search for decks matching the given parameters.
+
+        This is an asynchronous iterator of search result pages. The next
+        page is requested while the current one is being consumed.
+
+        The parameters are the same as for
+        :py:meth:`~pycardcast.net.CardcastAPIBase.search_iter`.
+        """
+        if limit is None:
+            limit = self.deck_list_max
+
+        def next_search():
+            if max_results is None:
+                page_limit = limit
+            elif max_results > 0:
+                page_limit = min(limit, max_results)
+            else:
+                return None
+
+            return asyncio.ensure_future(
+                self.search(name, author, category, offset, page_limit))
+
+        next_page = next_search()
+        while next_page is not None:
+            s = await next_page
+            if s.count == 0:
+                break
+
+            # The server may return fewer decks than asked for
             offset += s.count
-            s = asyncio.run_until_complete(self.search(name, author, category,
-                                                       offset, limit))
+            if max_results is not None:
+                max_results -= s.count
+
+            next_page = next_search() if offset < s.totaldecks else None
+
+            try:
+                yield s
+            except BaseException:
+                # The consumer stopped iterating early
+                if next_page is not None:
+                    next_page.cancel()
+                raise
+
+    async def search_crawl(self, name=None, author=None, category=None,
+                           offset=0, limit=None, window=None,
+                           max_results=None, decks=False):
+        """Search for decks matching the given parameters, fetching several
+        pages at once.
+
+        This is an asynchronous iterator; the parameters are the same as for
+        :py:meth:`~pycardcast.net.CardcastAPIBase.search_crawl`.
+        """
+        if max_results == 0:
+            return
+
+        if limit is None:
+            limit = self.deck_list_max
+        if max_results is not None:
+            limit = min(limit, max_results)
+        if window is None:
+            window = 4
+
+        s = await self.search(name, author, category, offset, limit)
+        pages = iter(self._crawl_pages(s, offset, max_results))
+        pending = deque()
+        try:
+            while True:
+                for page_offset, page_limit in pages:
+                    pending.append(asyncio.ensure_future(self.search(
+                        name, author, category, page_offset, page_limit)))
+                    if len(pending) >= window:
+                        break
+
+                if decks:
+                    for deckinfo in s.data:
+                        yield deckinfo
+                else:
+                    yield s
+
+                if not pending:
+                    break
+
+                s = await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,223 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""A synchronous facade over the asynchronous API, for programs that mix
+threads and asyncio.
+
+:py:class:`~pycardcast.net.bridge.CardcastAPI` runs one asynchronous API
+object on a background event loop. Threads call its blocking methods or
+submit calls for futures, coroutines on other event loops await
+:py:meth:`~pycardcast.net.bridge.CardcastAPI.acall`, and all of them share
+one connection pool, cache and scheduler.
+"""
+
+import asyncio
+import threading
+
+
+class CardcastAPI:
+    """A thread-safe, blocking API that runs an asynchronous API object on
+    a dedicated event loop.
+
+    It has the same methods as the synchronous backends, such as
+    :py:class:`pycardcast.net.requests.CardcastAPI`, so it can be used
+    wherever they can. The methods must not be called from the background
+    loop itself.
+
+    Call :py:meth:`~pycardcast.net.bridge.CardcastAPI.close` when done, or
+    use the instance as a context manager.
+    """
+
+    def __init__(self, api=None, **kwargs):
+        """Initalise the API object, starting its event loop.
+
+        :param api:
+            An asynchronous API object, such as a
+            :py:class:`pycardcast.net.aiohttp.CardcastAPI`, to run. It must
+            not be in use by another event loop, and is not closed by
+            :py:meth:`~pycardcast.net.bridge.CardcastAPI.close`. By default,
+            a :py:class:`pycardcast.net.aiohttp.CardcastAPI` is created,
+            with any other keyword arguments passed to it.
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop,
+                                        name="pycardcast-bridge",
+                                        daemon=True)
+        self._thread.start()
+
+        self._owns_api = api is None
+        if api is None:
+            # Created on the loop, so anything it binds to a loop is bound
+            # to this one
+            api = self._run(self._create(**kwargs))
+
+        self.api = api
+        """The asynchronous API object."""
+
+    @staticmethod
+    async def _create(**kwargs):
+        from pycardcast.net.aiohttp import CardcastAPI
+        return CardcastAPI(**kwargs)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def close(self):
+        """Cancel any calls still running on the event loop, close the
+        asynchronous API object, if it was created by this one, and stop the
+        loop. Closing again does nothing."""
+        if self.loop.is_closed():
+            return
+
+        try:
+            self._run(self._cancel_tasks())
+            if self._owns_api:
+                self._run(self.api.close())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self.loop.close()
+
+    @staticmethod
+    async def _cancel_tasks():
+        """Cancel the tasks left on the loop, such as shared fetches whose
+        callers have gone, and wait for them to finish."""
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _check_loop(self):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        if running is self.loop:
+            raise RuntimeError("Blocking call from the bridge's own event "
+                               "loop would deadlock")
+
+    def _run(self, coro):
+        """Run a coroutine on the event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def _call(self, name, *args, **kwargs):
+        """Call a coroutine method of the asynchronous API object and wait
+        for its result."""
+        self._check_loop()
+        return self.submit(name, *args, **kwargs).result()
+
+    def _iterate(self, name, *args, **kwargs):
+        """Iterate over an asynchronous generator method of the asynchronous
+        API object."""
+        self._check_loop()
+        agen = getattr(self.api, name)(*args, **kwargs)
+        try:
+            while True:
+                try:
+                    item = self._run(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+
+                yield item
+        finally:
+            if not self.loop.is_closed():
+                self._run(agen.aclose())
+
+    def submit(self, name, *args, **kwargs):
+        """Call a coroutine method of the asynchronous API object on the
+        event loop, without waiting for it.
+
+        :param name:
+            The name of the method, such as ``"deck"``.
+
+        Any other arguments are passed to the method.
+
+        :returns:
+            A :py:class:`concurrent.futures.Future` for its result.
+        """
+        coro = getattr(self.api, name)(*args, **kwargs)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def acall(self, name, *args, **kwargs):
+        """Call a coroutine method of the asynchronous API object from any
+        event loop, and wait for its result.
+
+        The parameters are as for
+        :py:meth:`~pycardcast.net.bridge.CardcastAPI.submit`.
+        """
+        method = getattr(self.api, name)
+        if asyncio.get_running_loop() is self.loop:
+            return await method(*args, **kwargs)
+
+        return await asyncio.wrap_future(self.submit(name, *args, **kwargs))
+
+    @property
+    def cache(self):
+        """The asynchronous API object's cache."""
+        return self.api.cache
+
+    @property
+    def cache_ttl(self):
+        """The asynchronous API object's cache TTLs."""
+        return self.api.cache_ttl
+
+    @property
+    def scheduler(self):
+        """The asynchronous API object's scheduler."""
+        return self.api.scheduler
+
+    @property
+    def instrument(self):
+        """The asynchronous API object's instrument."""
+        return self.api.instrument
+
+    @property
+    def request_count(self):
+        """Number of HTTP round-trips made by the asynchronous API
+        object."""
+        return self.api.request_count
+
+    def forget_cards(self, code):
+        self.api.forget_cards(code)
+
+    def deck_info(self, code):
+        return self._call("deck_info", code)
+
+    def white_cards(self, code):
+        return self._call("white_cards", code)
+
+    def black_cards(self, code):
+        return self._call("black_cards", code)
+
+    def cards(self, code):
+        return self._call("cards", code)
+
+    def cards_stream(self, *args, **kwargs):
+        return self._iterate("cards_stream", *args, **kwargs)
+
+    def deck(self, code):
+        return self._call("deck", code)
+
+    def decks_many(self, *args, **kwargs):
+        return self._iterate("decks_many", *args, **kwargs)
+
+    def search(self, name=None, author=None, category=None, offset=0,
+               limit=None):
+        return self._call("search", name, author, category, offset, limit)
+
+    def search_iter(self, *args, **kwargs):
+        return self._iterate("search_iter", *args, **kwargs)
+
+    def search_crawl(self, *args, **kwargs):
+        return self._iterate("search_crawl", *args, **kwargs)
@@ -0,0 +1,108 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Request coalescing ("single-flight"). While a call for a given key is in
+progress, further calls for the same key wait for it and share its result
+instead of making their own.
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    """A call in progress."""
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-safe request coalescing."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """The number of calls in progress."""
+        return len(self._calls)
+
+    def do(self, key, func, *args, **kwargs):
+        """Call ``func(*args, **kwargs)``, unless a call for ``key`` is
+        already in progress, in which case wait for and return its result.
+
+        If the call raises, every caller waiting on it gets the exception.
+
+        :param key:
+            A hashable key identifying the call.
+
+        :param func:
+            The function to call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            call.event.set()
+
+        return call.result
+
+
+class AsyncSingleFlight:
+    """Request coalescing for coroutines running in one event loop."""
+
+    def __init__(self):
+        self._calls = {}
+
+    def __len__(self):
+        """The number of calls in progress."""
+        return len(self._calls)
+
+    async def do(self, key, func, *args, **kwargs):
+        """Await ``func(*args, **kwargs)``, unless a call for ``key`` is
+        already in progress, in which case wait for and return its result.
+
+        If the call raises, every caller waiting on it gets the exception.
+        Cancelling one caller does not cancel the shared call while others
+        are still waiting on it.
+
+        :param key:
+            A hashable key identifying the call.
+
+        :param func:
+            The coroutine function to call.
+        """
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._calls.pop(key, None))
+
+        return await asyncio.shield(future)
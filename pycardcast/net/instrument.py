@@ -0,0 +1,240 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Instrumentation hooks for the network API's. Every API object reports
+what it does to an :py:class:`~pycardcast.net.instrument.Instrument`: the
+timings of each request and of decoding and parsing its response, byte
+counts, cache lookups and retries.
+
+The default :py:class:`~pycardcast.net.instrument.Instrument` does nothing.
+:py:class:`~pycardcast.net.instrument.HistogramInstrument` aggregates
+everything in-process; other implementations can forward the events to a
+tracing or metrics system.
+
+Endpoints are named ``"deck_info"``, ``"cards"`` and ``"search"``.
+"""
+
+import bisect
+import threading
+
+
+class Instrument:
+    """Receives instrumentation events. This implementation ignores them;
+    subclasses override the methods for the events they want."""
+
+    def request(self, endpoint, url, status, connect, transfer, size):
+        """Called after each HTTP request, including ones that are retried.
+
+        :param endpoint:
+            The endpoint requested.
+
+        :param url:
+            The URL requested.
+
+        :param status:
+            The HTTP status of the response, or ``None`` if there was none.
+
+        :param connect:
+            Seconds from sending the request to receiving the response
+            headers, including connecting if needed.
+
+        :param transfer:
+            Seconds spent receiving the response body. For streamed
+            responses, this includes parsing them.
+
+        :param size:
+            Size of the response body in bytes.
+        """
+
+    def decode(self, endpoint, seconds):
+        """Called after decoding a response's JSON.
+
+        :param endpoint:
+            The endpoint requested.
+
+        :param seconds:
+            Seconds spent decoding.
+        """
+
+    def parse(self, endpoint, seconds):
+        """Called after building objects from a response's JSON.
+
+        :param endpoint:
+            The endpoint requested.
+
+        :param seconds:
+            Seconds spent building the objects.
+        """
+
+    def call(self, endpoint, seconds):
+        """Called after each API call completes, successfully or not.
+
+        :param endpoint:
+            The endpoint requested.
+
+        :param seconds:
+            Seconds the call took in total.
+        """
+
+    def cache(self, endpoint, outcome):
+        """Called after each cache lookup.
+
+        :param endpoint:
+            The endpoint requested.
+
+        :param outcome:
+            ``"hit"``, ``"miss"``, or ``"revalidated"`` when the server
+            confirmed an expired entry was unchanged.
+        """
+
+    def retry(self, endpoint, url, attempt, delay, reason):
+        """Called when a request is going to be retried.
+
+        :param endpoint:
+            The endpoint requested.
+
+        :param url:
+            The URL requested.
+
+        :param attempt:
+            The number of the attempt that failed, starting at 0.
+
+        :param delay:
+            Seconds until the retry.
+
+        :param reason:
+            The HTTP status of the failed attempt, or the exception raised.
+        """
+
+
+class Histogram:
+    """A histogram of durations with logarithmic buckets."""
+
+    bounds = tuple(1e-6 * 2 ** i for i in range(28))
+    """Upper bounds of the buckets in seconds, from 1µs to about 2 minutes.
+    Larger values go in one last bucket."""
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """Add a value to the histogram."""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """Estimate a percentile from the buckets.
+
+        :param p:
+            The percentile, between 0 and 100.
+
+        :returns:
+            The upper bound of the bucket containing the percentile, capped
+            at the largest value seen, or ``None`` if the histogram is empty.
+        """
+        if not self.count:
+            return None
+
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                bound = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(bound, self.max)
+
+        return self.max
+
+    def summary(self):
+        """Get a dictionary summarising the histogram."""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+class HistogramInstrument(Instrument):
+    """An instrument that aggregates events in-process into histograms and
+    counters. It is safe to share between threads and API objects."""
+
+    def __init__(self):
+        self.histograms = {}
+        """Dictionary of ``(phase, endpoint)`` to a
+        :py:class:`~pycardcast.net.instrument.Histogram`, where ``phase`` is
+        ``"connect"``, ``"transfer"``, ``"decode"``, ``"parse"`` or
+        ``"call"``."""
+
+        self.counters = {}
+        """Dictionary of ``(name, endpoint)`` to counts, where ``name`` is
+        ``"requests"``, ``"bytes"``, ``"retries"``, or a cache outcome."""
+
+        self._lock = threading.Lock()
+
+    def _observe(self, phase, endpoint, seconds):
+        with self._lock:
+            histogram = self.histograms.get((phase, endpoint))
+            if histogram is None:
+                histogram = self.histograms[(phase, endpoint)] = Histogram()
+
+            histogram.add(seconds)
+
+    def _count(self, name, endpoint, n=1):
+        key = (name, endpoint)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def request(self, endpoint, url, status, connect, transfer, size):
+        self._observe("connect", endpoint, connect)
+        self._observe("transfer", endpoint, transfer)
+        self._count("requests", endpoint)
+        self._count("bytes", endpoint, size)
+
+    def decode(self, endpoint, seconds):
+        self._observe("decode", endpoint, seconds)
+
+    def parse(self, endpoint, seconds):
+        self._observe("parse", endpoint, seconds)
+
+    def call(self, endpoint, seconds):
+        self._observe("call", endpoint, seconds)
+
+    def cache(self, endpoint, outcome):
+        self._count(outcome, endpoint)
+
+    def retry(self, endpoint, url, attempt, delay, reason):
+        self._count("retries", endpoint)
+
+    def summary(self):
+        """Get a dictionary of everything recorded, suitable for encoding as
+        JSON: histogram summaries under ``"timings"`` and counters under
+        ``"counters"``, both keyed by ``"phase.endpoint"``."""
+        with self._lock:
+            return {
+                "timings": {"{}.{}".format(*k): h.summary()
+                            for k, h in self.histograms.items()},
+                "counters": {"{}.{}".format(*k): n
+                             for k, n in self.counters.items()},
+            }
+
+    def reset(self):
+        """Discard everything recorded."""
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
@@ -3,81 +3,404 @@
 # This file is part of the pycardcast project. See LICENSE in the root
 # directory for licensing information.
 
+import threading
+import time
 import requests
 
-from pycardcast.net import CardcastAPIBase
-from pycardcast.deck import (DeckInfo, DeckInfoNotFoundError,
-                             DeckInfoRetrievalError)
-from pycardcast.card import (BlackCard, WhiteCard, CardNotFoundError,
-                             CardRetrievalError)
-from pycardcast.search import (SearchReturn, SearchNotFoundError,
-                               SearchRetrievalError)
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+
+from pycardcast.net import CardcastAPIBase, DeckResult
+from pycardcast.net.flight import SingleFlight
+from pycardcast.net.schedule import retry_statuses
+from pycardcast.stream import CardStreamParser
+from pycardcast.deck import Deck, DeckInfo
+from pycardcast.search import SearchReturn
 
 
 class CardcastAPI(CardcastAPIBase):
     """A :py:class:`~pycardcast.net.CardcastAPIBase` implementation using the
-    requests library."""
+    requests library.
 
-    def deck_info(self, code):
-        req = requests.get(self.deck_info_url.format(code=code))
-        if req.status_code == requests.codes.ok:
-            return DeckInfo.from_json(req.json())
-        elif req.status_code == requests.codes.not_found:
-            err = "Deck not found: {}".format(code)
-            raise DeckInfoNotFoundError(err) from req.raise_for_status()
+    Instances are safe to share between threads. Identical requests made from
+    several threads at once are coalesced into one, whose result they share.
+
+    All requests made by an instance go through one
+    :py:class:`requests.Session`, so connections to the API are pooled and
+    kept alive between calls. Call
+    :py:meth:`~pycardcast.net.requests.CardcastAPI.close` when done, or use
+    the instance as a context manager.
+    """
+
+    def __init__(self, session=None, pool_connections=10, pool_maxsize=10,
+                 pool_block=False, keep_alive=True, max_workers=None,
+                 cache=None, cache_ttl=None, scheduler=None,
+                 instrument=None, decoder=None):
+        """Initalise the API object.
+
+        :param session:
+            A :py:class:`requests.Session` to use instead of creating one.
+            A session passed in is not closed by
+            :py:meth:`~pycardcast.net.requests.CardcastAPI.close`, and the
+            pool parameters below are ignored for it.
+
+        :param pool_connections:
+            Number of per-host connection pools to cache.
+
+        :param pool_maxsize:
+            Maximum number of connections kept alive per host.
+
+        :param pool_block:
+            Whether to block waiting for a free connection when the pool for
+            a host is exhausted, rather than opening a throwaway one.
+
+        :param keep_alive:
+            Whether to keep connections open between requests.
+
+        :param max_workers:
+            Number of threads used for concurrent requests, such as fetching
+            a deck's info and cards at the same time. Defaults to
+            ``pool_maxsize``.
+
+        :param cache:
+            A :py:class:`~pycardcast.cache.Cache` to store responses in, or
+            ``None`` to always go to the network.
+
+        :param cache_ttl:
+            A dictionary overriding the number of seconds responses from each
+            endpoint stay fresh in the cache; see
+            :py:attr:`~pycardcast.net.CardcastAPIBase.cache_ttl`.
+
+        :param scheduler:
+            The :py:class:`~pycardcast.net.schedule.Scheduler` deciding when
+            requests are sent and retried; by default, one with retries and a
+            circuit breaker but no rate limit.
+
+        :param instrument:
+            The :py:class:`~pycardcast.net.instrument.Instrument` to report
+            timings and events to; by default, one that ignores them.
+
+        :param decoder:
+            The :py:class:`~pycardcast.decode.Decoder` to decode responses
+            with; by default, the fastest installed.
+        """
+        super().__init__(cache, cache_ttl, scheduler, instrument, decoder)
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections,
+                                  pool_maxsize=pool_maxsize,
+                                  pool_block=pool_block)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._owns_session = True
         else:
-            err = "Error retrieving deck: {}".format(code)
-            raise DeckInfoRetrievalError(err) from req.raise_for_status()
+            self._owns_session = False
 
-    def white_cards(self, code):
-        req = requests.get(self.card_list_url.format(code=code))
-        if req.status_code == requests.codes.ok:
-            return WhiteCard.from_json(req.json())
-        elif req.status_code == requests.codes.not_found:
-            err = "White cards not found: {}".format(code)
-            raise CardNotFoundError(err) from req.raise_for_status()
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+
+        self.session = session
+
+        self.max_workers = pool_maxsize if max_workers is None else max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+        self._flight = SingleFlight()
+
+    def close(self):
+        """Close the underlying session and its pooled connections."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def executor(self):
+        """The thread pool used for concurrent requests, created on first
+        use."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers)
+
+            return self._executor
+
+    def _get(self, endpoint, url, params=None, headers=None, stream=False):
+        """Send a GET request, waiting for the rate limit and retrying as the
+        scheduler decides.
+
+        Unless ``stream`` is true, the response body is read before
+        returning.
+        """
+        scheduler = self.scheduler
+        instrument = self.instrument
+        attempt = 0
+        while True:
+            wait = scheduler.acquire()
+            try:
+                time.sleep(wait)
+                self._request_made(url, params)
+                start = time.perf_counter()
+                req = self.session.get(url, params=params, headers=headers,
+                                       stream=True,
+                                       timeout=scheduler.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                instrument.request(endpoint, url, None,
+                                   time.perf_counter() - start, 0.0, 0)
+                delay = scheduler.retry(attempt)
+                if delay is None:
+                    raise
+
+                reason = e
+            except BaseException:
+                scheduler.abort()
+                raise
+            else:
+                if req.status_code not in retry_statuses:
+                    scheduler.success()
+                    if stream:
+                        return req
+
+                    return self._read(endpoint, url, req)
+
+                delay = scheduler.retry(attempt,
+                                        req.headers.get("Retry-After"))
+                if delay is None:
+                    return self._read(endpoint, url, req)
+
+                instrument.request(endpoint, url, req.status_code,
+                                   req.elapsed.total_seconds(), 0.0, 0)
+                req.close()
+                reason = req.status_code
+
+            instrument.retry(endpoint, url, attempt, delay, reason)
+            time.sleep(delay)
+            attempt += 1
+
+    def _read(self, endpoint, url, req):
+        """Read the body of a streamed response, reporting the request to the
+        instrument."""
+        start = time.perf_counter()
+        size = len(req.content)
+        self.instrument.request(endpoint, url, req.status_code,
+                                req.elapsed.total_seconds(),
+                                time.perf_counter() - start, size)
+        return req
+
+    def _get_json(self, endpoint, url, params=None, code=None):
+        """Get the decoded JSON for a request, from the cache if possible.
+
+        :param endpoint:
+            The endpoint requested: ``"deck_info"``, ``"cards"`` or
+            ``"search"``.
+
+        :param url:
+            The URL to request.
+
+        :param params:
+            The query parameters of the request, if any.
+
+        :param code:
+            The deck code requested, if any.
+        """
+        entry, fresh = self._cache_lookup(endpoint, url, params)
+        if fresh:
+            return entry.data
+
+        req = self._get(endpoint, url, params,
+                        self._revalidation_headers(entry))
+        if (req.status_code == requests.codes.not_modified and
+                entry is not None):
+            return self._cache_revalidated(endpoint, url, params, entry)
+        elif req.status_code == requests.codes.ok:
+            start = time.perf_counter()
+            json = self.decoder.loads(req.content)
+            self.instrument.decode(endpoint, time.perf_counter() - start)
+            self._cache_store(endpoint, url, params, json, req.headers, code)
+            return json
+
+        self._raise_status(endpoint, req, code)
+
+    def _raise_status(self, endpoint, req, code=None):
+        """Raise the exception for an unsuccessful response."""
+        try:
+            req.raise_for_status()
+        except requests.HTTPError as e:
+            cause = e
         else:
-            err = "Error retrieving white cards: {}".format(code)
-            raise CardRetrievalError(err) from req.raise_for_status()
+            cause = None
+
+        raise self._status_error(endpoint, req.status_code, code) from cause
+
+    def _get_parsed(self, endpoint, parse, url, params=None, code=None):
+        """Get and parse the JSON for a request, sharing the result with any
+        identical request already in progress.
+
+        :param parse:
+            A function to call on the decoded JSON.
+
+        The other parameters are as for ``_get_json``.
+        """
+        def get():
+            json = self._get_json(endpoint, url, params, code)
+            start = time.perf_counter()
+            result = parse(json)
+            self.instrument.parse(endpoint, time.perf_counter() - start)
+            return result
+
+        key = (endpoint, self._cache_key(url, params))
+        start = time.perf_counter()
+        try:
+            return self._flight.do(key, get)
+        finally:
+            self.instrument.call(endpoint, time.perf_counter() - start)
+
+    def deck_info(self, code):
+        url = self.deck_info_url.format(code=code)
+        return self._get_parsed("deck_info", DeckInfo.from_json, url,
+                                code=code)
+
+    def white_cards(self, code):
+        return self.cards(code)[1]
 
     def black_cards(self, code):
-        req = requests.get(self.card_list_url.format(code=code))
-        if req.status_code == requests.codes.ok:
-            return BlackCard.from_json(req.json())
-        elif req.status_code == requests.codes.not_found:
-            err = "Black cards not found: {}".format(code)
-            raise CardNotFoundError(err) from req.raise_for_status()
-        else:
-            err = "Error retrieving black cards: {}".format(code)
-            raise CardRetrievalError(err) from req.raise_for_status()
+        return self.cards(code)[0]
 
     def cards(self, code):
-        req = requests.get(self.card_list_url.format(code=code))
-        if req.status_code == requests.codes.ok:
-            json = req.json()
-            return (BlackCard.from_json(json), WhiteCard.from_json(json))
-        elif req.status_code == requests.codes.not_found:
-            err = "Cards not found: {}".format(code)
-            raise CardNotFoundError(err) from req.raise_for_status()
-        else:
-            err = "Error retrieving cards: {}".format(code)
-            raise CardRetrievalError(err) from req.raise_for_status()
+        url = self.card_list_url.format(code=code)
+        return self._get_parsed("cards", self._parse_cards, url, code=code)
+
+    def cards_stream(self, code, chunk_size=65536):
+        url = self.card_list_url.format(code=code)
+        start = time.perf_counter()
+        try:
+            with self._get("cards", url, stream=True) as req:
+                if req.status_code != requests.codes.ok:
+                    self._read("cards", url, req)
+                    self._raise_status("cards", req, code)
+
+                yield from self._stream_cards(url, req, chunk_size)
+        finally:
+            self.instrument.call("cards", time.perf_counter() - start)
+
+    def _stream_cards(self, url, req, chunk_size):
+        parser = CardStreamParser()
+        size = 0
+        start = time.perf_counter()
+        try:
+            for chunk in req.iter_content(chunk_size):
+                size += len(chunk)
+                yield from parser.feed(chunk)
+
+            yield from parser.close()
+        finally:
+            self.instrument.request("cards", url, req.status_code,
+                                    req.elapsed.total_seconds(),
+                                    time.perf_counter() - start, size)
+
+    def deck(self, code):
+        deckinfo = self.executor.submit(self.deck_info, code)
+        blackcards, whitecards = self.cards(code)
+        return Deck(deckinfo.result(), blackcards, whitecards)
+
+    def deck_bytes(self, code):
+        """Get the undecoded JSON of a deck's info and cards, bypassing the
+        cache, for decoding elsewhere.
+
+        :returns:
+            A tuple of the deck info and card list response bodies, as
+            bytes.
+        """
+        info = self._get_bytes("deck_info", self.deck_info_url.format(
+            code=code), code)
+        cards = self._get_bytes("cards", self.card_list_url.format(code=code),
+                                code)
+        return info, cards
+
+    def _get_bytes(self, endpoint, url, code=None):
+        start = time.perf_counter()
+        try:
+            req = self._get(endpoint, url)
+            if req.status_code != requests.codes.ok:
+                self._raise_status(endpoint, req, code)
+
+            return req.content
+        finally:
+            self.instrument.call(endpoint, time.perf_counter() - start)
+
+    def _deck_result(self, code):
+        try:
+            return DeckResult(code, self.deck(code), None)
+        except Exception as e:
+            return DeckResult(code, None, e)
+
+    def decks_many(self, codes, concurrency=None):
+        if concurrency is None:
+            concurrency = self.max_workers
+
+        # This needs its own pool: deck() waits on work submitted to
+        # self.executor, so running deck() there could deadlock.
+        pool = ThreadPoolExecutor(concurrency)
+        try:
+            futures = [pool.submit(self._deck_result, code)
+                       for code in self._unique_codes(codes)]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
 
     def search(self, name=None, author=None, category=None, offset=0,
                limit=None):
-        qs = {
-            "search": name,
-            "author": author,
-            "category": category,
-            "offset": offset,
-            "limit": (deck_list_max if limit is None else limit)
-        }
-        req = requests.get(self.deck_list_url, params=qs)
-        if req.status_code == requests.codes.ok:
-            return SearchReturn.from_json(req.json())
-        elif req.status_code == requests.codes.not_found:
-            err = "Search query returned not found"
-            raise SearchNotFoundError(err) from req.raise_for_status()
-        else:
-            err = "Error searching decks"
-            raise SearchRetrievalError(err) from req.raise_for_status()
+        if limit is None:
+            limit = self.deck_list_max
+
+        qs = self._search_params(name, author, category, offset, limit)
+        return self._get_parsed("search", SearchReturn.from_json,
+                                self.deck_list_url, qs)
+
+    def search_crawl(self, name=None, author=None, category=None, offset=0,
+                     limit=None, window=None, max_results=None, decks=False):
+        if max_results == 0:
+            return
+
+        if limit is None:
+            limit = self.deck_list_max
+        if max_results is not None:
+            limit = min(limit, max_results)
+        if window is None:
+            window = self.max_workers
+
+        s = self.search(name, author, category, offset, limit)
+        pages = iter(self._crawl_pages(s, offset, max_results))
+        pending = deque()
+        try:
+            while True:
+                for page_offset, page_limit in pages:
+                    pending.append(self.executor.submit(
+                        self.search, name, author, category, page_offset,
+                        page_limit))
+                    if len(pending) >= window:
+                        break
+
+                if decks:
+                    yield from s.data
+                else:
+                    yield s
+
+                if not pending:
+                    break
+
+                s = pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
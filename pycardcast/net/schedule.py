@@ -0,0 +1,316 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Request scheduling for the network API's: client-side rate limiting,
+retries with exponential backoff, and a circuit breaker that stops sending
+requests to a server that keeps failing.
+
+A :py:class:`~pycardcast.net.schedule.Scheduler` only decides how long to
+wait and whether to retry; the backends do the waiting, so one scheduler
+can be shared between threads, event loops and backends.
+"""
+
+import random
+import threading
+import time
+
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from pycardcast import RetrievalError
+
+
+retry_statuses = frozenset((429, 500, 502, 503, 504))
+"""HTTP status codes of responses that are retried."""
+
+
+SchedulerStats = namedtuple("SchedulerStats", "requests retries failures "
+                                              "throttled breaker_trips "
+                                              "rejected")
+"""Counters kept by a :py:class:`~pycardcast.net.schedule.Scheduler`:
+requests sent, retries made, requests that failed after all retries,
+seconds spent waiting on the rate limit or for retries, times the circuit
+breaker opened, and requests rejected by the open breaker."""
+
+
+class CircuitOpenError(RetrievalError):
+    """The circuit breaker is open, so the request was not sent."""
+
+
+class TokenBucket:
+    """A thread-safe token bucket rate limiter."""
+
+    def __init__(self, rate, burst=1):
+        """Initalise the token bucket.
+
+        :param rate:
+            Tokens added per second.
+
+        :param burst:
+            Maximum number of tokens that can accumulate.
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token, going into debt if none are available.
+
+        :returns:
+            The number of seconds to wait before using the token.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+
+            return -self._tokens / self.rate
+
+
+class CircuitBreaker:
+    """A circuit breaker.
+
+    After ``threshold`` consecutive failures, the breaker opens and requests
+    are rejected for ``reset_timeout`` seconds. One request is then let
+    through; if it succeeds, the breaker closes again, otherwise it stays
+    open for another ``reset_timeout``.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30):
+        """Initalise the circuit breaker.
+
+        :param threshold:
+            Number of consecutive failures that opens the breaker.
+
+        :param reset_timeout:
+            Seconds to stay open before letting a request through.
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def open(self):
+        """Whether the breaker is open."""
+        return self._opened is not None
+
+    def allow(self):
+        """Check whether a request may be sent.
+
+        :returns:
+            Whether the request may be sent.
+        """
+        with self._lock:
+            if self._opened is None:
+                return True
+
+            if (not self._probing and
+                    time.monotonic() - self._opened >= self.reset_timeout):
+                self._probing = True
+                return True
+
+            return False
+
+    def success(self):
+        """Record a successful request."""
+        with self._lock:
+            self._failures = 0
+            self._opened = None
+            self._probing = False
+
+    def abort(self):
+        """Record a request that ended without an outcome, such as by being
+        cancelled, so that another request may probe the breaker."""
+        with self._lock:
+            self._probing = False
+
+    def failure(self):
+        """Record a failed request.
+
+        :returns:
+            Whether this failure opened the breaker.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._probing:
+                self._probing = False
+                self._opened = time.monotonic()
+                return False
+
+            if self._opened is None and self._failures >= self.threshold:
+                self._opened = time.monotonic()
+                return True
+
+            return False
+
+
+class Scheduler:
+
+    """Decides when requests are sent and retried."""
+
+    def __init__(self, rate=None, burst=1, retries=3, backoff=0.5,
+                 max_backoff=30, timeout=30, breaker=True):
+        """Initalise the scheduler.
+
+        :param rate:
+            Maximum number of requests per second, or ``None`` for no limit.
+
+        :param burst:
+            Number of requests that may be sent at once before the rate
+            limit applies.
+
+        :param retries:
+            Maximum number of times to retry a request that failed with a
+            connection error, a timeout, or a status in
+            :py:data:`~pycardcast.net.schedule.retry_statuses`.
+
+        :param backoff:
+            Base delay in seconds before the first retry. Each following
+            retry waits up to twice as long as the one before, with full
+            jitter. A ``Retry-After`` header from the server takes priority.
+
+        :param max_backoff:
+            Maximum delay in seconds before a retry.
+
+        :param timeout:
+            Timeout in seconds for each request, or ``None`` for no timeout.
+
+        :param breaker:
+            ``True`` for a default circuit breaker, ``False`` for none, or
+            the :py:class:`~pycardcast.net.schedule.CircuitBreaker` to use.
+        """
+        self.bucket = None if rate is None else TokenBucket(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        if breaker is True:
+            breaker = CircuitBreaker()
+        self.breaker = breaker or None
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+        self._throttled = 0.0
+        self._breaker_trips = 0
+        self._rejected = 0
+
+    @property
+    def stats(self):
+        """A :py:class:`~pycardcast.net.schedule.SchedulerStats` of the
+        scheduler's counters."""
+        return SchedulerStats(self._requests, self._retries, self._failures,
+                              self._throttled, self._breaker_trips,
+                              self._rejected)
+
+    def acquire(self):
+        """Get permission to send a request.
+
+        :returns:
+            The number of seconds to wait before sending it.
+
+        :raises CircuitOpenError:
+            If the circuit breaker is open.
+        """
+        if self.breaker is not None and not self.breaker.allow():
+            with self._lock:
+                self._rejected += 1
+            raise CircuitOpenError("Too many failed requests; not sending "
+                                   "requests for now")
+
+        wait = 0.0 if self.bucket is None else self.bucket.reserve()
+        with self._lock:
+            self._requests += 1
+            self._throttled += wait
+
+        return wait
+
+    @staticmethod
+    def _retry_after(value):
+        """Parse a ``Retry-After`` header into seconds, or ``None``."""
+        if value is None:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        # email.utils is slow to import, and HTTP dates are rare here
+        from email.utils import parsedate_to_datetime
+
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+    def retry(self, attempt, retry_after=None):
+        """Record a failed attempt and decide whether to retry it.
+
+        :param attempt:
+            The number of the attempt that failed, starting at 0.
+
+        :param retry_after:
+            The value of the response's ``Retry-After`` header, if any.
+
+        :returns:
+            The number of seconds to wait before retrying, or ``None`` to
+            give up.
+        """
+        if self.breaker is not None and self.breaker.failure():
+            with self._lock:
+                self._breaker_trips += 1
+
+        if attempt >= self.retries or (self.breaker is not None and
+                                       self.breaker.open):
+            with self._lock:
+                self._failures += 1
+            return None
+
+        delay = self._retry_after(retry_after)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_backoff,
+                                          self.backoff * 2 ** attempt))
+        else:
+            delay = min(delay, self.max_backoff)
+
+        with self._lock:
+            self._retries += 1
+            self._throttled += delay
+
+        return delay
+
+    def success(self):
+        """Record a request that did not need retrying."""
+        if self.breaker is not None:
+            self.breaker.success()
+
+    def abort(self):
+        """Record a request given permission by
+        :py:meth:`~pycardcast.net.schedule.Scheduler.acquire` that ended
+        without a success or a failure, such as by being cancelled or
+        raising an unexpected exception.
+
+        This must be called in that case, or the circuit breaker may stay
+        open forever, waiting for the outcome of its probe.
+        """
+        if self.breaker is not None:
+            self.breaker.abort()
@@ -0,0 +1,352 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Card pools merged from several decks, for dealing cards in games.
+
+A :py:class:`~pycardcast.pool.DeckPool` merges the cards of any number of
+:py:class:`~pycardcast.deck.Deck`s, dropping duplicates, and deals them
+without replacement. Dealing ``k`` cards costs O(k) however large the pool
+is: no list is copied or shuffled per round.
+"""
+
+import random
+import statistics
+
+from array import array
+from collections import Counter, namedtuple
+
+
+DeckStats = namedtuple("DeckStats", "code blackcount whitecount duplicates "
+                                    "picks black_length white_length")
+"""Statistics about one deck in a pool.
+
+``duplicates`` is the number of the deck's cards dropped because an
+earlier deck in the pool had them, ``picks`` a dictionary of pick count to
+number of black cards, and ``black_length`` and ``white_length``
+:py:class:`~pycardcast.pool.LengthStats` of the text of the deck's cards in
+the pool.
+"""
+
+LengthStats = namedtuple("LengthStats", "min max mean median")
+"""Statistics about the length of card text."""
+
+
+def _length_stats(lengths):
+    if not lengths:
+        return LengthStats(0, 0, 0.0, 0.0)
+
+    return LengthStats(min(lengths), max(lengths), statistics.fmean(lengths),
+                       statistics.median(lengths))
+
+
+class Dealer:
+    """Deals the integers ``0`` to ``n - 1`` at random, without replacement.
+
+    This is an incremental Fisher-Yates shuffle: the integers not yet dealt
+    are kept at the front of an array, so dealing ``k`` of them or putting
+    one back costs O(k) or O(1), whatever ``n`` is.
+    """
+
+    __slots__ = ("_order", "_pos", "_left", "rng")
+
+    def __init__(self, n=0, rng=None):
+        """Initalise the dealer.
+
+        :param n:
+            The number of integers to deal.
+
+        :param rng:
+            The :py:class:`random.Random` to use; by default, a new one.
+        """
+        self._order = array("L")
+        self._pos = array("L")
+        self._left = 0
+        self.rng = random.Random() if rng is None else rng
+        self.extend(n)
+
+    def __len__(self):
+        """The number of integers not yet dealt."""
+        return self._left
+
+    @property
+    def size(self):
+        """The number of integers dealt and not yet dealt."""
+        return len(self._order)
+
+    def extend(self, n):
+        """Add ``n`` more integers to deal, after the existing ones."""
+        for i in range(len(self._order), len(self._order) + n):
+            self._order.append(i)
+            self._pos.append(i)
+            self._swap(i, self._left)
+            self._left += 1
+
+    def _swap(self, a, b):
+        order = self._order
+        pos = self._pos
+        x, y = order[a], order[b]
+        order[a], order[b] = y, x
+        pos[x], pos[y] = b, a
+
+    def deal(self, k=1):
+        """Deal ``k`` integers.
+
+        :raises ValueError:
+            If fewer than ``k`` integers are left.
+        """
+        if k > self._left:
+            raise ValueError("Cannot deal {} of {} remaining".format(
+                k, self._left))
+
+        randrange = self.rng.randrange
+        dealt = []
+        for _ in range(k):
+            self._swap(randrange(self._left), self._left - 1)
+            self._left -= 1
+            dealt.append(self._order[self._left])
+
+        return dealt
+
+    def put_back(self, items):
+        """Put dealt integers back, so they can be dealt again.
+
+        :raises ValueError:
+            If an integer has not been dealt.
+        """
+        for i in items:
+            if self._pos[i] < self._left:
+                raise ValueError("{} has not been dealt".format(i))
+
+            self._swap(self._pos[i], self._left)
+            self._left += 1
+
+    def reset(self):
+        """Put all dealt integers back."""
+        self._left = len(self._order)
+
+
+class DeckPool:
+    """Cards merged from several decks.
+
+    Duplicate cards are kept once, in the first deck added that has them.
+    The cards are in the ``black`` and ``white`` lists; the parallel arrays
+    ``black_decks`` and ``white_decks`` hold the index in ``codes`` of the
+    deck each card came from, ``black_lengths`` and ``white_lengths`` the
+    length of each card's text, and ``black_picks`` each black card's pick.
+    """
+
+    def __init__(self, decks=(), dedupe="cid", rng=None):
+        """Initalise the deck pool.
+
+        :param decks:
+            An iterable of :py:class:`~pycardcast.deck.Deck`s to add.
+
+        :param dedupe:
+            What makes cards duplicates: ``"cid"`` for the same card ID, or
+            ``"text"`` for the same text, ignoring case and whitespace.
+
+        :param rng:
+            The :py:class:`random.Random` to deal with; by default, a new
+            one.
+        """
+        if dedupe == "cid":
+            self._card_key = self._cid_key
+        elif dedupe == "text":
+            self._card_key = self._text_key
+        else:
+            raise ValueError("Unknown dedupe mode: {!r}".format(dedupe))
+
+        self.rng = random.Random() if rng is None else rng
+
+        self.codes = []
+        self.black = []
+        self.white = []
+        self.black_decks = array("L")
+        self.white_decks = array("L")
+        self.black_lengths = array("L")
+        self.white_lengths = array("L")
+        self.black_picks = array("H")
+
+        self._duplicates = []
+        self._black_index = {}
+        self._white_index = {}
+        self._white_dealer = Dealer(rng=self.rng)
+        # pick -> (dealer, indexes into self.black)
+        self._black_groups = {}
+        # Position of each black card in its group
+        self._black_slots = array("L")
+
+        for deck in decks:
+            self.add(deck)
+
+    @staticmethod
+    def _cid_key(card):
+        return card.cid
+
+    @staticmethod
+    def _text_key(card):
+        return " ".join(card.text.casefold().split())
+
+    def add(self, deck):
+        """Add a deck's cards to the pool.
+
+        The cards become available to deal straight away.
+        """
+        deckno = len(self.codes)
+        self.codes.append(deck.deckinfo.code)
+        duplicates = 0
+
+        key = self._card_key
+        for card in deck.blackcards:
+            k = key(card)
+            if k in self._black_index:
+                duplicates += 1
+                continue
+
+            index = self._black_index[k] = len(self.black)
+            self.black.append(card)
+            self.black_decks.append(deckno)
+            self.black_lengths.append(len(card.text))
+            self.black_picks.append(card.pick)
+
+            group = self._black_groups.get(card.pick)
+            if group is None:
+                group = self._black_groups[card.pick] = (Dealer(rng=self.rng),
+                                                         array("L"))
+
+            self._black_slots.append(len(group[1]))
+            group[0].extend(1)
+            group[1].append(index)
+
+        for card in deck.whitecards:
+            k = key(card)
+            if k in self._white_index:
+                duplicates += 1
+                continue
+
+            self._white_index[k] = len(self.white)
+            self.white.append(card)
+            self.white_decks.append(deckno)
+            self.white_lengths.append(len(card.text))
+
+        self._white_dealer.extend(len(self.white) - self._white_dealer.size)
+        self._duplicates.append(duplicates)
+
+    @property
+    def white_left(self):
+        """The number of white cards not yet dealt."""
+        return len(self._white_dealer)
+
+    @property
+    def black_left(self):
+        """The number of black cards not yet dealt."""
+        return sum(len(dealer) for dealer, _ in self._black_groups.values())
+
+    def deal_white(self, k):
+        """Deal ``k`` white cards, which are not dealt again until returned
+        with :py:meth:`~pycardcast.pool.DeckPool.return_white`.
+
+        :raises ValueError:
+            If fewer than ``k`` white cards are left.
+        """
+        white = self.white
+        return [white[i] for i in self._white_dealer.deal(k)]
+
+    def return_white(self, cards):
+        """Return dealt white cards to the pool."""
+        index = self._white_index
+        key = self._card_key
+        self._white_dealer.put_back([index[key(card)] for card in cards])
+
+    def deal_black(self, weights=None):
+        """Deal a black card, which is not dealt again until returned with
+        :py:meth:`~pycardcast.pool.DeckPool.return_black`.
+
+        :param weights:
+            A dictionary of pick count to the relative chance of dealing
+            each card with that pick; picks not in it are never dealt. By
+            default, every card is equally likely.
+
+        :raises ValueError:
+            If no black cards that can be dealt are left.
+        """
+        groups = []
+        totals = []
+        total = 0
+        for pick, group in self._black_groups.items():
+            weight = 1 if weights is None else weights.get(pick, 0)
+            if weight > 0 and len(group[0]):
+                total += weight * len(group[0])
+                groups.append(group)
+                totals.append(total)
+
+        if not groups:
+            raise ValueError("No black cards left to deal")
+
+        choice = self.rng.random() * total
+        for group, subtotal in zip(groups, totals):
+            if choice < subtotal:
+                break
+
+        dealer, indexes = group
+        return self.black[indexes[dealer.deal()[0]]]
+
+    def return_black(self, card):
+        """Return a dealt black card to the pool."""
+        index = self._black_index[self._card_key(card)]
+        dealer = self._black_groups[self.black_picks[index]][0]
+        dealer.put_back((self._black_slots[index],))
+
+    def reset(self):
+        """Return all dealt cards to the pool."""
+        self._white_dealer.reset()
+        for dealer, _ in self._black_groups.values():
+            dealer.reset()
+
+    def stats(self):
+        """Get the :py:class:`~pycardcast.pool.DeckStats` of each deck in
+        the pool, in the order they were added."""
+        picks = [Counter() for _ in self.codes]
+        black_lengths = [[] for _ in self.codes]
+        white_lengths = [[] for _ in self.codes]
+
+        for deckno, pick, length in zip(self.black_decks, self.black_picks,
+                                        self.black_lengths):
+            picks[deckno][pick] += 1
+            black_lengths[deckno].append(length)
+
+        for deckno, length in zip(self.white_decks, self.white_lengths):
+            white_lengths[deckno].append(length)
+
+        return [DeckStats(code, len(black_lengths[i]), len(white_lengths[i]),
+                          self._duplicates[i], dict(picks[i]),
+                          _length_stats(black_lengths[i]),
+                          _length_stats(white_lengths[i]))
+                for i, code in enumerate(self.codes)]
+
+    def arrays(self):
+        """Get the pool's index arrays as NumPy arrays, for vectorised
+        analysis.
+
+        Returns a dictionary with the keys ``"black_decks"``,
+        ``"white_decks"``, ``"black_lengths"``, ``"white_lengths"`` and
+        ``"black_picks"``. The arrays are copies, so they are not updated
+        when more decks are added.
+
+        :raises ImportError:
+            If NumPy is not installed.
+        """
+        import numpy
+
+        # Views of the arrays' buffers would stop them growing, making add()
+        # raise BufferError while any view is alive
+        return {name: numpy.frombuffer(getattr(self, name),
+                                       getattr(self, name).typecode).copy()
+                for name in ("black_decks", "white_decks", "black_lengths",
+                             "white_lengths", "black_picks")}
+
+    def __repr__(self):
+        return "DeckPool(decks={}, black={}, white={})".format(
+            len(self.codes), len(self.black), len(self.white))
@@ -0,0 +1,173 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Bulk deck info lookups. A :py:class:`~pycardcast.resolve.DeckInfoResolver`
+fills a table of deck info from search results, which hold up to 50 decks
+each, and answers lookups from it, so looking up many decks costs one
+request per page rather than one per deck.
+"""
+
+import threading
+import time
+
+from collections import namedtuple
+
+
+_Entry = namedtuple("_Entry", "deckinfo fetched")
+
+
+class DeckInfoResolver:
+
+    """Answers deck info lookups from a table filled by search crawls.
+
+    Decks missing from the table, such as unlisted decks, which never appear
+    in searches, or whose entries are stale, are fetched one at a time and
+    added to it.
+
+    This works with the synchronous network API's, such as
+    :py:class:`pycardcast.net.requests.CardcastAPI`. Instances are safe to
+    share between threads.
+    """
+
+    def __init__(self, api, max_age=None, clock=time.monotonic):
+        """Initalise the resolver.
+
+        :param api:
+            The :py:class:`~pycardcast.net.CardcastAPIBase` to search and
+            fetch deck info with.
+
+        :param max_age:
+            Number of seconds an entry answers lookups for before it is
+            fetched again. Defaults to the API's deck info cache TTL; see
+            :py:attr:`~pycardcast.net.CardcastAPIBase.cache_ttl`.
+
+        :param clock:
+            A function returning the current time in seconds.
+        """
+        self.api = api
+        if max_age is None:
+            max_age = api.cache_ttl["deck_info"]
+
+        self.max_age = max_age
+        self.clock = clock
+
+        self.hits = 0
+        """Number of lookups answered from the table."""
+
+        self.fetches = 0
+        """Number of lookups that fetched the deck info."""
+
+        self._table = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._table)
+
+    def __contains__(self, code):
+        return code in self._table
+
+    def add(self, deckinfos):
+        """Add deck info to the table, replacing any entries for the same
+        decks.
+
+        :param deckinfos:
+            An iterable of :py:class:`~pycardcast.deck.DeckInfo`s.
+
+        :returns:
+            The number of entries added or replaced.
+        """
+        now = self.clock()
+        count = 0
+        with self._lock:
+            for deckinfo in deckinfos:
+                self._table[deckinfo.code] = _Entry(deckinfo, now)
+                count += 1
+
+        return count
+
+    def harvest(self, name=None, author=None, category=None, max_results=None,
+                window=None):
+        """Fill the table from a search crawl.
+
+        The arguments are as for
+        :py:meth:`~pycardcast.net.CardcastAPIBase.search_crawl`; by default,
+        every listed deck is crawled.
+
+        :returns:
+            The number of entries added or replaced.
+        """
+        # Each page is added as it arrives, so lookups aren't held up by the
+        # crawl, and each entry is as old as the page it came from
+        count = 0
+        for s in self.api.search_crawl(name, author, category,
+                                       window=window,
+                                       max_results=max_results):
+            count += self.add(s.data)
+
+        return count
+
+    def _lookup(self, code):
+        """Get the fresh table entry for a deck, or ``None``."""
+        entry = self._table.get(code)
+        if entry is None or self.clock() - entry.fetched > self.max_age:
+            return None
+
+        return entry.deckinfo
+
+    def deck_info(self, code):
+        """Get the :py:class:`~pycardcast.deck.DeckInfo` of a deck, from the
+        table if it has a fresh entry, otherwise from the API.
+
+        :raises DeckInfoNotFoundError:
+            If the deck does not exist.
+        """
+        with self._lock:
+            deckinfo = self._lookup(code)
+            if deckinfo is not None:
+                self.hits += 1
+                return deckinfo
+
+            self.fetches += 1
+
+        deckinfo = self.api.deck_info(code)
+        self.add((deckinfo,))
+        return deckinfo
+
+    def deck_infos(self, codes):
+        """Get the :py:class:`~pycardcast.deck.DeckInfo` of many decks.
+
+        :returns:
+            A dictionary of deck codes to their deck info, in the order the
+            codes were given.
+
+        :raises DeckInfoNotFoundError:
+            If a deck does not exist.
+        """
+        return {code: self.deck_info(code) for code in dict.fromkeys(codes)}
+
+    def expire(self):
+        """Remove stale entries from the table.
+
+        :returns:
+            The number of entries removed.
+        """
+        with self._lock:
+            stale = [code for code in self._table
+                     if self._lookup(code) is None]
+            for code in stale:
+                del self._table[code]
+
+        return len(stale)
+
+    def clear(self):
+        """Empty the table."""
+        with self._lock:
+            self._table.clear()
+
+    @property
+    def hit_ratio(self):
+        """The fraction of lookups answered from the table."""
+        total = self.hits + self.fetches
+        return self.hits / total if total else 0.0
@@ -17,6 +17,13 @@ class SearchRetrievalError(RetrievalError):
 
 class SearchReturn:
 
+    """A page of search results.
+
+    Search results compare equal if all their fields are equal.
+    """
+
+    __slots__ = ("totaldecks", "count", "offset", "data")
+
     def __init__(self, totaldecks, count, offset, data):
         self.totaldecks = totaldecks
         self.count = count
@@ -34,7 +41,17 @@ class SearchReturn:
 
         return cls(totaldecks, count, offset, data)
 
+    def __eq__(self, other):
+        if not isinstance(other, SearchReturn):
+            return NotImplemented
+
+        return (self.totaldecks, self.count, self.offset, self.data) == (
+            other.totaldecks, other.count, other.offset, other.data)
+
+    def __hash__(self):
+        return hash((self.totaldecks, self.count, self.offset))
+
     def __repr__(self):
         return ("SearchReturn(totaldecks={}, count={}, offset={}, "
-                "data={}".format(self.totaldecks, self.count, self.offset,
+                "data={})".format(self.totaldecks, self.count, self.offset,
                                  self.data))
@@ -0,0 +1,365 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""A compact binary snapshot format for decks, for loading many decks
+quickly without going to the network.
+
+A snapshot is written with :py:func:`~pycardcast.snapshot.write_snapshot`
+and opened with :py:class:`~pycardcast.snapshot.Snapshot`, which maps the
+file into memory and only decodes the decks and cards that are accessed.
+Since the mapping is read-only, processes forked after opening a snapshot
+share its pages.
+
+The file layout (all integers little-endian) is:
+
+* A header: magic ``b"PCDS"``, format version, deck count, string count, and
+  the offsets of the string table, the string data and the deck table.
+* The string data: every distinct string in the snapshot (card text, IDs,
+  timestamps...) UTF-8 encoded and concatenated. Each is stored once.
+* The string table: ``string count + 1`` 64-bit offsets into the string
+  data; string ``i`` runs from offset ``i`` to offset ``i + 1``.
+* The deck table: a 64-bit file offset for each deck's record.
+* The deck records. Strings are stored as 32-bit indexes into the string
+  table, with ``0xFFFFFFFF`` for ``None``. The text of a black card is
+  stored as its segments, separated by ``"\\x1f"``. An author ID the API
+  gave as a number is stored as its decimal string, with a flag to turn it
+  back into one.
+"""
+
+import mmap
+import os
+import struct
+
+from collections.abc import Sequence
+
+from pycardcast.card import BlackCard, WhiteCard
+from pycardcast.deck import Author, Copyright, Deck, DeckInfo
+from pycardcast.util import isoformat
+
+
+MAGIC = b"PCDS"
+"""The magic number at the start of a snapshot."""
+
+VERSION = 3
+"""The current snapshot format version."""
+
+_NONE = 0xFFFFFFFF
+
+# magic, version, deck count, string count, string table offset, string data
+# offset, deck table offset
+_header = struct.Struct("<4sHxxIIQQQ")
+
+# code, name, description, category, blackcount, whitecount, flags, author
+# username, author id, copyright url, created, updated, rating, black card
+# count, white card count, black sample count, white sample count
+_deck = struct.Struct("<IIIIIIBIIIIIdIIII")
+
+# cid, created, text, pick
+_card = struct.Struct("<IIIH")
+
+_offset = struct.Struct("<Q")
+
+_SEGMENT_SEP = "\x1f"
+
+_UNLISTED = 1
+_EXTERNAL_COPYRIGHT = 2
+_BLACKSAMPLE = 4
+_WHITESAMPLE = 8
+_INT_AUTHOR_ID = 16
+
+
+class SnapshotError(ValueError):
+    """The snapshot is invalid or of an unsupported version."""
+
+
+class _StringTable:
+    """Assigns each distinct string an index, for writing."""
+
+    def __init__(self):
+        self.index = {}
+        self.data = []
+
+    def add(self, s):
+        if s is None:
+            return _NONE
+
+        i = self.index.get(s)
+        if i is None:
+            i = self.index[s] = len(self.data)
+            self.data.append(s.encode("utf-8"))
+
+        return i
+
+
+def _card_record(strings, card):
+    if isinstance(card, BlackCard):
+        text, pick = _SEGMENT_SEP.join(card.segments), card.pick
+    else:
+        text, pick = card.text, 0
+
+    return _card.pack(strings.add(card.cid),
+                      strings.add(card.created.isoformat()),
+                      strings.add(text), pick)
+
+
+def _deck_record(strings, deck):
+    info = deck.deckinfo
+    blacksample = info.blacksample or []
+    whitesample = info.whitesample or []
+
+    flags = 0
+    if info.unlisted:
+        flags |= _UNLISTED
+    if info.copyright.external:
+        flags |= _EXTERNAL_COPYRIGHT
+    if info.blacksample is not None:
+        flags |= _BLACKSAMPLE
+    if info.whitesample is not None:
+        flags |= _WHITESAMPLE
+
+    author_id = info.author.id
+    if isinstance(author_id, int):
+        flags |= _INT_AUTHOR_ID
+        author_id = str(author_id)
+
+    record = [_deck.pack(
+        strings.add(info.code), strings.add(info.name),
+        strings.add(info.description), strings.add(info.category),
+        info.blackcount, info.whitecount, flags,
+        strings.add(info.author.username), strings.add(author_id),
+        strings.add(info.copyright.license),
+        strings.add(info.created.isoformat()),
+        strings.add(info.updated.isoformat()), info.rating,
+        len(deck.blackcards), len(deck.whitecards), len(blacksample),
+        len(whitesample))]
+
+    for cards in (deck.blackcards, deck.whitecards, blacksample,
+                  whitesample):
+        record.extend(_card_record(strings, card) for card in cards)
+
+    return b"".join(record)
+
+
+def write_snapshot(path, decks):
+    """Write decks to a snapshot file.
+
+    The file is written to a temporary name and then renamed, so readers
+    never see a partial snapshot.
+
+    :param path:
+        The path of the snapshot.
+
+    :param decks:
+        An iterable of :py:class:`~pycardcast.deck.Deck`s.
+    """
+    strings = _StringTable()
+    records = [_deck_record(strings, deck) for deck in decks]
+
+    string_offsets = [0]
+    for s in strings.data:
+        string_offsets.append(string_offsets[-1] + len(s))
+
+    string_data_offset = _header.size
+    string_table_offset = string_data_offset + string_offsets[-1]
+    string_table_offset += -string_table_offset % 8
+    deck_table_offset = string_table_offset + 8 * len(string_offsets)
+
+    deck_offsets = []
+    offset = deck_table_offset + 8 * len(records)
+    for record in records:
+        deck_offsets.append(offset)
+        offset += len(record)
+
+    tmp = "{}.tmp{}".format(path, os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(_header.pack(MAGIC, VERSION, len(records), len(strings.data),
+                             string_table_offset, string_data_offset,
+                             deck_table_offset))
+        f.writelines(strings.data)
+        f.write(b"\0" * (string_table_offset - f.tell()))
+        f.write(struct.pack("<{}Q".format(len(string_offsets)),
+                            *string_offsets))
+        f.write(struct.pack("<{}Q".format(len(deck_offsets)), *deck_offsets))
+        f.writelines(records)
+
+    os.replace(tmp, path)
+
+
+class SnapshotCardList(Sequence):
+    """A read-only list of the cards of a deck in a snapshot. Cards are
+    decoded when accessed."""
+
+    def __init__(self, snapshot, cls, offset, count):
+        self._snapshot = snapshot
+        self.cls = cls
+        self._offset = offset
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("card index out of range")
+
+        return self._snapshot._card(self.cls,
+                                    self._offset + index * _card.size)
+
+    def __repr__(self):
+        return "SnapshotCardList(cls={}, len={})".format(self.cls.__name__,
+                                                         len(self))
+
+
+class Snapshot(Sequence):
+    """A snapshot file opened for reading.
+
+    This is a sequence of the :py:class:`~pycardcast.deck.Deck`s in the
+    snapshot, which may also be looked up by code. The decks' cards are
+    :py:class:`~pycardcast.snapshot.SnapshotCardList`s.
+    """
+
+    def __init__(self, path):
+        """Open a snapshot.
+
+        :param path:
+            The path of the snapshot.
+
+        :raises SnapshotError:
+            If the file is not a snapshot, or is of an unsupported version.
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _header.size:
+                raise SnapshotError("Not a snapshot: {}".format(path))
+
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self._deck_count, string_count,
+         self._string_table_offset, self._string_data_offset,
+         self._deck_table_offset) = _header.unpack_from(self._map)
+        if magic != MAGIC:
+            self._map.close()
+            raise SnapshotError("Not a snapshot: {}".format(path))
+        if version != VERSION:
+            self._map.close()
+            raise SnapshotError("Unsupported snapshot version {}: {}".format(
+                version, path))
+
+        self._strings = {}
+        self._codes = None
+
+    def close(self):
+        """Close the snapshot. Decks and cards already decoded remain
+        usable."""
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _string(self, index):
+        if index == _NONE:
+            return None
+
+        s = self._strings.get(index)
+        if s is None:
+            start, end = struct.unpack_from(
+                "<QQ", self._map, self._string_table_offset + 8 * index)
+            start += self._string_data_offset
+            end += self._string_data_offset
+            s = self._strings[index] = self._map[start:end].decode("utf-8")
+
+        return s
+
+    def _card(self, cls, offset):
+        cid, created, text, pick = _card.unpack_from(self._map, offset)
+        cid = self._string(cid)
+        created = isoformat(self._string(created))
+        text = self._string(text)
+        if cls is BlackCard:
+            return BlackCard(created, cid, text.split(_SEGMENT_SEP), pick)
+
+        return WhiteCard(created, cid, text)
+
+    def __len__(self):
+        return self._deck_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if isinstance(index, str):
+            return self.deck(index)
+
+        if index < 0:
+            index += self._deck_count
+        if not 0 <= index < self._deck_count:
+            raise IndexError("deck index out of range")
+
+        return self._deck(self._deck_offset(index))
+
+    def _deck_offset(self, index):
+        return _offset.unpack_from(self._map,
+                                   self._deck_table_offset + 8 * index)[0]
+
+    def codes(self):
+        """Get the codes of the decks in the snapshot, in order."""
+        if self._codes is None:
+            self._codes = {}
+            for i in range(self._deck_count):
+                offset = self._deck_offset(i)
+                code = self._string(_deck.unpack_from(self._map, offset)[0])
+                self._codes[code] = i
+
+        return list(self._codes)
+
+    def deck(self, code):
+        """Get the deck with the given code.
+
+        :raises KeyError:
+            If the deck is not in the snapshot.
+        """
+        self.codes()
+        return self[self._codes[code]]
+
+    def _deck(self, offset):
+        (code, name, description, category, blackcount, whitecount, flags,
+         author_username, author_id, copyright_url, created, updated, rating,
+         nblack, nwhite, nblacksample, nwhitesample) = _deck.unpack_from(
+            self._map, offset)
+
+        offset += _deck.size
+        blackcards = SnapshotCardList(self, BlackCard, offset, nblack)
+        offset += nblack * _card.size
+        whitecards = SnapshotCardList(self, WhiteCard, offset, nwhite)
+        offset += nwhite * _card.size
+
+        blacksample = whitesample = None
+        if flags & _BLACKSAMPLE:
+            blacksample = list(SnapshotCardList(self, BlackCard, offset,
+                                                nblacksample))
+        offset += nblacksample * _card.size
+        if flags & _WHITESAMPLE:
+            whitesample = list(SnapshotCardList(self, WhiteCard, offset,
+                                                nwhitesample))
+
+        s = self._string
+        author_id = s(author_id)
+        if flags & _INT_AUTHOR_ID:
+            author_id = int(author_id)
+
+        deckinfo = DeckInfo(
+            s(code), s(name), s(description), s(category), blackcount,
+            whitecount, blacksample, whitesample, bool(flags & _UNLISTED),
+            Author(s(author_username), author_id),
+            Copyright(bool(flags & _EXTERNAL_COPYRIGHT), s(copyright_url)),
+            isoformat(s(created)), isoformat(s(updated)), rating)
+        return Deck(deckinfo, blackcards, whitecards)
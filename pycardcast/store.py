@@ -0,0 +1,178 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""A store of canonical cards, shared between decks.
+
+Many decks are forks of one another, so the same cards turn up again and
+again. Parsing cards through a :py:class:`~pycardcast.store.CardStore`
+returns one shared object for each distinct card, whose text and creation
+time are themselves shared with every other card that has the same ones.
+"""
+
+import threading
+
+from collections import namedtuple
+
+from pycardcast.card import BlackCard
+from pycardcast.util import isoformat
+
+
+CardStoreStats = namedtuple("CardStoreStats", "lookups cards texts "
+                                              "timestamps")
+"""Statistics about a card store: the number of cards looked up, and the
+number of distinct cards, texts and timestamps stored."""
+
+
+class CardStore:
+    """Maps cards to a canonical object for each distinct card.
+
+    Pass a store to :py:meth:`~pycardcast.card.BlackCard.from_json`,
+    :py:meth:`~pycardcast.card.WhiteCard.from_json` or
+    :py:meth:`~pycardcast.deck.Deck.from_json`, or set it as an API's
+    :py:attr:`~pycardcast.net.CardcastAPIBase.card_store`, to parse cards
+    through it. A card already in the store is returned without being parsed
+    again.
+
+    Stores only grow; call :py:meth:`~pycardcast.store.CardStore.clear` to
+    empty one. Instances are safe to share between threads, as the
+    requests backend's pool threads do when the store is its
+    :py:attr:`~pycardcast.net.CardcastAPIBase.card_store`.
+    """
+
+    def __init__(self, key="cid"):
+        """Initalise the store.
+
+        :param key:
+            What makes cards the same: ``"cid"`` for the same card ID, or
+            ``"text"`` for the same text, ignoring case and whitespace. With
+            ``"cid"``, a card whose text differs from the stored card's, as
+            when it was edited, replaces it. With ``"text"``, a card takes
+            the ID and creation time of the first card stored with its text.
+        """
+        if key not in ("cid", "text"):
+            raise ValueError("Unknown key: {!r}".format(key))
+
+        self.key = key
+        self.lookups = 0
+        self._cards = {}
+        self._texts = {}
+        self._timestamps = {}
+        self._lock = threading.Lock()
+
+    def _card_key(self, cls, cid, text):
+        if self.key == "cid":
+            return (cls, cid)
+
+        if not isinstance(text, str):
+            text = cls.blank.join(text) if cls is BlackCard else "".join(text)
+
+        return (cls, " ".join(text.casefold().split()))
+
+    def text(self, text):
+        """Get the canonical copy of a string."""
+        with self._lock:
+            return self._texts.setdefault(text, text)
+
+    def timestamp(self, timestamp):
+        """Get the canonical ``datetime`` for an ISO 8601 timestamp."""
+        date = self._timestamps.get(timestamp)
+        if date is None:
+            date = isoformat(timestamp)
+            with self._lock:
+                date = self._timestamps.setdefault(timestamp, date)
+
+        return date
+
+    def card(self, cls, created, cid, text):
+        """Get the canonical card for the given fields, creating it if it is
+        not in the store.
+
+        :param cls:
+            The card class, :py:class:`~pycardcast.card.BlackCard` or
+            :py:class:`~pycardcast.card.WhiteCard`.
+
+        :param created:
+            The creation time of the card, as an ISO 8601 timestamp.
+
+        :param cid:
+            The unique ID of the card.
+
+        :param text:
+            The text of the card, as in its JSON.
+        """
+        if cls is not BlackCard and not isinstance(text, str):
+            text = "".join(text)
+
+        key = self._card_key(cls, cid, text)
+        with self._lock:
+            self.lookups += 1
+            old = self._cards.get(key)
+
+        if old is not None and self._current(old, text):
+            return old
+
+        if cls is BlackCard:
+            card = cls(self.timestamp(created), self.text(cid),
+                       [self.text(s) for s in text])
+        else:
+            card = cls(self.timestamp(created), self.text(cid),
+                       self.text(text))
+
+        card.text = self.text(card.text)
+        with self._lock:
+            # Another thread may have stored the card in the meantime
+            old = self._cards.get(key)
+            if old is not None and self._current(old, text):
+                return old
+
+            # If the card was edited since it was stored, decks already
+            # holding the old card keep it
+            self._cards[key] = card
+
+        return card
+
+    def _current(self, card, text):
+        """Check whether a stored card is up to date with the given text, as
+        in its JSON."""
+        if self.key == "text":
+            return True
+
+        if isinstance(card, BlackCard):
+            if isinstance(text, str):
+                text = text.split(card.blank)
+
+            return card.segments == tuple(text)
+
+        return card.text == text
+
+    def __len__(self):
+        return len(self._cards)
+
+    @property
+    def stats(self):
+        """The store's :py:class:`~pycardcast.store.CardStoreStats`."""
+        return CardStoreStats(self.lookups, len(self._cards),
+                              len(self._texts), len(self._timestamps))
+
+    @property
+    def dedup_ratio(self):
+        """The fraction of cards looked up that were duplicates of a card
+        already in the store."""
+        if not self.lookups:
+            return 0.0
+
+        return 1 - len(self._cards) / self.lookups
+
+    def clear(self):
+        """Empty the store and reset its statistics."""
+        with self._lock:
+            self.lookups = 0
+            self._cards.clear()
+            self._texts.clear()
+            self._timestamps.clear()
+
+    def __repr__(self):
+        return ("CardStore(key={}, lookups={}, cards={}, texts={}, "
+                "timestamps={})".format(self.key, *self.stats))
@@ -0,0 +1,223 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Incremental parsing of card list responses. Rather than decoding a whole
+card list and then building the cards, the parser here is fed the response
+body a chunk at a time and builds each card as soon as its JSON is
+complete, so memory use does not grow with the size of the deck.
+"""
+
+import codecs
+import json
+import re
+
+from pycardcast.card import BlackCard, WhiteCard
+
+
+_ws_re = re.compile(r"[ \t\n\r]*")
+
+_card_keys = {
+    "calls": BlackCard,
+    "responses": WhiteCard,
+}
+
+# Parser states
+_START = 0
+_FIRST_KEY = 1
+_KEY = 2
+_COLON = 3
+_VALUE = 4
+_AFTER_VALUE = 5
+_FIRST_ELEMENT = 6
+_ELEMENT = 7
+_AFTER_ELEMENT = 8
+_DONE = 9
+
+
+class _NeedMore(Exception):
+    """More input is needed to continue parsing."""
+
+
+class CardStreamParser:
+    """A push parser for card list JSON.
+
+    Feed it the response body in chunks with
+    :py:meth:`~pycardcast.stream.CardStreamParser.feed`, which returns the
+    cards completed by each chunk, then call
+    :py:meth:`~pycardcast.stream.CardStreamParser.close`.
+
+    Top-level values other than the card lists (such as the ``"id"`` and
+    ``"message"`` of an error response) are collected in
+    :py:attr:`~pycardcast.stream.CardStreamParser.extra`.
+    """
+
+    def __init__(self):
+        self.extra = {}
+        """Top-level values of the response other than the card lists."""
+
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._state = _START
+        self._key = None
+
+    def feed(self, data):
+        """Parse the next chunk of the response.
+
+        :param data:
+            The chunk, as ``bytes`` (UTF-8) or ``str``.
+
+        :returns:
+            A list of the :py:class:`~pycardcast.card.BlackCard`s and
+            :py:class:`~pycardcast.card.WhiteCard`s completed by this chunk.
+        """
+        if isinstance(data, bytes):
+            data = self._utf8.decode(data)
+
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return self._parse()
+
+    def close(self):
+        """Finish parsing.
+
+        :returns:
+            A list of any remaining cards.
+
+        :raises ValueError:
+            If the response was incomplete or malformed.
+        """
+        self._buf = self._buf[self._pos:] + self._utf8.decode(b"", True)
+        self._pos = 0
+        self._eof = True
+        cards = self._parse()
+        if self._state != _DONE:
+            raise ValueError("Truncated card list")
+
+        if self._buf[_ws_re.match(self._buf, self._pos).end():]:
+            raise ValueError("Trailing data after card list")
+
+        return cards
+
+    def _char(self):
+        """Skip whitespace and return the next character without consuming
+        it."""
+        self._pos = _ws_re.match(self._buf, self._pos).end()
+        if self._pos >= len(self._buf):
+            if self._eof:
+                raise ValueError("Truncated card list")
+            raise _NeedMore
+
+        return self._buf[self._pos]
+
+    def _expect(self, chars):
+        c = self._char()
+        if c not in chars:
+            raise ValueError("Expected {!r} at {!r} in card list".format(
+                chars, c))
+
+        self._pos += 1
+        return c
+
+    def _value(self):
+        """Decode the JSON value at the current position."""
+        self._char()
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if self._eof:
+                raise
+            raise _NeedMore
+
+        if end == len(self._buf) and not self._eof:
+            # A number at the end of the buffer may continue in the next
+            # chunk; everything else has a closing delimiter.
+            if isinstance(value, (int, float)):
+                raise _NeedMore
+
+        self._pos = end
+        return value
+
+    def _parse(self):
+        cards = []
+        try:
+            while self._state != _DONE:
+                self._step(cards)
+        except _NeedMore:
+            pass
+
+        return cards
+
+    def _step(self, cards):
+        state = self._state
+        if state == _START:
+            self._expect("{")
+            self._state = _FIRST_KEY
+        elif state in (_FIRST_KEY, _KEY):
+            if state == _FIRST_KEY and self._char() == "}":
+                self._pos += 1
+                self._state = _DONE
+                return
+
+            if self._char() != '"':
+                raise ValueError("Expected key in card list")
+
+            self._key = self._value()
+            self._state = _COLON
+        elif state == _COLON:
+            self._expect(":")
+            self._state = _VALUE
+        elif state == _VALUE:
+            if self._key in _card_keys and self._char() == "[":
+                self._pos += 1
+                self._state = _FIRST_ELEMENT
+            else:
+                self.extra[self._key] = self._value()
+                self._state = _AFTER_VALUE
+        elif state == _AFTER_VALUE:
+            c = self._expect(",}")
+            self._state = _KEY if c == "," else _DONE
+        elif state in (_FIRST_ELEMENT, _ELEMENT):
+            if state == _FIRST_ELEMENT and self._char() == "]":
+                self._pos += 1
+                self._state = _AFTER_VALUE
+                return
+
+            cards.append(_card_keys[self._key].from_json(self._value()))
+            self._state = _AFTER_ELEMENT
+        elif state == _AFTER_ELEMENT:
+            c = self._expect(",]")
+            self._state = _ELEMENT if c == "," else _AFTER_VALUE
+
+
+def iter_cards(chunks):
+    """Parse a card list response incrementally.
+
+    :param chunks:
+        An iterable of chunks of the response body, as ``bytes`` or ``str``.
+
+    :returns:
+        An iterator of :py:class:`~pycardcast.card.BlackCard`s and
+        :py:class:`~pycardcast.card.WhiteCard`s, in the order they appear.
+    """
+    parser = CardStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+
+    yield from parser.close()
+
+
+async def aiter_cards(chunks):
+    """Like :py:func:`~pycardcast.stream.iter_cards`, but for an
+    asynchronous iterable of chunks."""
+    parser = CardStreamParser()
+    async for chunk in chunks:
+        for card in parser.feed(chunk):
+            yield card
+
+    for card in parser.close():
+        yield card
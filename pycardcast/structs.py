@@ -0,0 +1,134 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""`msgspec <https://jcristharif.com/msgspec/>`_ structs mirroring the
+Cardcast API's JSON, used by :py:class:`~pycardcast.decode.MsgspecDecoder`
+to decode responses straight into typed records, without building a
+dictionary per object.
+
+Importing this module requires msgspec.
+"""
+
+from typing import List, Optional, Union
+
+import msgspec
+
+from pycardcast.card import BlackCard, WhiteCard
+from pycardcast.deck import Author, Copyright, DeckInfo
+from pycardcast.search import SearchReturn
+from pycardcast.util import isoformat
+
+
+class Card(msgspec.Struct):
+    """A card. Black card text is a list of the segments between the
+    blanks; white card text is a one-element list or a string."""
+
+    id: str
+    text: Union[str, List[str]]
+    created_at: str
+
+
+class DeckAuthor(msgspec.Struct):
+    """The author of a deck."""
+
+    id: Union[int, str]
+    username: str
+
+
+class Deck(msgspec.Struct):
+    """A deck's info. The API sends the counts and rating as strings."""
+
+    code: str
+    name: str
+    category: str
+    call_count: Union[int, str]
+    response_count: Union[int, str]
+    author: DeckAuthor
+    external_copyright: bool
+    created_at: str
+    updated_at: str
+    rating: Union[float, str]
+    description: Optional[str] = None
+    unlisted: bool = False
+    copyright_holder_url: Optional[str] = None
+    sample_calls: Optional[List[Card]] = None
+    sample_responses: Optional[List[Card]] = None
+
+
+class CardList(msgspec.Struct):
+    """A deck's card list."""
+
+    calls: List[Card] = []
+    responses: List[Card] = []
+
+
+class SearchResults(msgspec.Struct):
+    """A page of search results."""
+
+    count: int
+    offset: int
+    data: List[Deck]
+
+
+class Search(msgspec.Struct):
+    """A search response."""
+
+    total: int
+    results: SearchResults
+
+
+def black_card(card, store=None):
+    """Make a :py:class:`~pycardcast.card.BlackCard` from a
+    :py:class:`Card`, through a :py:class:`~pycardcast.store.CardStore` if
+    given."""
+    if store is not None:
+        return store.card(BlackCard, card.created_at, card.id, card.text)
+
+    return BlackCard(isoformat(card.created_at), card.id, card.text)
+
+
+def white_card(card, store=None):
+    """Make a :py:class:`~pycardcast.card.WhiteCard` from a
+    :py:class:`Card`, through a :py:class:`~pycardcast.store.CardStore` if
+    given."""
+    if store is not None:
+        return store.card(WhiteCard, card.created_at, card.id, card.text)
+
+    text = card.text
+    if not isinstance(text, str):
+        text = "".join(text)
+
+    return WhiteCard(isoformat(card.created_at), card.id, text)
+
+
+def deck_info(deck):
+    """Make a :py:class:`~pycardcast.deck.DeckInfo` from a
+    :py:class:`Deck`."""
+    if deck.sample_calls is None:
+        blacksample = None
+    else:
+        blacksample = [black_card(c) for c in deck.sample_calls]
+
+    if deck.sample_responses is None:
+        whitesample = None
+    else:
+        whitesample = [white_card(c) for c in deck.sample_responses]
+
+    return DeckInfo(deck.code, deck.name, deck.description, deck.category,
+                    int(deck.call_count), int(deck.response_count),
+                    blacksample, whitesample, deck.unlisted,
+                    Author(deck.author.username, deck.author.id),
+                    Copyright(deck.external_copyright,
+                              deck.copyright_holder_url),
+                    isoformat(deck.created_at), isoformat(deck.updated_at),
+                    float(deck.rating))
+
+
+def search(search):
+    """Make a :py:class:`~pycardcast.search.SearchReturn` from a
+    :py:class:`Search`."""
+    results = search.results
+    return SearchReturn(search.total, results.count, results.offset,
+                        [deck_info(d) for d in results.data])
@@ -0,0 +1,201 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+"""Incremental mirroring of decks. A :py:class:`~pycardcast.sync.DeckSync`
+keeps a manifest of when each mirrored deck was last updated, and on each
+sync only downloads the cards of decks that changed since.
+"""
+
+import json
+import os
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from pycardcast import NotFoundError
+from pycardcast.deck import Deck
+
+
+SyncReport = namedtuple("SyncReport", "added changed removed unchanged "
+                                      "failed")
+"""The outcome of a sync. ``added``, ``changed``, ``removed`` and
+``unchanged`` are lists of deck codes; ``failed`` is a dictionary of deck
+codes to the exception raised while syncing them."""
+
+
+class DeckSync:
+
+    """Keeps a mirror of a set of decks up to date.
+
+    This works with the synchronous network API's, such as
+    :py:class:`pycardcast.net.requests.CardcastAPI`.
+    """
+
+    def __init__(self, api, manifest_path=None, on_deck=None,
+                 on_remove=None, concurrency=8):
+        """Initalise the sync engine.
+
+        :param api:
+            The :py:class:`~pycardcast.net.CardcastAPIBase` to fetch decks
+            with.
+
+        :param manifest_path:
+            Path of a JSON file to load the manifest from and save it to
+            after each sync. If ``None``, the manifest is only kept in
+            memory.
+
+        :param on_deck:
+            Called with each :py:class:`~pycardcast.deck.Deck` that was
+            added or changed, to store it. It is called from the thread that
+            called :py:meth:`~pycardcast.sync.DeckSync.sync`, one deck at a
+            time, though the decks are fetched concurrently. If it raises an
+            exception, the deck is reported as failed.
+
+        :param on_remove:
+            Called with the code of each deck that was removed, from the
+            thread that called :py:meth:`~pycardcast.sync.DeckSync.sync`.
+
+        :param concurrency:
+            Maximum number of requests to make at once.
+        """
+        self.api = api
+        self.manifest_path = manifest_path
+        self.on_deck = on_deck
+        self.on_remove = on_remove
+        self.concurrency = concurrency
+
+        self.manifest = {}
+        """A dictionary of deck codes to the ISO 8601 time each mirrored deck
+        was last updated."""
+
+        if manifest_path is not None and os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def save(self):
+        """Save the manifest, if it has a path."""
+        if self.manifest_path is None:
+            return
+
+        tmp = "{}.tmp{}".format(self.manifest_path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=0, sort_keys=True)
+
+        os.replace(tmp, self.manifest_path)
+
+    def _infos_from_search(self, codes, search):
+        """Collect deck info for the given codes from a search crawl,
+        stopping once all have been seen."""
+        infos = {}
+        for deckinfo in self.api.search_crawl(decks=True, **search):
+            if deckinfo.code in codes:
+                infos[deckinfo.code] = deckinfo
+                if len(infos) == len(codes):
+                    break
+
+        return infos
+
+    def _sync_one(self, code, deckinfo):
+        """Fetch one deck, if it changed.
+
+        :returns:
+            The :py:class:`~pycardcast.deck.Deck`, or ``None`` if it is
+            unchanged.
+        """
+        if deckinfo is None:
+            deckinfo = self.api.deck_info(code)
+
+        updated = deckinfo.updated.isoformat()
+        if self.manifest.get(code) == updated:
+            return None
+
+        # Deck info from a search never passes through the API's deck info
+        # cache, which would have dropped cached cards made stale by the
+        # update
+        self.api.forget_cards(code)
+        blackcards, whitecards = self.api.cards(code)
+        return Deck(deckinfo, blackcards, whitecards)
+
+    def sync(self, codes=None, search=None):
+        """Sync the mirror.
+
+        Deck info is taken from a search crawl where possible, then fetched
+        for each remaining deck; cards are only fetched for decks that are
+        new or were updated since the last sync.
+
+        :param codes:
+            The codes of the decks to mirror. Decks in the manifest but not
+            given here are removed. If ``None``, the decks already in the
+            manifest are synced.
+
+        :param search:
+            If not ``None``, a dictionary of keyword arguments for
+            :py:meth:`~pycardcast.net.CardcastAPIBase.search_crawl` (such as
+            ``{"author": "someone"}``, or ``{}`` for every listed deck),
+            whose results are used for deck info instead of fetching it per
+            deck.
+
+        :returns:
+            A :py:class:`~pycardcast.sync.SyncReport`.
+        """
+        if codes is None:
+            codes = list(self.manifest)
+        else:
+            codes = list(dict.fromkeys(codes))
+
+        report = SyncReport([], [], [], [], {})
+        wanted = set(codes)
+        for code in list(self.manifest):
+            if code not in wanted:
+                del self.manifest[code]
+                report.removed.append(code)
+
+        infos = {}
+        if search is not None:
+            infos = self._infos_from_search(wanted, search)
+
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            futures = [(code, pool.submit(self._sync_one, code,
+                                          infos.get(code)))
+                       for code in codes]
+            for code, future in futures:
+                try:
+                    deck = future.result()
+                except NotFoundError as e:
+                    if code in self.manifest:
+                        # The deck was deleted upstream
+                        del self.manifest[code]
+                        report.removed.append(code)
+                    else:
+                        report.failed[code] = e
+                    continue
+                except Exception as e:
+                    report.failed[code] = e
+                    continue
+
+                if deck is None:
+                    report.unchanged.append(code)
+                    continue
+
+                if self.on_deck is not None:
+                    try:
+                        self.on_deck(deck)
+                    except Exception as e:
+                        report.failed[code] = e
+                        continue
+
+                if code in self.manifest:
+                    report.changed.append(code)
+                else:
+                    report.added.append(code)
+
+                self.manifest[code] = deck.deckinfo.updated.isoformat()
+
+        if self.on_remove is not None:
+            for code in report.removed:
+                self.on_remove(code)
+
+        self.save()
+        return report
@@ -3,12 +3,60 @@
 # This file is part of the pycardcast project. See LICENSE in the root
 # directory for licensing information.
 
-from datetime import datetime
+import re
 
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
+
+_iso_re = re.compile(r"(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d)(?::(\d\d)"
+                     r"(?:[.,](\d+))?)?(Z|[+-]\d\d(?::?\d\d)?)?$")
+
+
+def _isoformat_slow(date):
+    """Parse the ISO 8601 forms ``datetime.fromisoformat`` rejects on older
+    Pythons, such as fractions that aren't 3 or 6 digits long."""
+    m = _iso_re.match(date)
+    if m is None:
+        raise ValueError("Invalid ISO 8601 timestamp: {!r}".format(date))
+
+    year, month, day, hour, minute, second, fraction, offset = m.groups()
+    microsecond = int((fraction or "0")[:6].ljust(6, "0"))
+    if offset is None:
+        tz = None
+    elif offset == "Z":
+        tz = timezone.utc
+    else:
+        sign = -1 if offset[0] == "-" else 1
+        offset = offset[1:].replace(":", "")
+        delta = timedelta(hours=int(offset[:2]), minutes=int(offset[2:] or 0))
+        tz = timezone(sign * delta)
+
+    return datetime(int(year), int(month), int(day), int(hour), int(minute),
+                    int(second or 0), microsecond, tz)
+
+
+@lru_cache(maxsize=256)
 def isoformat(date):
 
-    """Small, unpedantic ISO format parser (as used by Cardcast)."""
+    """Small, unpedantic ISO format parser (as used by Cardcast).
+
+    Any UTC offset and fractional seconds are accepted. The result is always
+    timezone-aware; timestamps without an offset are taken to be in UTC.
+    The most recent results are memoised, as cards added to a deck together
+    share timestamps; a :py:class:`~pycardcast.store.CardStore` shares every
+    distinct timestamp it parses.
+    """
+
+    if date.endswith("Z"):
+        date = date[:-1] + "+00:00"
+
+    try:
+        dt = datetime.fromisoformat(date)
+    except ValueError:
+        dt = _isoformat_slow(date)
+
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
 
-    assert date.endswith("+00:00"), "This cannot handle non-UTC offsets yet!"
-    return datetime.strptime(date[:-6], "%Y-%m-%dT%H:%M:%S")
+    return dt
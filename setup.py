@@ -16,8 +16,12 @@ setup(name="pycardcast",
       author_email="elizabeth@interlinked.me",
       url="https://github.com/Elizafox/pycardcast",
       packages=["pycardcast", "pycardcast.net"],
+      python_requires=">= 3.9",
       extras_require = {
-          "aiohttp": ["aiohttp >= 0.17.0a0"],
+          "aiohttp": ["aiohttp >= 3.0"],
+          "msgspec": ["msgspec"],
+          "numpy": ["numpy"],
+          "orjson": ["orjson"],
           "requests": ["requests >= 2.7.0"],
       },
       classifiers=[
@@ -27,7 +31,7 @@ setup(name="pycardcast",
           "Topic :: Internet :: WWW/HTTP",
           "Topic :: Software Development :: Libraries :: Python Modules",
           "Programming Language :: Python :: 3 :: Only",
-          "Programming Language :: Python :: 3.4",
+          "Programming Language :: Python :: 3.9",
           "Operating System :: OS Independent",
           "License :: DFSG approved",
       ]
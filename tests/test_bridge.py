@@ -0,0 +1,93 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import asyncio
+import unittest
+
+from benchmarks.stub import StubConfig, StubServer
+
+
+class BridgeTest(unittest.TestCase):
+
+    def setUp(self):
+        from pycardcast.net.bridge import CardcastAPI
+
+        self.server = StubServer(StubConfig(decks=200))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.bridge = CardcastAPI()
+        self.addCleanup(self.bridge.close)
+        self.server.configure(self.bridge.api)
+
+    def test_blocking_call(self):
+        self.assertEqual(self.bridge.deck_info("AAAAA").code, "AAAAA")
+        self.assertEqual(self.bridge.request_count, 1)
+
+    def test_call_from_own_loop_raises(self):
+        async def call():
+            return self.bridge.deck_info("AAAAA")
+
+        with self.assertRaisesRegex(RuntimeError, "deadlock"):
+            self.bridge._run(call())
+
+        self.assertEqual(self.bridge.request_count, 0)
+
+    def test_acall_from_foreign_loop(self):
+        async def call():
+            loop = asyncio.get_running_loop()
+            self.assertIsNot(loop, self.bridge.loop)
+            return await self.bridge.acall("deck_info", "AAAAA")
+
+        self.assertEqual(asyncio.run(call()).code, "AAAAA")
+
+    def test_acall_from_own_loop(self):
+        info = self.bridge._run(self.bridge.acall("deck_info", "AAAAA"))
+        self.assertEqual(info.code, "AAAAA")
+
+    def test_iterate_closes_on_break(self):
+        events = []
+
+        async def pages():
+            try:
+                for i in range(10):
+                    events.append(i)
+                    yield i
+            finally:
+                events.append("closed")
+
+        self.bridge.api.pages = pages
+        for page in self.bridge._iterate("pages"):
+            if page == 1:
+                break
+
+        self.assertEqual(events, [0, 1, "closed"])
+
+    def test_search_iter_stops_early(self):
+        pages = self.bridge.search_iter(limit=50)
+        self.assertEqual(next(pages).count, 50)
+        pages.close()
+        # The next page may already have been requested, but no more
+        self.assertLessEqual(self.bridge.request_count, 2)
+
+    def test_close_idempotent(self):
+        self.bridge.close()
+        self.bridge.close()
+        self.assertTrue(self.bridge.loop.is_closed())
+
+    def test_api_passed_in_not_closed(self):
+        from pycardcast.net.aiohttp import CardcastAPI as AsyncAPI
+        from pycardcast.net.bridge import CardcastAPI
+
+        api = AsyncAPI()
+        bridge = CardcastAPI(api)
+        self.server.configure(api)
+        bridge.deck_info("AAAAA")
+        session = api._session
+        bridge.close()
+        bridge.close()
+        self.assertFalse(session.closed)
+
+        # The session is bound to the stopped loop; close it on a new one
+        asyncio.run(api.close())
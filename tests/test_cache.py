@@ -0,0 +1,77 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import threading
+import unittest
+
+from pycardcast.cache import CacheEntry, MemoryCache, SQLiteCache
+
+
+def _entry(data, expires=2 ** 40):
+    return CacheEntry(data, expires, None, None)
+
+
+class SQLiteCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SQLiteCache(":memory:", maxsize=3)
+        self.addCleanup(self.cache.close)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.touch_interval = 0
+        for key in "abc":
+            self.cache.set(key, _entry(key))
+
+        self.cache.get("a")
+        self.cache.set("d", _entry("d"))
+        self.assertEqual(len(self.cache), 3)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a").data, "a")
+
+    def test_replace_does_not_evict(self):
+        for key in "abc":
+            self.cache.set(key, _entry(key))
+
+        self.cache.set("c", _entry("C"))
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.get("a").data, "a")
+        self.assertEqual(self.cache.get("c").data, "C")
+
+    def test_delete_and_clear(self):
+        for key in "abc":
+            self.cache.set(key, _entry(key))
+
+        self.cache.delete("a")
+        self.cache.delete("missing")
+        for key in "de":
+            self.cache.set(key, _entry(key))
+
+        self.assertEqual(len(self.cache), 3)
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+
+class CacheCounterTest(unittest.TestCase):
+
+    def test_counters_are_thread_safe(self):
+        cache = MemoryCache()
+        cache.set("fresh", _entry(1))
+        cache.set("stale", _entry(2, expires=0))
+
+        def lookups():
+            for _ in range(10000):
+                cache.lookup("fresh")
+                cache.lookup("stale")
+                cache.revalidated()
+
+        threads = [threading.Thread(target=lookups) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(cache.hits, 80000)
+        self.assertEqual(cache.misses, 80000)
+        self.assertEqual(cache.revalidations, 80000)
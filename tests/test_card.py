@@ -0,0 +1,130 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import random
+import unittest
+
+from datetime import datetime, timezone
+from unittest import mock
+
+from benchmarks import synth
+from pycardcast.card import BlackCard, CardList, CardTable, WhiteCard
+from pycardcast.store import CardStore
+
+
+class FillTest(unittest.TestCase):
+
+    def test_blanks(self):
+        card = BlackCard(None, "x", ["a ", " b ", " c"])
+        self.assertEqual(card.fill(["A", WhiteCard(None, "y", "B")]),
+                         "a A b B c")
+
+    def test_trailing_blank_after_question(self):
+        card = BlackCard(None, "x", ["Why?", ""])
+        self.assertEqual(card.fill(["Because"]), "Why? Because")
+
+    def test_extra_picks_go_at_the_end(self):
+        card = BlackCard(None, "x", ["Make a haiku."], pick=3)
+        self.assertEqual(card.fill(["A", "B", "C"]), "Make a haiku. A B C")
+
+    def test_braces(self):
+        card = BlackCard(None, "x", ["{a} ", " {}"])
+        self.assertEqual(card.fill(["{0}"]), "{a} {0} {}")
+
+    def test_wrong_answer_count(self):
+        card = BlackCard(None, "x", ["a ", " b"])
+        with self.assertRaises(ValueError):
+            card.fill(["A", "B"])
+
+    def test_fewer_picks_than_blanks(self):
+        card = BlackCard(None, "x", ["a ", " b ", " c"], pick=1)
+        for _ in range(2):
+            with self.assertRaisesRegex(ValueError, "2 blanks"):
+                card.fill(["A"])
+
+
+class CardListTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = synth.cards("LIST", blackcount=20, whitecount=100)
+        self.cards = CardList(WhiteCard, self.data["responses"])
+        patcher = mock.patch.object(WhiteCard, "from_json",
+                                    wraps=WhiteCard.from_json)
+        self.from_json = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_matches_eager_parse(self):
+        self.assertEqual(self.cards, WhiteCard.from_json(self.data))
+        blackcards = CardList(BlackCard, self.data["calls"])
+        self.assertEqual(blackcards, BlackCard.from_json(self.data))
+        self.assertEqual(self.cards[-1], self.cards[len(self.cards) - 1])
+
+    def test_parsed_at_most_once(self):
+        self.assertEqual(len(self.cards), 100)
+        self.assertEqual(self.from_json.call_count, 0)
+
+        first = self.cards[5]
+        self.assertIs(self.cards[5], first)
+        self.assertEqual(self.from_json.call_count, 1)
+
+        list(self.cards)
+        list(self.cards)
+        self.assertEqual(self.from_json.call_count, 100)
+
+    def test_sample_parses_only_sampled(self):
+        sample = random.Random(0).sample(self.cards, 10)
+        self.assertEqual(len(sample), 10)
+        self.assertEqual(self.from_json.call_count, 10)
+
+    def test_slices_share_parsed_cards(self):
+        cards = self.cards[10:50]
+        self.assertEqual(self.from_json.call_count, 0)
+        self.assertEqual(len(cards), 40)
+
+        # Parsed through the slice, then the list, then a slice of a slice
+        card = cards[0]
+        self.assertIs(self.cards[10], card)
+        self.assertIs(cards[::2][0], card)
+        self.assertIs(self.cards[:20][-10], card)
+        self.assertEqual(self.from_json.call_count, 1)
+
+        self.assertEqual(list(cards[::-3]), list(self.cards)[10:50][::-3])
+        with self.assertRaises(IndexError):
+            cards[40]
+
+    def test_store(self):
+        store = CardStore()
+        cards = CardList(WhiteCard, self.data["responses"], store)
+        self.assertIs(cards[:3][1], cards[1])
+        self.assertEqual(len(store), 1)
+
+
+class CardTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = synth.cards("TABLE", blackcount=50, whitecount=200)
+        self.cards = (BlackCard.from_json(self.data) +
+                      WhiteCard.from_json(self.data))
+
+    def test_matches_cards(self):
+        table = CardTable.from_json(self.data)
+        self.assertEqual(len(table), len(self.cards))
+        self.assertEqual(list(table), self.cards)
+        self.assertEqual([type(card) for card in table],
+                         [type(card) for card in self.cards])
+        self.assertEqual(list(table[10:20]), self.cards[10:20])
+
+    def test_identical_texts_stored_once(self):
+        created = datetime(2015, 1, 1, tzinfo=timezone.utc)
+        table = CardTable([WhiteCard(created, "w1", "Same"),
+                           WhiteCard(created, "w2", "Same")])
+        self.assertEqual(table.text_blob, "Same")
+        self.assertEqual(table[1].cid, "w2")
+
+    def test_large_pick(self):
+        created = datetime(2015, 1, 1, tzinfo=timezone.utc)
+        card = BlackCard(created, "b1", ["Name them all."], pick=300)
+        table = CardTable([card])
+        self.assertEqual(table[0], card)
@@ -0,0 +1,118 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import json
+import unittest
+
+from unittest import mock
+
+from benchmarks import synth
+from pycardcast import decode
+from pycardcast.card import CardNotFoundError
+from pycardcast.deck import DeckInfoNotFoundError
+from pycardcast.store import CardStore
+
+
+def _body(data):
+    return json.dumps(data).encode()
+
+
+class DecoderTestMixin:
+    """Checks a decoder gives the same results as the standard library's."""
+
+    name = None
+
+    def setUp(self):
+        try:
+            self.decoder = decode.get_decoder(self.name)
+        except ImportError:
+            self.skipTest("{} is not installed".format(self.name))
+
+        self.expected = decode.Decoder()
+        self.codes = [synth.deck_code(i) for i in range(5)]
+
+    def test_deck(self):
+        for code in self.codes:
+            data_deck = _body(synth.deck_info(code))
+            data_cards = _body(synth.cards(code))
+            deck = self.decoder.deck(data_deck, data_cards)
+            expected = self.expected.deck(data_deck, data_cards)
+            self.assertEqual(deck.deckinfo, expected.deckinfo)
+            self.assertEqual(deck.blackcards, expected.blackcards)
+            self.assertEqual(deck.whitecards, expected.whitecards)
+
+    def test_cards_through_store(self):
+        store = CardStore()
+        data = _body(synth.cards(self.codes[0]))
+        blackcards, whitecards = self.decoder.cards(data, store)
+        self.assertEqual((blackcards, whitecards), self.expected.cards(data))
+        # The same cards come back from the store the second time
+        again = self.decoder.cards(data, store)
+        self.assertTrue(all(a is b for a, b in zip(again[0], blackcards)))
+        self.assertTrue(all(a is b for a, b in zip(again[1], whitecards)))
+
+    def test_search(self):
+        data = _body(synth.search(100, 10, 20))
+        self.assertEqual(self.decoder.search(data),
+                         self.expected.search(data))
+
+    def test_not_found(self):
+        data = _body({"id": "not_found", "message": "Not found"})
+        with self.assertRaises(DeckInfoNotFoundError):
+            self.decoder.deck_info(data)
+        with self.assertRaises(CardNotFoundError):
+            self.decoder.cards(_body({"calls": [
+                {"id": "not_found", "message": "Not found"}]}))
+
+
+class JsonDecoderTest(DecoderTestMixin, unittest.TestCase):
+
+    name = "json"
+
+
+class OrjsonDecoderTest(DecoderTestMixin, unittest.TestCase):
+
+    name = "orjson"
+
+
+class MsgspecDecoderTest(DecoderTestMixin, unittest.TestCase):
+
+    name = "msgspec"
+
+
+class _Missing(decode.Decoder):
+
+    def __init__(self):
+        raise ImportError("Not installed")
+
+
+class GetDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        # Don't hand out, or keep, decoders made while patched
+        patcher = mock.patch.dict(decode._instances, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_falls_back(self):
+        with mock.patch.dict(decode.decoders, msgspec=_Missing):
+            self.assertIn(decode.get_decoder().name, ("orjson", "json"))
+
+    def test_falls_back_to_json(self):
+        with mock.patch.dict(decode.decoders, msgspec=_Missing,
+                             orjson=_Missing):
+            self.assertEqual(type(decode.get_decoder()), decode.Decoder)
+
+    def test_named_missing(self):
+        with mock.patch.dict(decode.decoders, orjson=_Missing):
+            with self.assertRaises(ImportError):
+                decode.get_decoder("orjson")
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            decode.get_decoder("yaml")
+
+    def test_shared(self):
+        self.assertIs(decode.get_decoder("json"), decode.get_decoder("json"))
@@ -0,0 +1,66 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import asyncio
+import threading
+import unittest
+
+from benchmarks.stub import StubConfig, StubServer
+
+
+CALLERS = 20
+
+
+class RequestsFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        from pycardcast.net.requests import CardcastAPI
+
+        self.server = StubServer(StubConfig(latency=0.2))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.api = self.server.configure(CardcastAPI())
+        self.addCleanup(self.api.close)
+
+    def test_concurrent_cards_coalesced(self):
+        barrier = threading.Barrier(CALLERS)
+        results = [None] * CALLERS
+
+        def call(i):
+            barrier.wait()
+            results[i] = self.api.cards("AAAAA")
+
+        threads = [threading.Thread(target=call, args=(i,))
+                   for i in range(CALLERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.api.request_count, 1)
+        self.assertEqual(self.server.requests, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+
+
+class AiohttpFlightTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from pycardcast.net.aiohttp import CardcastAPI
+
+        self.server = StubServer(StubConfig(latency=0.2))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.api = self.server.configure(CardcastAPI())
+
+    async def asyncTearDown(self):
+        await self.api.close()
+
+    async def test_concurrent_cards_coalesced(self):
+        results = await asyncio.gather(*(self.api.cards("AAAAA")
+                                         for _ in range(CALLERS)))
+
+        self.assertEqual(self.api.request_count, 1)
+        self.assertEqual(self.server.requests, 1)
+        self.assertTrue(all(r is results[0] for r in results))
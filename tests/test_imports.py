@@ -0,0 +1,41 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import json
+import subprocess
+import sys
+import unittest
+
+
+# Modules that are slow to import, or optional, and only loaded by the
+# backends and features that need them
+HEAVY = ("requests", "aiohttp", "sqlite3", "orjson", "msgspec", "numpy")
+
+
+def _imported(module):
+    """Import a module in a fresh interpreter, returning the names of the
+    modules in ``HEAVY`` it loaded."""
+    code = ("import json, sys; import {}; "
+            "print(json.dumps(sorted(n for n in {!r} if n in sys.modules)))"
+            .format(module, HEAVY))
+    proc = subprocess.run([sys.executable, "-c", code],
+                          stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(proc.stdout)
+
+
+class ImportTest(unittest.TestCase):
+
+    def test_package_is_light(self):
+        for module in ("pycardcast", "pycardcast.net"):
+            with self.subTest(module=module):
+                self.assertEqual(_imported(module), [])
+
+    def test_backend_loads_its_library(self):
+        try:
+            import requests  # noqa: F401
+        except ImportError:
+            self.skipTest("requests is not installed")
+
+        self.assertIn("requests", _imported("pycardcast.net.requests"))
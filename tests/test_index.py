@@ -0,0 +1,78 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import unittest
+
+from benchmarks import synth
+from pycardcast.card import WhiteCard
+from pycardcast.deck import DeckInfo
+from pycardcast.index import DeckIndex
+
+
+def _deckinfo(code, **changes):
+    data = synth.deck_info(code)
+    data.update(changes)
+    return DeckInfo.from_json(data)
+
+
+def _cards(code):
+    return WhiteCard.from_json(synth.cards(code, whitecount=5))
+
+
+class DeckIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = DeckIndex()
+        self.addCleanup(self.index.close)
+
+    def test_card_text_kept_on_update(self):
+        info = _deckinfo("AAAAA")
+        cards = _cards("AAAAA")
+        self.assertTrue(self.index.add(info, cards))
+        word = cards[0].text.split()[0]
+
+        updated = _deckinfo("AAAAA", name="Renamed",
+                            updated_at="2017-01-01T00:00:00+00:00")
+        self.assertTrue(self.index.add(updated))
+        self.assertFalse(self.index.add(updated))
+        self.assertEqual(len(self.index), 1)
+
+        s = self.index.search(word)
+        self.assertEqual([d.code for d in s.data], ["AAAAA"])
+        self.assertEqual(self.index.search("renamed").count, 1)
+
+    def test_author_id_type_kept(self):
+        for author_id in (12345, "12345", "u12345"):
+            with self.subTest(author_id=author_id):
+                data = synth.deck_info("AAAAA")
+                data["author"]["id"] = author_id
+                info = DeckInfo.from_json(data)
+                self.index.remove("AAAAA")
+                self.index.add(info)
+                (indexed,) = self.index.search().data
+                self.assertEqual(indexed, info)
+                self.assertIs(type(indexed.author.id), type(author_id))
+
+    def test_remove(self):
+        self.index.add_many([_deckinfo(synth.deck_code(i))
+                             for i in range(10)])
+        code = synth.deck_code(3)
+        self.index.remove(code)
+        self.index.remove(code)
+        self.assertEqual(len(self.index), 9)
+        self.assertNotIn(code, self.index)
+        count = self.index._db.execute(
+            "SELECT COUNT(*) FROM decks_fts").fetchone()[0]
+        self.assertEqual(count, 9)
+
+    def test_text_linked_by_rowid(self):
+        self.index.add(_deckinfo("AAAAA"), _cards("AAAAA"))
+        columns = [row[1] for row in self.index._db.execute(
+            "PRAGMA table_info(decks_fts)")]
+        self.assertNotIn("code", columns)
+        row = self.index._db.execute(
+            "SELECT decks_fts.name FROM decks JOIN decks_fts "
+            "ON decks_fts.rowid = decks.rowid").fetchone()
+        self.assertEqual(row[0], _deckinfo("AAAAA").name)
@@ -0,0 +1,72 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import unittest
+
+from unittest import mock
+
+from benchmarks import synth
+from benchmarks.stub import StubConfig, StubServer
+from pycardcast.card import CardTable
+from pycardcast.deck import DeckInfoNotFoundError
+from pycardcast.ingest import ingest, parse_deck
+
+
+class IngestTest(unittest.TestCase):
+
+    def setUp(self):
+        from pycardcast.net.requests import CardcastAPI
+
+        self.server = StubServer(StubConfig(decks=20))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.api = self.server.configure(CardcastAPI())
+        self.addCleanup(self.api.close)
+
+        self.codes = [synth.deck_code(i) for i in range(12)]
+
+    def test_same_as_serial_parse(self):
+        results = {r.code: r for r in ingest(self.api, self.codes,
+                                             processes=2)}
+        self.assertEqual(sorted(results), sorted(self.codes))
+
+        for code in self.codes:
+            result = results[code]
+            self.assertIsNone(result.error)
+            expected = parse_deck(*self.api.deck_bytes(code))
+            self.assertEqual(result.deck.deckinfo, expected.deckinfo)
+            for got, want in ((result.deck.blackcards, expected.blackcards),
+                              (result.deck.whitecards, expected.whitecards)):
+                self.assertIsInstance(got, CardTable)
+                self.assertEqual(list(got), list(want))
+
+    def test_errors_reported_per_deck(self):
+        codes = self.codes[:3] + ["NO-SUCH"] + self.codes[3:6]
+        results = {r.code: r for r in ingest(self.api, codes, processes=2)}
+        self.assertEqual(sorted(results), sorted(codes))
+
+        self.assertIsNone(results["NO-SUCH"].deck)
+        self.assertIsInstance(results["NO-SUCH"].error,
+                              DeckInfoNotFoundError)
+        for code in self.codes[:6]:
+            self.assertIsNone(results[code].error)
+            self.assertIsNotNone(results[code].deck)
+
+    def test_max_pending(self):
+        self.server.config.latency = 0.01
+        max_pending = 3
+        with mock.patch.object(self.api, "deck_bytes",
+                               wraps=self.api.deck_bytes) as deck_bytes:
+            yielded = 0
+            for result in ingest(self.api, self.codes, processes=2,
+                                 concurrency=2, max_pending=max_pending):
+                # Downloads started but not yet yielded, counting this one
+                self.assertLessEqual(deck_bytes.call_count - yielded,
+                                     max_pending)
+                self.assertIsNone(result.error)
+                yielded += 1
+
+        self.assertEqual(yielded, len(self.codes))
+        self.assertEqual(deck_bytes.call_count, len(self.codes))
@@ -0,0 +1,186 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import unittest
+
+from benchmarks import synth
+from benchmarks.stub import StubConfig, StubServer
+from pycardcast import RetrievalError
+from pycardcast.cache import MemoryCache
+from pycardcast.net.instrument import (Histogram, HistogramInstrument,
+                                       Instrument)
+from pycardcast.net.schedule import Scheduler
+
+
+class RecordingInstrument(Instrument):
+    """Records every event as a tuple of the hook name and its arguments."""
+
+    def __init__(self):
+        self.events = []
+
+    def request(self, *args):
+        self.events.append(("request",) + args)
+
+    def decode(self, *args):
+        self.events.append(("decode",) + args)
+
+    def parse(self, *args):
+        self.events.append(("parse",) + args)
+
+    def call(self, *args):
+        self.events.append(("call",) + args)
+
+    def cache(self, *args):
+        self.events.append(("cache",) + args)
+
+    def retry(self, *args):
+        self.events.append(("retry",) + args)
+
+    def of(self, hook):
+        return [e[1:] for e in self.events if e[0] == hook]
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_buckets(self):
+        histogram = Histogram()
+        bounds = histogram.bounds
+        # Bounds are inclusive
+        histogram.add(bounds[0])
+        histogram.add(bounds[0] * 1.5)
+        histogram.add(bounds[5])
+        histogram.add(bounds[-1] * 2)
+
+        self.assertEqual(histogram.counts[0], 1)
+        self.assertEqual(histogram.counts[1], 1)
+        self.assertEqual(histogram.counts[5], 1)
+        self.assertEqual(histogram.counts[-1], 1)
+        self.assertEqual(sum(histogram.counts), 4)
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.min, bounds[0])
+        self.assertEqual(histogram.max, bounds[-1] * 2)
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(50))
+
+        for _ in range(90):
+            histogram.add(0.001)
+        for _ in range(10):
+            histogram.add(1.0)
+
+        # The upper bound of the bucket holding 1ms
+        p50 = histogram.percentile(50)
+        self.assertGreaterEqual(p50, 0.001)
+        self.assertLess(p50, 0.002)
+        self.assertEqual(histogram.percentile(90), p50)
+        # Capped at the largest value seen
+        self.assertEqual(histogram.percentile(99), 1.0)
+        self.assertEqual(histogram.percentile(100), 1.0)
+
+    def test_overflow_percentile(self):
+        histogram = Histogram()
+        histogram.add(1000.0)
+        self.assertEqual(histogram.percentile(50), 1000.0)
+
+    def test_summary(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.summary()["mean"])
+
+        histogram.add(0.5)
+        histogram.add(1.5)
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 2)
+        self.assertEqual(summary["total"], 2.0)
+        self.assertEqual(summary["mean"], 1.0)
+        self.assertEqual((summary["min"], summary["max"]), (0.5, 1.5))
+
+
+class InstrumentHooksTest(unittest.TestCase):
+
+    def setUp(self):
+        from pycardcast.net.requests import CardcastAPI
+
+        self.server = StubServer(StubConfig(decks=20))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+        self.instrument = RecordingInstrument()
+        self.api = self.server.configure(CardcastAPI(
+            cache=MemoryCache(), instrument=self.instrument,
+            scheduler=Scheduler(retries=2, backoff=0, breaker=False)))
+        self.addCleanup(self.api.close)
+
+        self.code = synth.deck_code(0)
+
+    def test_deck(self):
+        self.api.deck(self.code)
+
+        requests = self.instrument.of("request")
+        self.assertEqual(sorted(r[0] for r in requests),
+                         ["cards", "deck_info"])
+        for endpoint, url, status, connect, transfer, size in requests:
+            self.assertIn(self.code, url)
+            self.assertEqual(status, 200)
+            self.assertGreaterEqual(connect, 0)
+            self.assertGreaterEqual(transfer, 0)
+            self.assertGreater(size, 0)
+
+        self.assertEqual(sorted(c[0] for c in self.instrument.of("call")),
+                         ["cards", "deck_info"])
+        self.assertEqual(sorted(self.instrument.of("cache")),
+                         [("cards", "miss"), ("deck_info", "miss")])
+        self.assertEqual(self.instrument.of("retry"), [])
+
+    def test_cache_hit(self):
+        self.api.deck(self.code)
+        del self.instrument.events[:]
+
+        self.api.deck(self.code)
+        self.assertEqual(self.instrument.of("request"), [])
+        self.assertEqual(sorted(self.instrument.of("cache")),
+                         [("cards", "hit"), ("deck_info", "hit")])
+
+    def test_retries(self):
+        self.server.config.error_rate = 1.0
+        with self.assertRaises(RetrievalError):
+            self.api.deck_info(self.code)
+
+        retries = self.instrument.of("retry")
+        self.assertEqual([(r[0], r[2], r[4]) for r in retries],
+                         [("deck_info", 0, 503), ("deck_info", 1, 503)])
+        self.assertEqual([r[2] for r in self.instrument.of("request")],
+                         [503, 503, 503])
+        # A failed call is still timed
+        self.assertEqual([c[0] for c in self.instrument.of("call")],
+                         ["deck_info"])
+
+
+class HistogramInstrumentTest(unittest.TestCase):
+
+    def test_aggregates(self):
+        instrument = HistogramInstrument()
+        instrument.request("cards", "url", 200, 0.01, 0.02, 100)
+        instrument.request("cards", "url", 503, 0.03, 0.0, 50)
+        instrument.decode("cards", 0.001)
+        instrument.cache("cards", "miss")
+        instrument.cache("cards", "miss")
+        instrument.retry("cards", "url", 0, 0.5, 503)
+
+        summary = instrument.summary()
+        self.assertEqual(summary["counters"], {
+            "requests.cards": 2,
+            "bytes.cards": 150,
+            "miss.cards": 2,
+            "retries.cards": 1,
+        })
+        self.assertEqual(sorted(summary["timings"]),
+                         ["connect.cards", "decode.cards", "transfer.cards"])
+        self.assertEqual(summary["timings"]["connect.cards"]["count"], 2)
+        self.assertEqual(summary["timings"]["connect.cards"]["max"], 0.03)
+
+        instrument.reset()
+        self.assertEqual(instrument.summary(),
+                         {"timings": {}, "counters": {}})
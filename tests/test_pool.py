@@ -0,0 +1,140 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import random
+import unittest
+
+from benchmarks import synth
+from pycardcast.deck import Deck
+from pycardcast.pool import Dealer, DeckPool
+
+
+def _deck(code, black=20, white=60):
+    return Deck.from_json(synth.deck_info(code),
+                          synth.cards(code, blackcount=black,
+                                      whitecount=white))
+
+
+class DealerTest(unittest.TestCase):
+
+    def test_deals_without_repeats(self):
+        dealer = Dealer(100, random.Random(1))
+        dealt = dealer.deal(30) + dealer.deal(70)
+        self.assertEqual(sorted(dealt), list(range(100)))
+        self.assertEqual(len(dealer), 0)
+        with self.assertRaises(ValueError):
+            dealer.deal()
+
+    def test_put_back(self):
+        dealer = Dealer(10, random.Random(2))
+        dealt = dealer.deal(10)
+        dealer.put_back(dealt[:3])
+        self.assertEqual(len(dealer), 3)
+        self.assertEqual(sorted(dealer.deal(3)), sorted(dealt[:3]))
+
+        dealer.put_back([dealt[5]])
+        with self.assertRaises(ValueError):
+            dealer.put_back([dealt[5]])
+
+    def test_reset_reshuffles(self):
+        dealer = Dealer(50, random.Random(3))
+        first = dealer.deal(50)
+        dealer.reset()
+        second = dealer.deal(50)
+        self.assertEqual(sorted(second), list(range(50)))
+        self.assertNotEqual(first, second)
+
+    def test_extend_while_dealing(self):
+        dealer = Dealer(5, random.Random(4))
+        dealt = dealer.deal(3)
+        dealer.extend(5)
+        self.assertEqual(dealer.size, 10)
+        self.assertEqual(len(dealer), 7)
+        self.assertEqual(sorted(dealt + dealer.deal(7)), list(range(10)))
+
+    def test_seeded_reproducible(self):
+        a = Dealer(1000, random.Random(42))
+        b = Dealer(1000, random.Random(42))
+        dealt = a.deal(500)
+        self.assertEqual(dealt, b.deal(500))
+        a.put_back(dealt[:10])
+        b.put_back(dealt[:10])
+        self.assertEqual(a.deal(510), b.deal(510))
+
+
+class DeckPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.decks = [_deck("AAAAA"), _deck("BBBBB")]
+        self.pool = DeckPool(self.decks, rng=random.Random(5))
+
+    def test_add(self):
+        self.assertEqual(self.pool.codes, ["AAAAA", "BBBBB"])
+        self.assertEqual(len(self.pool.black), 40)
+        self.assertEqual(len(self.pool.white), 120)
+        self.assertEqual(self.pool.white_left, 120)
+        self.assertEqual(self.pool.black_left, 40)
+
+    def test_duplicates_dropped(self):
+        self.pool.add(self.decks[0])
+        self.assertEqual(len(self.pool.white), 120)
+        stats = self.pool.stats()
+        self.assertEqual([s.duplicates for s in stats], [0, 0, 80])
+        self.assertEqual(stats[0].blackcount, 20)
+        self.assertEqual(stats[2].whitecount, 0)
+
+    def test_deal_white(self):
+        hand = self.pool.deal_white(100)
+        self.assertEqual(len({card.cid for card in hand}), 100)
+        self.assertEqual(self.pool.white_left, 20)
+
+        self.pool.return_white(hand[:10])
+        rest = self.pool.deal_white(30)
+        self.assertEqual(len({card.cid for card in hand[10:] + rest}), 120)
+        with self.assertRaises(ValueError):
+            self.pool.deal_white(1)
+
+    def test_deal_black(self):
+        dealt = [self.pool.deal_black() for _ in range(40)]
+        self.assertEqual(len({card.cid for card in dealt}), 40)
+        with self.assertRaises(ValueError):
+            self.pool.deal_black()
+
+        self.pool.return_black(dealt[0])
+        self.assertIs(self.pool.deal_black(), dealt[0])
+
+    def test_deal_black_weights(self):
+        picks = set(self.pool.black_picks)
+        pick = min(picks)
+        for _ in range(self.pool.black_picks.tolist().count(pick)):
+            self.assertEqual(self.pool.deal_black({pick: 1}).pick, pick)
+
+        with self.assertRaises(ValueError):
+            self.pool.deal_black({pick: 1})
+
+    def test_cards_added_while_dealing(self):
+        self.pool.deal_white(120)
+        self.pool.add(_deck("CCCCC"))
+        self.assertEqual(self.pool.white_left, 60)
+        hand = self.pool.deal_white(60)
+        self.assertEqual({card.cid for card in hand},
+                         {card.cid for card in self.pool.white[120:]})
+
+    def test_seeded_reproducible(self):
+        other = DeckPool(self.decks, rng=random.Random(5))
+        self.assertEqual(self.pool.deal_white(50), other.deal_white(50))
+        self.assertEqual(self.pool.deal_black(), other.deal_black())
+
+    def test_arrays_are_copies(self):
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+
+        arrays = self.pool.arrays()
+        self.pool.add(_deck("CCCCC"))
+        self.assertEqual(len(arrays["white_decks"]), 120)
+        self.assertEqual(list(arrays["black_picks"]),
+                         list(self.pool.black_picks[:40]))
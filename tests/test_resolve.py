@@ -0,0 +1,58 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import itertools
+import threading
+import time
+import unittest
+
+from benchmarks import synth
+from benchmarks.stub import StubConfig, StubServer
+from pycardcast.resolve import DeckInfoResolver
+
+
+class DeckInfoResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        from pycardcast.net.requests import CardcastAPI
+
+        self.server = StubServer(StubConfig(decks=200))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.api = self.server.configure(CardcastAPI())
+        self.addCleanup(self.api.close)
+
+    def test_harvest(self):
+        resolver = DeckInfoResolver(self.api)
+        self.assertEqual(resolver.harvest(), 200)
+        requests = self.server.requests
+        codes = [synth.deck_code(i) for i in range(200)]
+        self.assertEqual(list(resolver.deck_infos(codes)), codes)
+        self.assertEqual(resolver.hits, 200)
+        self.assertEqual(self.server.requests, requests)
+
+    def test_entries_timed_per_page(self):
+        resolver = DeckInfoResolver(self.api, clock=itertools.count().__next__)
+        resolver.harvest(window=1)
+        first = resolver._table[synth.deck_code(0)].fetched
+        last = resolver._table[synth.deck_code(199)].fetched
+        self.assertLess(first, last)
+
+    def test_lookups_during_harvest(self):
+        self.server.config.latency = 0.3
+        resolver = DeckInfoResolver(self.api)
+        harvest = threading.Thread(target=resolver.harvest,
+                                   kwargs={"window": 1})
+        harvest.start()
+        self.addCleanup(harvest.join)
+
+        while synth.deck_code(0) not in resolver:
+            time.sleep(0.01)
+
+        start = time.perf_counter()
+        resolver.deck_info(synth.deck_code(0))
+        self.assertLess(time.perf_counter() - start, 0.2)
+        self.assertTrue(harvest.is_alive())
+        self.assertEqual(resolver.hits, 1)
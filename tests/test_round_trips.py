@@ -0,0 +1,91 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import unittest
+
+from benchmarks.stub import StubConfig, StubServer
+from pycardcast.cache import MemoryCache
+
+
+class RequestsRoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(StubConfig())
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.urls = []
+
+    def _api(self, **kwargs):
+        from pycardcast.net.requests import CardcastAPI
+
+        api = self.server.configure(CardcastAPI(**kwargs))
+        self.addCleanup(api.close)
+        api.request_hooks.append(lambda url, params: self.urls.append(url))
+        return api
+
+    def test_cold_deck(self):
+        api = self._api()
+        api.deck("AAAAA")
+        self.assertEqual(api.request_count, 2)
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(sorted(self.urls),
+                         [api.deck_info_url.format(code="AAAAA"),
+                          api.card_list_url.format(code="AAAAA")])
+
+        api.deck("AAAAA")
+        self.assertEqual(api.request_count, 4)
+
+    def test_warm_cache(self):
+        api = self._api(cache=MemoryCache())
+        deck = api.deck("AAAAA")
+        self.assertEqual(api.request_count, 2)
+
+        self.assertEqual(api.deck("AAAAA").deckinfo, deck.deckinfo)
+        api.white_cards("AAAAA")
+        api.black_cards("AAAAA")
+        self.assertEqual(api.request_count, 2)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_expired_cache_revalidates(self):
+        cache = MemoryCache()
+        api = self._api(cache=cache, cache_ttl={"deck_info": 0, "cards": 0})
+        api.deck("AAAAA")
+        api.deck("AAAAA")
+        self.assertEqual(api.request_count, 4)
+        self.assertEqual(cache.revalidations, 2)
+
+
+class AiohttpRoundTripTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = StubServer(StubConfig())
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.apis = []
+
+    async def asyncTearDown(self):
+        for api in self.apis:
+            await api.close()
+
+    def _api(self, **kwargs):
+        from pycardcast.net.aiohttp import CardcastAPI
+
+        api = self.server.configure(CardcastAPI(**kwargs))
+        self.apis.append(api)
+        return api
+
+    async def test_cold_deck(self):
+        api = self._api()
+        await api.deck("AAAAA")
+        self.assertEqual(api.request_count, 2)
+        self.assertEqual(self.server.requests, 2)
+
+    async def test_warm_cache(self):
+        api = self._api(cache=MemoryCache())
+        await api.deck("AAAAA")
+        await api.deck("AAAAA")
+        await api.white_cards("AAAAA")
+        self.assertEqual(api.request_count, 2)
+        self.assertEqual(self.server.requests, 2)
@@ -0,0 +1,156 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import asyncio
+import unittest
+
+from unittest import mock
+
+from benchmarks.stub import StubConfig, StubServer
+from pycardcast import RetrievalError
+from pycardcast.net.schedule import (CircuitBreaker, CircuitOpenError,
+                                     Scheduler)
+
+
+class ProbeError(Exception):
+    """An unexpected exception raised while sending a probe."""
+
+
+def _scheduler(retries=0):
+    return Scheduler(retries=retries, backoff=0, breaker=CircuitBreaker(
+        threshold=2, reset_timeout=0))
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(threshold=2, reset_timeout=60)
+        self.assertFalse(breaker.failure())
+        self.assertTrue(breaker.failure())
+        self.assertTrue(breaker.open)
+        self.assertFalse(breaker.allow())
+
+    def test_abort_releases_probe(self):
+        breaker = CircuitBreaker(threshold=1, reset_timeout=0)
+        breaker.failure()
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.abort()
+        self.assertTrue(breaker.allow())
+
+
+class RequestsSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        from pycardcast.net.requests import CardcastAPI
+
+        self.server = StubServer(StubConfig(error_rate=1.0))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.api = self.server.configure(CardcastAPI(scheduler=_scheduler()))
+        self.addCleanup(self.api.close)
+
+    def _open_breaker(self):
+        for _ in range(2):
+            with self.assertRaises(RetrievalError):
+                self.api.deck_info("AAAAA")
+
+        self.assertTrue(self.api.scheduler.breaker.open)
+
+    def test_retries_injected_failures(self):
+        self.api.scheduler = Scheduler(retries=3, backoff=0, breaker=False)
+        with self.assertRaises(RetrievalError):
+            self.api.deck_info("AAAAA")
+
+        self.assertEqual(self.server.requests, 4)
+        self.assertEqual(self.api.scheduler.stats.retries, 3)
+
+    def test_recovers_after_failures(self):
+        self._open_breaker()
+        self.server.config.error_rate = 0.0
+        self.assertEqual(self.api.deck_info("AAAAA").code, "AAAAA")
+        self.assertFalse(self.api.scheduler.breaker.open)
+
+    def test_unexpected_probe_error_releases_probe(self):
+        self._open_breaker()
+        self.server.config.error_rate = 0.0
+
+        def fail(url, params):
+            raise ProbeError()
+
+        self.api.request_hooks.append(fail)
+        with self.assertRaises(ProbeError):
+            self.api.deck_info("AAAAA")
+
+        self.api.request_hooks.remove(fail)
+        self.assertEqual(self.api.deck_info("AAAAA").code, "AAAAA")
+
+
+class AiohttpSchedulerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from pycardcast.net.aiohttp import CardcastAPI
+
+        self.server = StubServer(StubConfig(error_rate=1.0))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.api = self.server.configure(CardcastAPI(scheduler=_scheduler()))
+
+    async def asyncTearDown(self):
+        await self.api.close()
+
+    async def _open_breaker(self):
+        for _ in range(2):
+            with self.assertRaises(RetrievalError):
+                await self.api.deck_info("AAAAA")
+
+        self.assertTrue(self.api.scheduler.breaker.open)
+
+    async def test_cancelled_probe_releases_probe(self):
+        await self._open_breaker()
+        self.server.config.error_rate = 0.0
+        self.server.config.latency = 0.5
+        breaker = self.api.scheduler.breaker
+        url = self.api.deck_info_url.format(code="AAAAA")
+
+        # Coalesced calls shield the request from their callers'
+        # cancellation, so the request itself is cancelled here
+        async def probe():
+            async with self.api._get("deck_info", url) as req:
+                return await req.read()
+
+        with mock.patch.object(breaker, "abort", wraps=breaker.abort) as abort:
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(probe(), 0.05)
+
+        abort.assert_called_once_with()
+        self.assertTrue(breaker.open)
+        self.server.config.latency = 0.0
+        self.assertTrue(await probe())
+        self.assertFalse(breaker.open)
+
+    async def test_cancelled_stream_probe_releases_probe(self):
+        await self._open_breaker()
+        self.server.config.error_rate = 0.0
+        self.server.config.latency = 0.5
+        breaker = self.api.scheduler.breaker
+
+        async def consume():
+            return [card async for card in self.api.cards_stream("AAAAA")]
+
+        with mock.patch.object(breaker, "abort", wraps=breaker.abort) as abort:
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(consume(), 0.05)
+
+        abort.assert_called_once_with()
+        self.server.config.latency = 0.0
+        self.assertTrue(await consume())
+        self.assertFalse(breaker.open)
+
+    async def test_open_breaker_rejects(self):
+        self.api.scheduler.breaker.reset_timeout = 60
+        await self._open_breaker()
+        with self.assertRaises(CircuitOpenError):
+            await self.api.deck_info("AAAAA")
@@ -0,0 +1,72 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import unittest
+
+from benchmarks.stub import StubConfig, StubServer
+
+
+def _count(pages):
+    return sum(s.count for s in pages)
+
+
+class RequestsSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        from pycardcast.net.requests import CardcastAPI
+
+        self.server = StubServer(StubConfig(decks=200))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.api = self.server.configure(CardcastAPI())
+        self.addCleanup(self.api.close)
+
+    def test_iter_short_pages(self):
+        # The stub returns at most 50 decks a page
+        pages = self.api.search_iter(limit=100, max_results=150)
+        self.assertEqual(_count(pages), 150)
+
+    def test_iter_matches_crawl(self):
+        for max_results in (1, 49, 120, 150, 200, 500, None):
+            with self.subTest(max_results=max_results):
+                self.assertEqual(
+                    _count(self.api.search_iter(limit=100,
+                                                max_results=max_results)),
+                    _count(self.api.search_crawl(limit=100,
+                                                 max_results=max_results)))
+
+
+class AiohttpSearchTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from pycardcast.net.aiohttp import CardcastAPI
+
+        self.server = StubServer(StubConfig(decks=200))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.api = self.server.configure(CardcastAPI())
+
+    async def asyncTearDown(self):
+        await self.api.close()
+
+    async def test_iter_short_pages(self):
+        count = 0
+        async for s in self.api.search_iter(limit=100, max_results=150):
+            count += s.count
+
+        self.assertEqual(count, 150)
+
+    async def test_iter_matches_crawl(self):
+        for max_results in (1, 49, 120, 150, 200, 500, None):
+            with self.subTest(max_results=max_results):
+                iterated = crawled = 0
+                async for s in self.api.search_iter(limit=100,
+                                                    max_results=max_results):
+                    iterated += s.count
+                async for s in self.api.search_crawl(limit=100,
+                                                     max_results=max_results):
+                    crawled += s.count
+
+                self.assertEqual(iterated, crawled)
@@ -0,0 +1,82 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import os
+import struct
+import tempfile
+import unittest
+
+from datetime import datetime, timezone
+
+from benchmarks import synth
+from pycardcast.card import BlackCard
+from pycardcast.deck import Deck
+from pycardcast.snapshot import (Snapshot, SnapshotError, VERSION,
+                                 write_snapshot)
+
+
+def _deck(data):
+    return Deck.from_json(data, synth.cards(data["code"], blackcount=4,
+                                            whitecount=6))
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".pcds")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def _round_trip(self, decks):
+        write_snapshot(self.path, decks)
+        with Snapshot(self.path) as snapshot:
+            self.assertEqual(snapshot.codes(),
+                             [deck.deckinfo.code for deck in decks])
+            for deck, loaded in zip(decks, snapshot):
+                self.assertEqual(loaded.deckinfo, deck.deckinfo)
+                self.assertIs(type(loaded.deckinfo.author.id),
+                              type(deck.deckinfo.author.id))
+                self.assertEqual(list(loaded.blackcards), deck.blackcards)
+                self.assertEqual(list(loaded.whitecards), deck.whitecards)
+
+    def test_round_trip(self):
+        # Search results have card samples, deck info doesn't
+        data = synth.search(4, 0, 4)["results"]["data"]
+        data.append(synth.deck_info("ZZZZZ"))
+
+        data[0]["author"]["id"] = 12345
+        data[1]["description"] = None
+        data[1]["unlisted"] = True
+        data[2]["external_copyright"] = True
+        data[2]["copyright_holder_url"] = "https://example.com/licence"
+        data[3]["sample_calls"] = []
+        data[3]["sample_responses"] = []
+
+        decks = [_deck(d) for d in data]
+        self.assertIsNotNone(decks[0].deckinfo.blacksample)
+        self.assertEqual(decks[3].deckinfo.blacksample, [])
+        self.assertIsNone(decks[-1].deckinfo.blacksample)
+        self._round_trip(decks)
+
+        with Snapshot(self.path) as snapshot:
+            self.assertEqual(snapshot[0].deckinfo.author.id, 12345)
+            self.assertEqual(snapshot[-1].deckinfo.author.id,
+                             decks[-1].deckinfo.author.id)
+
+    def test_large_pick(self):
+        deck = _deck(synth.deck_info("AAAAA"))
+        created = datetime(2015, 1, 1, tzinfo=timezone.utc)
+        card = BlackCard(created, "b1", ["Name them all."], pick=300)
+        deck = Deck(deck.deckinfo, [card], deck.whitecards)
+        self._round_trip([deck])
+
+    def test_other_version_rejected(self):
+        write_snapshot(self.path, [_deck(synth.deck_info("AAAAA"))])
+        with open(self.path, "r+b") as f:
+            f.seek(4)
+            f.write(struct.pack("<H", VERSION - 1))
+
+        with self.assertRaises(SnapshotError):
+            Snapshot(self.path)
@@ -0,0 +1,75 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import threading
+import unittest
+
+from benchmarks import synth
+from pycardcast.card import BlackCard, WhiteCard
+from pycardcast.store import CardStore
+
+
+CREATED = "2015-01-01T00:00:00+00:00"
+
+
+class CardStoreTest(unittest.TestCase):
+
+    def test_same_card_shared(self):
+        store = CardStore()
+        a = store.card(WhiteCard, CREATED, "w1", ["A thing"])
+        b = store.card(WhiteCard, CREATED, "w1", ["A thing"])
+        self.assertIs(a, b)
+        c = store.card(BlackCard, CREATED, "b1", ["Why ", "?"])
+        d = store.card(BlackCard, CREATED, "b1", ["Why ", "?"])
+        self.assertIs(c, d)
+        self.assertEqual(store.dedup_ratio, 0.5)
+
+    def test_edited_white_card_replaced(self):
+        store = CardStore()
+        old = store.card(WhiteCard, CREATED, "w1", ["Old text"])
+        new = store.card(WhiteCard, CREATED, "w1", ["New text"])
+        self.assertEqual(old.text, "Old text")
+        self.assertEqual(new.text, "New text")
+        self.assertIs(store.card(WhiteCard, CREATED, "w1", "New text"), new)
+        self.assertEqual(len(store), 1)
+
+    def test_edited_black_card_replaced(self):
+        store = CardStore()
+        store.card(BlackCard, CREATED, "b1", ["Why ", "?"])
+        new = store.card(BlackCard, CREATED, "b1", ["Who ", " and ", "?"])
+        self.assertEqual(new.segments, ("Who ", " and ", "?"))
+        self.assertEqual(new.pick, 2)
+        self.assertIs(store.card(BlackCard, CREATED, "b1",
+                                 ["Who ", " and ", "?"]), new)
+
+    def test_text_key_ignores_case_and_whitespace(self):
+        store = CardStore(key="text")
+        a = store.card(WhiteCard, CREATED, "w1", ["A  thing"])
+        b = store.card(WhiteCard, CREATED, "w2", ["a thing"])
+        self.assertIs(a, b)
+        self.assertEqual(b.cid, "w1")
+
+    def test_shared_between_threads(self):
+        store = CardStore()
+        data = synth.cards("AAAAA", blackcount=200, whitecount=800)
+        barrier = threading.Barrier(8)
+        results = [None] * 8
+
+        def parse(i):
+            barrier.wait()
+            results[i] = (BlackCard.from_json(data, store) +
+                          WhiteCard.from_json(data, store))
+
+        threads = [threading.Thread(target=parse, args=(i,))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(store.lookups, 8000)
+        self.assertEqual(len(store), 1000)
+        for cards in results[1:]:
+            self.assertTrue(all(a is b for a, b in zip(cards, results[0])))
@@ -0,0 +1,48 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import json
+import unittest
+
+from benchmarks import synth
+from pycardcast.card import BlackCard, WhiteCard
+from pycardcast.stream import CardStreamParser, iter_cards
+
+
+def _chunks(data, size):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+class StreamParserTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = synth.cards("STREAM", blackcount=5000, whitecount=30000)
+        cls.body = json.dumps(cls.data).encode("utf-8")
+        cls.expected = (BlackCard.from_json(cls.data) +
+                        WhiteCard.from_json(cls.data))
+
+    def test_payload_is_large(self):
+        self.assertGreater(len(self.body), 2 ** 21)
+
+    def test_matches_eager_parse(self):
+        for size in (7, 4096, 65536, len(self.body)):
+            with self.subTest(chunk_size=size):
+                cards = list(iter_cards(_chunks(self.body, size)))
+                self.assertEqual(cards, self.expected)
+
+    def test_multibyte_text_split_across_chunks(self):
+        data = {"calls": [], "responses": [{
+            "id": "w1", "text": ["Café ☃ \U0001f600"],
+            "created_at": "2015-01-01T00:00:00+00:00"}]}
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        cards = list(iter_cards(_chunks(body, 1)))
+        self.assertEqual(cards, WhiteCard.from_json(data))
+
+    def test_truncated(self):
+        parser = CardStreamParser()
+        parser.feed(self.body[:len(self.body) // 2])
+        with self.assertRaises(ValueError):
+            parser.close()
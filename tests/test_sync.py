@@ -0,0 +1,80 @@
+# Copyright © 2015 Elizabeth Myers.
+# All rights reserved.
+# This file is part of the pycardcast project. See LICENSE in the root
+# directory for licensing information.
+
+import threading
+import unittest
+
+from benchmarks import synth
+from benchmarks.stub import StubConfig, StubServer
+from pycardcast.cache import MemoryCache
+from pycardcast.card import BlackCard, WhiteCard
+from pycardcast.sync import DeckSync
+
+
+class DeckSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        from pycardcast.net.requests import CardcastAPI
+
+        self.server = StubServer(StubConfig(decks=20))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        # Search results are always refetched, but cards stay cached
+        self.api = self.server.configure(CardcastAPI(
+            cache=MemoryCache(), cache_ttl={"search": 0}))
+        self.addCleanup(self.api.close)
+
+        self.mirror = {}
+        self.sync = DeckSync(self.api, on_deck=self._store)
+        self.codes = [synth.deck_code(i) for i in range(5)]
+
+    def _store(self, deck):
+        self.mirror[deck.deckinfo.code] = deck
+
+    def _expected(self, code):
+        data = synth.cards(code, self.server.config.seed)
+        return BlackCard.from_json(data), WhiteCard.from_json(data)
+
+    def test_update_seen_in_search_refetches_cards(self):
+        report = self.sync.sync(self.codes, search={})
+        self.assertEqual(report.added, self.codes)
+
+        # Every deck is edited upstream
+        self.server.config.seed = 1
+        report = self.sync.sync(self.codes, search={})
+        self.assertEqual(report.changed, self.codes)
+        for code in self.codes:
+            deck = self.mirror[code]
+            self.assertEqual((deck.blackcards, deck.whitecards),
+                             self._expected(code))
+
+    def test_unchanged_decks_skipped(self):
+        self.sync.sync(self.codes, search={})
+        requests = self.server.requests
+        report = self.sync.sync(self.codes, search={})
+        self.assertEqual(report.unchanged, self.codes)
+        # Only the search was made again
+        self.assertEqual(self.server.requests, requests + 1)
+
+    def test_on_deck_called_from_calling_thread(self):
+        threads = set()
+        self.sync.on_deck = lambda deck: threads.add(threading.get_ident())
+        report = self.sync.sync(self.codes)
+        self.assertEqual(report.added, self.codes)
+        self.assertEqual(threads, {threading.get_ident()})
+
+    def test_on_deck_failure(self):
+        def store(deck):
+            if deck.deckinfo.code == self.codes[0]:
+                raise OSError("disk full")
+
+        self.sync.on_deck = store
+        report = self.sync.sync(self.codes)
+        self.assertEqual(list(report.failed), self.codes[:1])
+        self.assertNotIn(self.codes[0], self.sync.manifest)
+
+        self.sync.on_deck = self._store
+        report = self.sync.sync(self.codes)
+        self.assertEqual(report.added, self.codes[:1])